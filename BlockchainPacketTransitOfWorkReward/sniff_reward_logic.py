@@ -1,71 +1,106 @@
 import random
+import threading
 import time
-from typing import Dict, List, Tuple
-from snifz_blockchain_core import SnifZBlockchain
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from snifz_blockchain_core import SnifZBlockchain, TOKEN_SYMBOL
+from snifz_pot_scoring import SnifZPoTScorer, POT_CANDIDATES_KEY
+from snifz_timeseries import SnifZTimeSeriesStore
 
 MINT_INTERVAL_SECONDS = 300  # 5 minutes
 TOKEN_REWARD_AMOUNT = 1000.0
 
 class SnifZRewardSystem:
     """Manages the Proof-of-Traffic (PoT) consensus and block minting."""
-    def __init__(self, blockchain: SnifZBlockchain, my_node_address: str):
+    def __init__(self, blockchain: SnifZBlockchain, my_node_address: str, seed: Optional[int] = None,
+                 top_k: int = 5, max_report_age: int = 1, deterministic: bool = False,
+                 clock: Callable[[], float] = time.time, mint_interval: float = MINT_INTERVAL_SECONDS):
         self.blockchain = blockchain
+        # Injectable time source and block time, so replays and benchmarks can mint without waiting
+        self.clock = clock
+        self.mint_interval = mint_interval
+        # Deterministic mode seeds the lottery from the last block hash and records every candidate
+        # in the block, so any node can verify the winner (see snifz_pot_scoring.verify_pot_block)
+        self.deterministic = deterministic
         self.my_node_address = my_node_address
-        self._last_mint_time = time.time()
-        self.known_node_traffic: Dict[str, Dict[str, int]] = {} # Stores I/O data from all connected nodes
+        self._last_mint_time = clock()
+        self.mint_round = 0 # Incremented after every mint; peer reports are stamped with it
+        # Columnar I/O data from all connected nodes; reports older than max_report_age rounds expire
+        self.scorer = SnifZPoTScorer(seed=seed, top_k=top_k, max_report_age=max_report_age)
+        self.last_ranking: List[Tuple[str, float, Dict[str, Any]]] = [] # Winner + runners-up of the last round
+        # Rolling per-node traffic (1s/1m/5m), fed by every report; behind W13 and PoT history queries
+        self.traffic_history = SnifZTimeSeriesStore(clock=clock)
+        self._traffic_lock = threading.Lock() # Peer reports may arrive from network threads
+
+    @property
+    def known_node_traffic(self) -> Dict[str, Dict[str, Any]]:
+        """The current (non-expired) traffic report of every known node."""
+        table = self.scorer.table
+        return dict(zip(table.addresses, table.reports))
 
     def register_traffic_from_node(self, node_address: str, traffic_data: Dict[str, int]):
         """Collects packet data from peer nodes for global PoT calculation."""
-        self.known_node_traffic[node_address] = traffic_data
+        with self._traffic_lock:
+            self.scorer.register(node_address, traffic_data, self.mint_round)
+        # Reports carry the node's counts so far this interval; the store records their growth.
+        # This node's own series comes from its capture counters (a relayed echo would be stale).
+        if node_address != self.my_node_address:
+            self.traffic_history.record_totals(node_address, traffic_data)
 
     def _determine_winner(self, current_traffic: Dict[str, int]) -> Tuple[str, Dict[str, int]]:
         """
         Implements the core Proof-of-Traffic (PoT) algorithm.
         The most transferred packets (I/O) is most likely to win.
         """
-        # Add own node's traffic to the pool for calculation
-        self.known_node_traffic[self.my_node_address] = current_traffic
-        
-        candidates: List[Tuple[str, int]] = []
-        for address, data in self.known_node_traffic.items():
-            total_packets = data.get("packets_in", 0) + data.get("packets_out", 0)
-            
-            # --- PoT Weighting Logic ---
-            # 1. Base Score: Total Packet Count
-            score = total_packets
-            
-            # 2. Randomization Factor (Widget 23): Slight variation to prevent guaranteed wins
-            randomization_factor = random.uniform(0.95, 1.05) 
-            score *= randomization_factor
-            
+        with self._traffic_lock:
+            # Add own node's traffic to the pool for calculation
+            self.scorer.register(self.my_node_address, current_traffic, self.mint_round)
+
+            # --- PoT Weighting Logic (see SnifZPoTScorer) ---
+            # 1. Base Score: total packets plus transferred volume (nodes reporting only packets still score)
+            # 2. Randomization Factor (Widget 23): slight variation to prevent guaranteed wins
             # 3. Security/Complexity Factor (Simulated Difficulty, Widget 6)
-            # Higher difficulty might require more unique packet types or sustained throughput
-            score /= self.blockchain.difficulty 
-            # ---------------------------
-            
-            candidates.append((address, int(score)))
+            prev_hash = self.blockchain.last_block.compute_hash() if self.deterministic else None
+            ranking = self.scorer.rank(self.blockchain.difficulty, self.mint_round, prev_hash)
+            candidates = self.scorer.candidates() if self.deterministic else None
+        self.last_ranking = ranking
 
-        if not candidates:
+        if not ranking:
             return "NULL_ADDRESS", {"packets_in": 0, "packets_out": 0}
 
         # Select the winner based on the highest score
-        winner_address, winning_score = max(candidates, key=lambda item: item[1])
-        winning_data = self.known_node_traffic.get(winner_address, {"packets_in": 0, "packets_out": 0})
-        
+        winner_address, _, winning_data = ranking[0]
+        if candidates is not None:
+            # Record the whole round so any node can recompute the winner from the block
+            winning_data = dict(winning_data)
+            winning_data[POT_CANDIDATES_KEY] = candidates
         return winner_address, winning_data
 
+    def is_mint_due(self) -> bool:
+        """True once the block time (5 minutes by default) has elapsed since the last mint."""
+        return self.clock() - self._last_mint_time >= self.mint_interval
+
+    def seconds_until_mint(self) -> float:
+        return max(0.0, self.next_mint_time() - self.clock())
+
+    def next_mint_time(self) -> float:
+        """The interval boundary the next round is due at (in `clock` time; the scheduler's deadline)."""
+        return self._last_mint_time + self.mint_interval
+
     def try_to_mint_block(self, my_traffic_data: Dict[str, int]) -> bool:
         """Checks the 5-minute timer and initiates block minting."""
-        if time.time() - self._last_mint_time < MINT_INTERVAL_SECONDS:
+        if not self.is_mint_due():
             return False
+        return self.mint_block(my_traffic_data)
 
+    def mint_block(self, my_traffic_data: Dict[str, int]) -> bool:
+        """Runs a PoT round now, without the timer check (the scheduler calls it at the boundary)."""
         print("\n[+] 5-Minute Block Time Reached! Initiating PoT Consensus...")
         
         winner_address, winning_data = self._determine_winner(my_traffic_data)
         
         if winner_address != "NULL_ADDRESS":
-            # 1. Create the reward transaction
-            self.blockchain.new_transaction(
+            # 1. Create the reward transaction (kept, so a failed round can withdraw it)
+            reward = self.blockchain.mempool.add(
                 sender="BLOCK_REWARD",
                 recipient=winner_address,
                 amount=TOKEN_REWARD_AMOUNT
@@ -74,31 +109,35 @@ class SnifZRewardSystem:
             # 2. Forge the new block (Simplified PoW/PoT integration)
             # In a real system, 'nonce' would be found through a PoW or PoT loop.
             # Here, we use a placeholder nonce.
-            new_block = self.blockchain.new_block(
-                nonce=random.randint(1, 1000000), 
-                prev_hash=self.blockchain.last_block.compute_hash(),
-                traffic_data=winning_data # The winning traffic data is recorded in the block
-            )
+            try:
+                new_block = self.blockchain.new_block(
+                    nonce=random.randint(1, 1000000), 
+                    prev_hash=self.blockchain.last_block.compute_hash(),
+                    traffic_data=winning_data, # The winning traffic data is recorded in the block
+                    timestamp=self.clock() # Stamped by the mint clock, so replayed chains follow the mint schedule
+                )
+            except Exception:
+                # new_block put the transactions back; the retried round picks its own winner
+                self.blockchain.mempool.withdraw_reward(reward)
+                raise
             
             print(f"[{TOKEN_SYMBOL}] Block {new_block.index} Minted!")
             print(f"[{TOKEN_SYMBOL}] Winner: {winner_address} (Received {TOKEN_REWARD_AMOUNT} tokens)")
             
-            # 3. Update the timer
-            self._last_mint_time = time.time()
+            # 3. Update the timer and open the next reporting round. Rounds stay on their
+            # boundaries (however long this one took); missed boundaries are skipped.
+            now, boundary = self.clock(), self.next_mint_time()
+            if now < boundary:
+                self._last_mint_time = now  # Minted ahead of the timer: the next round is a full interval away
+            else:
+                self._last_mint_time = boundary + (now - boundary) // self.mint_interval * self.mint_interval
+            self.mint_round += 1
             return True
         
         return False
 
     def get_balance(self, address: str) -> float:
-        """Calculates the total balance for a given address by scanning the blockchain."""
-        balance = 0.0
-        for block in self.blockchain.chain:
-            for tx in block.transactions:
-                if tx['recipient'] == address:
-                    balance += tx['amount']
-                if tx['sender'] == address:
-                    balance -= tx['amount']
-        return balance
-
+        """Returns the balance for a given address from the incremental account-state index."""
+        return self.blockchain.account_state.get_balance(address)
 
 # This module ties the blockchain and sniffer together in the main loop.
\ No newline at end of file
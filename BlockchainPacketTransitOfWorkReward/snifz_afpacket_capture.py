@@ -0,0 +1,174 @@
+import ctypes
+import mmap
+import select
+import socket
+import struct
+import subprocess
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from snifz_traffic_classifier import SnifZTrafficClassifier
+
+# Linux packet socket constants (linux/if_packet.h, linux/if_ether.h)
+ETH_P_ALL = 0x0003
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+SO_ATTACH_FILTER = 26
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+
+TPACKET_REQ3 = struct.Struct("=IIIIIII")  # block_size, block_nr, frame_size, frame_nr, retire_blk_tov, sizeof_priv, feature_req_word
+BLOCK_STATUS_OFFSET = 8  # tpacket_block_desc.hdr.bh1.block_status
+BLOCK_NUM_PKTS_OFFSET = 12  # tpacket_block_desc.hdr.bh1.num_pkts
+BLOCK_FIRST_PKT_OFFSET = 16  # tpacket_block_desc.hdr.bh1.offset_to_first_pkt
+SLL_PKTTYPE_OFFSET = 58  # TPACKET_ALIGN(sizeof(tpacket3_hdr)) + offsetof(sockaddr_ll, sll_pkttype)
+
+BpfProgram = Sequence[Tuple[int, int, int, int]]  # Classic BPF: (code, jt, jf, k)
+
+
+def compile_bpf(expression: str, interface: str = "lo") -> List[Tuple[int, int, int, int]]:
+    """Compiles a tcpdump filter expression to classic BPF via `tcpdump -ddd`."""
+    try:
+        output = subprocess.run(["tcpdump", "-i", interface, "-ddd", expression],
+                                check=True, capture_output=True, text=True).stdout.split("\n")
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ValueError(f"Could not compile BPF filter '{expression}' (tcpdump required): {e}")
+    count = int(output[0])
+    return [tuple(int(field) for field in line.split()) for line in output[1:count + 1]]
+
+
+class SnifZAFPacketCapture:
+    """
+    High-rate Linux capture engine for SnifZPacketSniffer.
+
+    Reads frames from an AF_PACKET socket through a TPACKET_V3 memory-mapped
+    ring: the kernel fills whole blocks of frames. Count-only runs just read
+    each block's packet count; classified runs parse the frame headers in place
+    in the ring, so no per-packet bytes or scapy objects are created. Without
+    ring support it falls back to recv_into() on a single preallocated buffer.
+    An optional classic BPF program filters frames in the kernel.
+    """
+    def __init__(self, interface: str, bpf_filter: Optional[Union[str, BpfProgram]] = None,
+                 use_ring: bool = True, block_size: int = 1 << 20, block_count: int = 8,
+                 frame_size: int = 2048, block_timeout_ms: int = 50):
+        self.interface = interface
+        self.bpf_filter = bpf_filter
+        self.use_ring = use_ring
+        self.block_size = block_size
+        self.block_count = block_count
+        self.frame_size = frame_size
+        self.block_timeout_ms = block_timeout_ms  # Kernel hands over partially filled blocks after this
+        self._sock: Optional[socket.socket] = None
+        self._ring: Optional[mmap.mmap] = None
+        self._bpf_buffer = None  # Keeps the attached filter program alive
+
+    def open(self):
+        """Creates and binds the packet socket (requires CAP_NET_RAW)."""
+        self._sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        if self.bpf_filter:
+            self._attach_filter(self.bpf_filter)
+        if self.use_ring:
+            try:
+                self._setup_ring()
+            except OSError as e:
+                print(f"[!] TPACKET_V3 ring unavailable on {self.interface} ({e}); using recv_into fallback.")
+                self._ring = None
+        self._sock.bind((self.interface, 0))
+
+    def _attach_filter(self, bpf_filter: Union[str, BpfProgram]):
+        program = compile_bpf(bpf_filter, self.interface) if isinstance(bpf_filter, str) else list(bpf_filter)
+        instructions = b"".join(struct.pack("=HBBI", *insn) for insn in program)
+        self._bpf_buffer = ctypes.create_string_buffer(instructions)
+        fprog = struct.pack("HL", len(program), ctypes.addressof(self._bpf_buffer))  # struct sock_fprog
+        self._sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+    def _setup_ring(self):
+        self._sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+        frame_count = (self.block_size * self.block_count) // self.frame_size
+        self._sock.setsockopt(SOL_PACKET, PACKET_RX_RING, TPACKET_REQ3.pack(
+            self.block_size, self.block_count, self.frame_size, frame_count, self.block_timeout_ms, 0, 0))
+        self._ring = mmap.mmap(self._sock.fileno(), self.block_size * self.block_count,
+                               mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+
+    def close(self):
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def run(self, is_running: Callable[[], bool], on_packets: Optional[Callable[[int], None]] = None,
+            classifier: Optional[SnifZTrafficClassifier] = None):
+        """
+        Captures until is_running() returns False.
+
+        With a classifier, every frame is handed to classifier.count_frame()
+        together with the kernel's packet direction (sll_pkttype), reading the
+        ring in place. Otherwise only packet counts are reported through
+        on_packets(count), once per ring block rather than per frame.
+        """
+        if self._sock is None:
+            self.open()
+        try:
+            if self._ring is not None:
+                self._run_ring(is_running, on_packets, classifier)
+            else:
+                self._run_recv(is_running, on_packets, classifier)
+        finally:
+            self.close()
+
+    def _run_ring(self, is_running, on_packets, classifier):
+        ring = self._ring
+        words = memoryview(ring).cast("I")  # Aligned u32 view: header fields without struct tuples
+        count_frame = classifier.count_frame if classifier else None
+        block_size = self.block_size
+        block_count = self.block_count
+        poller = select.poll()
+        poller.register(self._sock.fileno(), select.POLLIN | select.POLLERR)
+        current = 0
+        try:
+            while is_running():
+                base = current * block_size
+                if not words[(base + BLOCK_STATUS_OFFSET) >> 2] & TP_STATUS_USER:
+                    poller.poll(100)  # Wake periodically so stop requests are honoured
+                    continue
+                num_pkts = words[(base + BLOCK_NUM_PKTS_OFFSET) >> 2]
+                if count_frame is not None:
+                    frame = base + words[(base + BLOCK_FIRST_PKT_OFFSET) >> 2]
+                    for _ in range(num_pkts):
+                        # tpacket3_hdr: tp_next_offset @0, tp_len @16, tp_mac (u16) @24; sll_pkttype @58
+                        word = frame >> 2
+                        count_frame(ring, frame + (words[word + 6] & 0xFFFF), words[word + 4], ring[frame + SLL_PKTTYPE_OFFSET])
+                        frame += words[word]
+                if on_packets is not None:
+                    on_packets(num_pkts)
+                words[(base + BLOCK_STATUS_OFFSET) >> 2] = TP_STATUS_KERNEL  # Return block to kernel
+                current = (current + 1) % block_count
+        finally:
+            words.release()
+
+    def _run_recv(self, is_running, on_packets, classifier):
+        buffer = bytearray(65536)
+        sock = self._sock
+        sock.settimeout(0.1)
+        pending = 0
+        while is_running():
+            try:
+                if classifier is not None:
+                    length, address = sock.recvfrom_into(buffer)
+                    classifier.count_frame(buffer, 0, length, address[2])  # address[2] is sll_pkttype
+                else:
+                    sock.recv_into(buffer)
+                pending += 1
+                if pending < 256:
+                    continue
+            except socket.timeout:
+                if not pending:
+                    continue
+            if on_packets is not None:
+                on_packets(pending)
+            pending = 0
+        if pending and on_packets is not None:
+            on_packets(pending)
@@ -0,0 +1,747 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from snifz_blockchain_core import Block
+
+
+def _sample_blocks(count: int, txs_per_block: int, seed: int = 7) -> List[Block]:
+    """Builds realistic-looking sealed-ready blocks (reward + transfers, hex prev_hash)."""
+    rng = random.Random(seed)
+    addresses = [f"0x{rng.getrandbits(160):040x}" for _ in range(64)]
+    blocks = []
+    prev_hash = hashlib.sha256(b"genesis").hexdigest()
+    for index in range(1, count + 1):
+        txs = [{'sender': "BLOCK_REWARD", 'recipient': rng.choice(addresses), 'amount': 1000.0}]
+        for _ in range(txs_per_block - 1):
+            txs.append({'sender': rng.choice(addresses), 'recipient': rng.choice(addresses),
+                        'amount': round(rng.uniform(0.01, 50.0), 2)})
+        traffic = {"packets_in": rng.randint(0, 10**6), "packets_out": rng.randint(0, 10**6)}
+        block = Block(index, 1.7e9 + index * 300.0, txs, prev_hash, traffic, rng.randint(1, 1000000))
+        prev_hash = block.compute_hash()
+        blocks.append(block)
+    return blocks
+
+
+def _legacy_json_bytes(block: Block) -> bytes:
+    """The pre-binary hashing path: json.dumps(block.__dict__, sort_keys=True)."""
+    return json.dumps({
+        'index': block.index, 'timestamp': block.timestamp,
+        'transactions': list(block.transactions), 'prev_hash': block.prev_hash,
+        'traffic_data': block.traffic_data, 'nonce': block.nonce,
+    }, sort_keys=True).encode()
+
+
+def _rate(count: int, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return count / max(time.perf_counter() - start, 1e-9)
+
+
+def bench_block_encoding(blocks: int = 5000, txs_per_block: int = 4) -> Dict[str, Any]:
+    """Compares hashes/sec and bytes/block of the legacy JSON path against the binary encoding."""
+    sample = _sample_blocks(blocks, txs_per_block)
+
+    def legacy():
+        for block in sample:
+            hashlib.sha256(_legacy_json_bytes(block)).hexdigest()
+
+    def binary_cold():
+        for block in sample:
+            block.nonce = block.nonce  # Drops the memoized header and hash
+            block.compute_hash()
+
+    def binary_memoized():
+        for block in sample:
+            block.compute_hash()
+
+    for block in sample:
+        block.seal()
+    return {
+        "blocks": blocks,
+        "txs_per_block": txs_per_block,
+        "json_hashes_per_sec": _rate(blocks, legacy),
+        "binary_hashes_per_sec": _rate(blocks, binary_cold),
+        "memoized_hashes_per_sec": _rate(blocks, binary_memoized),
+        "json_bytes_per_block": sum(len(_legacy_json_bytes(b)) for b in sample) / blocks,
+        "binary_bytes_per_block": sum(len(b.serialize()) for b in sample) / blocks,
+    }
+
+
+class _ReportSink:
+    """Stands in for SnifZRewardSystem: only counts delivered reports."""
+    def __init__(self):
+        self.count = 0
+
+    def register_traffic_from_node(self, address, traffic_data):
+        self.count += 1
+
+
+def bench_gossip(peer_counts=(2, 8, 32), reports_per_node: int = 500) -> Dict[str, Any]:
+    """
+    Runs N gossip nodes in one event loop on localhost (full mesh) and times a
+    report round: every node reports `reports_per_node` node records and the
+    round ends when every node has received everybody else's.
+    """
+    from snifz_peer_gossip import SnifZGossipNode
+
+    async def round_trip(count: int) -> Dict[str, float]:
+        nodes = [SnifZGossipNode(f"node-{i}", _ReportSink(), port=0, relay=False) for i in range(count)]
+        for node in nodes:
+            await node.start()
+        for i, node in enumerate(nodes):
+            for other in nodes[i + 1:]:
+                await node.connect(other.host, other.port)
+        while any(len(node.peers) < count - 1 for node in nodes):
+            await asyncio.sleep(0.001)
+
+        expected = (count - 1) * reports_per_node
+        started = time.perf_counter()
+        for node in nodes:
+            for r in range(reports_per_node):
+                node.report_traffic(f"{node.node_address}/{r}", {"packets_in": r, "packets_out": r})
+        while any(node.reward_system.count < expected for node in nodes):
+            await asyncio.sleep(0.0005)
+        elapsed = time.perf_counter() - started
+        frames = sum(node.stats["frames_out"] for node in nodes)
+        for node in nodes:
+            await node.close()
+        return {"reports_per_sec": count * expected / elapsed, "round_latency_ms": elapsed * 1000, "frames": frames}
+
+    results: Dict[str, Any] = {"reports_per_node": reports_per_node}
+    for count in peer_counts:
+        for key, value in asyncio.run(round_trip(count)).items():
+            results[f"peers_{count}_{key}"] = value
+    return results
+
+
+def _extend_chain(blockchain, height: int, seed: int = 11):
+    """Appends valid reward blocks (one BLOCK_REWARD each) until the chain reaches `height`."""
+    from sniff_reward_logic import TOKEN_REWARD_AMOUNT
+    rng = random.Random(seed)
+    addresses = [f"0x{rng.getrandbits(160):040x}" for _ in range(64)]
+    tip = blockchain.last_block
+    for index in range(len(blockchain.chain) + 1, height + 1):
+        reward = {'sender': "BLOCK_REWARD", 'recipient': rng.choice(addresses), 'amount': TOKEN_REWARD_AMOUNT}
+        traffic = {"packets_in": rng.randint(0, 10**6), "packets_out": rng.randint(0, 10**6)}
+        tip = blockchain.append_block(Block(index, tip.timestamp + 300.0, [reward], tip.compute_hash(),
+                                            traffic, rng.randint(1, 1000000)))
+
+
+def bench_sync(chain_lengths=(10_000, 100_000, 1_000_000), serving_peers: int = 3) -> Dict[str, Any]:
+    """
+    Headers-first sync of a fresh node from `serving_peers` nodes on localhost,
+    all in one event loop. The source chain lives in a temporary block store
+    (shared by the serving nodes), as does the syncing node's chain.
+    """
+    import os
+    import tempfile
+    from snifz_blockchain_core import SnifZBlockchain
+    from snifz_chain_sync import SnifZChainSync
+    from snifz_peer_gossip import SnifZGossipNode
+
+    async def run(source, target) -> Dict[str, Any]:
+        servers = [SnifZGossipNode(f"server-{i}", blockchain=source, port=0) for i in range(serving_peers)]
+        client = SnifZGossipNode("client", blockchain=target, port=0)
+        for node in servers + [client]:
+            await node.start()
+        for server in servers:
+            await client.connect(server.host, server.port)
+        while len(client.peers) < serving_peers:
+            await asyncio.sleep(0.001)
+        report = await SnifZChainSync(target, client).sync()
+        for node in servers + [client]:
+            await node.close()
+        return report
+
+    results: Dict[str, Any] = {"serving_peers": serving_peers}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = SnifZBlockchain(store_path=os.path.join(tmp, "source.snfz"), sync_every=4096)
+        for length in chain_lengths:
+            _extend_chain(source, length)
+            source.chain.sync()
+            target = SnifZBlockchain(store_path=os.path.join(tmp, f"target-{length}.snfz"), sync_every=4096)
+            report = asyncio.run(run(source, target))
+            if report["height"] != length:
+                raise RuntimeError(f"sync stopped at {report['height']} of {length} blocks")
+            results[f"blocks_{length}_per_sec"] = report["blocks_per_sec"]
+            results[f"blocks_{length}_seconds"] = report["seconds"]
+            target.close()
+        source.close()
+    return results
+
+
+def bench_mempool(transfers: int = 100_000, senders: int = 1000) -> Dict[str, Any]:
+    """Bulk-adds a burst of transfers and drains it block by block through new_block."""
+    from snifz_blockchain_core import SnifZBlockchain
+    blockchain = SnifZBlockchain()
+    rng = random.Random(5)
+    addresses = [f"0x{rng.getrandbits(160):040x}" for _ in range(senders)]
+    blockchain.new_transactions([{'sender': "BLOCK_REWARD", 'recipient': address, 'amount': 1000.0}
+                                 for address in addresses])
+    blockchain.new_block(nonce=1, prev_hash=None, traffic_data={})
+    burst = [{'sender': rng.choice(addresses), 'recipient': rng.choice(addresses), 'amount': 0.01}
+             for _ in range(transfers)]
+
+    started = time.perf_counter()
+    rejected = blockchain.new_transactions(burst)
+    added = time.perf_counter() - started
+    started = time.perf_counter()
+    blocks = 0
+    while len(blockchain.mempool):
+        blockchain.new_block(nonce=1, prev_hash=None, traffic_data={})
+        blocks += 1
+    drained = time.perf_counter() - started
+    return {
+        "transfers": transfers,
+        "rejected": len(rejected),
+        "adds_per_sec": transfers / added,
+        "blocks": blocks,
+        "block_txs_per_sec": (transfers - len(rejected)) / drained,
+    }
+
+
+def bench_merkle_proofs(txs_per_block=(10, 1000, 5000), proofs: int = 2000) -> Dict[str, Any]:
+    """Inclusion proof size vs. full block size, and proof verification rate."""
+    from snifz_blockchain_core import SnifZBlockchain
+    results: Dict[str, Any] = {}
+    rng = random.Random(9)
+    for count in txs_per_block:
+        blockchain = SnifZBlockchain()
+        addresses = [f"0x{rng.getrandbits(160):040x}" for _ in range(count)]
+        blockchain.new_transaction("BLOCK_REWARD", addresses[0], 1000.0)
+        blockchain.new_block(nonce=1, prev_hash=None, traffic_data={})
+        blockchain.mempool.max_per_block = count
+        blockchain.new_transaction("BLOCK_REWARD", addresses[0], 1000.0)
+        blockchain.new_transactions([{'sender': addresses[0], 'recipient': address, 'amount': 0.01}
+                                     for address in addresses[1:]])
+        block = blockchain.new_block(nonce=1, prev_hash=None, traffic_data={})
+        block_hash = block.compute_hash()
+        sample = [blockchain.get_transaction_proof(block.index, rng.randrange(len(block.transactions)))
+                  for _ in range(proofs)]
+        started = time.perf_counter()
+        verified = sum(SnifZBlockchain.verify_transaction_proof(proof, block_hash) for proof in sample)
+        elapsed = time.perf_counter() - started
+        if verified != proofs:
+            raise RuntimeError(f"{proofs - verified} proofs failed to verify")
+        proof_bytes = max(len(p["header"]) + sum(len(step) for step in p["path"]) for p in sample)
+        results[f"txs_{count}_block_bytes"] = len(block.serialize())
+        results[f"txs_{count}_proof_bytes"] = proof_bytes
+        results[f"txs_{count}_verifies_per_sec"] = proofs / elapsed
+    return results
+
+
+def bench_restart(blocks: int = 200_000, tail: int = 500) -> Dict[str, Any]:
+    """Startup time of a persistent chain: full replay vs. snapshot restore plus a short replay."""
+    import os
+    import tempfile
+    from snifz_blockchain_core import SnifZBlockchain
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chain.snfz")
+        blockchain = SnifZBlockchain(store_path=path, sync_every=4096, snapshot_every=0)
+        _extend_chain(blockchain, blocks - tail)
+        snapshot_bytes = blockchain.write_snapshot()
+        _extend_chain(blockchain, blocks)
+        blockchain.close()
+
+        started = time.perf_counter()
+        SnifZBlockchain(store_path=path).close()
+        restored = time.perf_counter() - started
+        os.rename(path + ".snap", path + ".snap.off")
+        started = time.perf_counter()
+        SnifZBlockchain(store_path=path).close()
+        replayed = time.perf_counter() - started
+    return {
+        "blocks": blocks,
+        "replayed_after_snapshot": tail,
+        "snapshot_bytes": snapshot_bytes,
+        "full_replay_seconds": replayed,
+        "snapshot_restore_seconds": restored,
+    }
+
+
+def bench_chain_index(blocks: int = 200_000, queries: int = 2000) -> Dict[str, Any]:
+    """
+    Explorer queries on a persistent chain: block-by-hash (index vs. a linear
+    scan), blocks won by an address, blocks in a one-hour window, and restart
+    time with the saved index vs. rebuilding it.
+    """
+    import os
+    import tempfile
+    from snifz_blockchain_core import SnifZBlockchain
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chain.snfz")
+        blockchain = SnifZBlockchain(store_path=path, sync_every=4096, snapshot_every=0)
+        _extend_chain(blockchain, blocks)
+        heights = [rng.randint(1, blocks) for _ in range(queries)]
+        hashes = [blockchain.block_hash(height) for height in heights]
+        winners = [blockchain.index.block_winner(blockchain.chain[height - 1]) for height in heights[:100]]
+        times = [blockchain.chain[height - 1].timestamp for height in heights[:100]]
+        target = hashes[0]
+        scan = lambda: next(i for i, block in enumerate(blockchain.chain) if block.compute_hash() == target)
+        result = {
+            "blocks": blocks,
+            "index_bytes_per_block": blockchain.index.memory_bytes / blocks,
+            "by_hash_per_sec": _rate(queries, lambda: [blockchain.height_of(h) for h in hashes]),
+            "by_hash_scan_per_sec": _rate(1, scan),
+            "by_winner_per_sec": _rate(100, lambda: [blockchain.get_blocks_won_by(w) for w in winners]),
+            "by_time_1h_per_sec": _rate(100, lambda: [blockchain.get_blocks_between(t, t + 3600) for t in times]),
+        }
+        blockchain.close()
+        result["saved_index_bytes"] = os.path.getsize(path + ".cidx")
+        started = time.perf_counter()
+        SnifZBlockchain(store_path=path).close()
+        result["restart_with_index_seconds"] = time.perf_counter() - started
+        os.remove(path + ".cidx")
+        started = time.perf_counter()
+        SnifZBlockchain(store_path=path).close()
+        result["restart_rebuilding_index_seconds"] = time.perf_counter() - started
+    return result
+
+
+def bench_rpc_client(reads: int = 2000, addresses: int = 200, latency: float = 0.002) -> Dict[str, Any]:
+    """
+    Balance reads (W19 refreshes/payout checks) against a local stub EVM with
+    `latency` seconds per HTTP round trip: one blocking call at a time vs. the
+    pooled client with batching, coalescing and the read cache.
+    """
+    from snifz_rpc_client import SnifZRPCClient
+    from snifz_stub_evm import SnifZStubEVM
+    rng = random.Random(5)
+    owners = [f"0x{rng.getrandbits(160):040x}" for _ in range(addresses)]
+    calls = [("eth_getBalance", [rng.choice(owners), "latest"]) for _ in range(reads)]
+
+    async def run():
+        stub = SnifZStubEVM(latency=latency)
+        for owner in owners:
+            stub.fund(owner, native=rng.randrange(10 ** 18))
+        await stub.start()
+        try:
+            serial = SnifZRPCClient(stub.url, pool_size=1, batch_window=0.0, max_batch=1, cache_ttls={})
+            started = time.perf_counter()
+            for method, params in calls:
+                await serial.call(method, params)
+            serial_seconds = time.perf_counter() - started
+            await serial.close()
+
+            pooled = SnifZRPCClient(stub.url)
+            started = time.perf_counter()
+            await pooled.batch(calls)
+            pooled_seconds = time.perf_counter() - started
+            await pooled.close()
+        finally:
+            await stub.close()
+        return {
+            "reads": reads,
+            "serial_reads_per_sec": reads / serial_seconds,
+            "serial_http_requests": serial.stats["http_requests"],
+            "pooled_reads_per_sec": reads / pooled_seconds,
+            "pooled_http_requests": pooled.stats["http_requests"],
+            "pooled_connections": pooled.stats["connections"],
+            "coalesced": pooled.stats["coalesced"],
+            "cache_hits": pooled.stats["cache_hits"],
+        }
+
+    return asyncio.run(run())
+
+
+def bench_settlement(blocks: int = 10_000, latency: float = 0.002) -> Dict[str, Any]:
+    """
+    Settles the rewards of `blocks` reward blocks (64 distinct winners) against
+    a stub EVM with `latency` per round trip, in one window.
+    """
+    import os
+    import tempfile
+    from snifz_blockchain_core import SnifZBlockchain
+    from snifz_settlement import SnifZRewardSettlement
+    from snifz_stub_evm import SnifZStubEVM, STUB_TOKEN_ADDRESS
+    from snifz_web3_connect import SnifZWeb3Connector
+    treasury = "0x" + "5e" * 20
+    blockchain = SnifZBlockchain()
+    _extend_chain(blockchain, blocks + 1)
+
+    async def run():
+        stub = SnifZStubEVM(latency=latency)
+        stub.fund(treasury, token=10 ** 40)
+        await stub.start()
+        connector = SnifZWeb3Connector(stub.url)
+        connector.token_contract = STUB_TOKEN_ADDRESS
+        with tempfile.TemporaryDirectory() as tmp:
+            settlement = SnifZRewardSettlement(blockchain, connector, treasury, os.path.join(tmp, "journal"),
+                                               window_blocks=blocks, confirmations=0)
+            started = time.perf_counter()
+            rewards = settlement.collect()
+            collected = time.perf_counter()
+            await settlement.settle()
+            settled = time.perf_counter()
+            settlement.close()
+        await connector.rpc.close()
+        await stub.close()
+        return {
+            "rewards": rewards,
+            "collect_ms": (collected - started) * 1000,
+            "settle_ms": (settled - collected) * 1000,
+            "evm_transactions": stub.stats["transactions"],
+            "http_round_trips": stub.stats["http_requests"],
+            "per_reward_round_trips": rewards,  # One eth_sendTransaction per reward, unbatched
+        }
+
+    return asyncio.run(run())
+
+
+def _synthetic_frames(count: int, seed: int = 3) -> List[bytes]:
+    """Ethernet frames to and from one host: IPv4 TCP/UDP/ICMP, some IPv6 and ARP, mixed sizes."""
+    rng = random.Random(seed)
+    local_mac, local_ip = bytes.fromhex("020000000001"), bytes((10, 0, 0, 1))
+    remote_macs = [bytes((2, 0, 0, 0, 1, i)) for i in range(16)]
+    frames = []
+    for _ in range(count):
+        remote_mac, remote_ip = rng.choice(remote_macs), bytes((10, 0, 1, rng.randrange(1, 255)))
+        outbound = rng.random() < 0.4
+        macs = remote_mac + local_mac if outbound else local_mac + remote_mac
+        kind = rng.random()
+        if kind < 0.05:
+            frames.append(macs + b"\x08\x06" + bytes(28))  # ARP
+            continue
+        if kind < 0.15:
+            ips = bytes(16) + bytes(16)
+            frames.append(macs + b"\x86\xdd" + b"\x60" + bytes(5) + bytes((17, 64)) + ips + bytes(8 + rng.randrange(64)))
+            continue
+        protocol = 6 if kind < 0.75 else (17 if kind < 0.95 else 1)
+        ips = local_ip + remote_ip if outbound else remote_ip + local_ip
+        payload = bytes(rng.choice((0, 40, 512, 1400)))
+        frames.append(macs + b"\x08\x00" + b"\x45" + bytes(8) + bytes((protocol,)) + bytes(2) + ips
+                      + bytes(20) + payload)
+    return frames
+
+
+def bench_replay(packets: int = 200_000) -> Dict[str, Any]:
+    """
+    Packets/sec counted from a pcap replay: the bare classifier loop, and end to
+    end through SnifZPacketSniffer(backend="pcap") into the mint window.
+    """
+    import os
+    import tempfile
+    from snifz_packet_sniffer import SnifZPacketSniffer
+    from snifz_pcap_replay import SnifZPcapReplay, write_pcap
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traffic.pcap")
+        write_pcap(path, _synthetic_frames(packets))
+        replay = SnifZPcapReplay(path)
+        classifier = replay.classifier()
+        classify_rate = _rate(packets, lambda: replay.run(lambda: True, classifier=classifier))
+        replay.close()
+
+        sniffer = SnifZPacketSniffer(path, backend="pcap")
+        started = time.perf_counter()
+        sniffer.start_sniffing()
+        sniffer.sniff_thread.join()
+        sniffer_seconds = time.perf_counter() - started
+        counted = sniffer.get_current_traffic_data()
+    return {
+        "packets": packets,
+        "classifier_packets_per_sec": classify_rate,
+        "sniffer_packets_per_sec": packets / sniffer_seconds,
+        "counted_in": counted["packets_in"],
+        "counted_out": counted["packets_out"],
+    }
+
+
+def bench_minting(blocks: int = 2000, peers: int = 32) -> Dict[str, Any]:
+    """Blocks minted/sec through SnifZRewardSystem.try_to_mint_block, with a clock that jumps a block time per round."""
+    import contextlib
+    import io
+    from snifz_blockchain_core import SnifZBlockchain
+    from sniff_reward_logic import SnifZRewardSystem
+    rng = random.Random(9)
+    now = [time.time()]  # Blocks are stamped by this clock; it starts after genesis so timestamps stay monotonic
+    blockchain = SnifZBlockchain()
+    rewards = SnifZRewardSystem(blockchain, "0x" + "01" * 20, seed=1, clock=lambda: now[0])
+    addresses = [f"0x{rng.getrandbits(160):040x}" for _ in range(peers)]
+    reports = [{"packets_in": rng.randrange(10 ** 6), "packets_out": rng.randrange(10 ** 6),
+                "bytes_in": rng.randrange(10 ** 9), "bytes_out": rng.randrange(10 ** 9)} for _ in range(peers)]
+    mine = {"packets_in": 50_000, "packets_out": 40_000, "bytes_in": 10 ** 7, "bytes_out": 10 ** 7}
+    minted = 0
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(blocks):
+            for address, report in zip(addresses, reports):
+                rewards.register_traffic_from_node(address, report)
+            now[0] += rewards.mint_interval
+            minted += rewards.try_to_mint_block(mine)
+    seconds = time.perf_counter() - started
+    return {"blocks": minted, "peers": peers, "blocks_minted_per_sec": minted / seconds}
+
+
+def bench_balances(blocks: int = 20_000, lookups: int = 500_000) -> Dict[str, Any]:
+    """Balance lookups/sec (W19, RPC snifz_getBalance) on a chain with `blocks` reward blocks."""
+    from snifz_blockchain_core import SnifZBlockchain
+    from sniff_reward_logic import SnifZRewardSystem
+    blockchain = SnifZBlockchain()
+    _extend_chain(blockchain, blocks)
+    rewards = SnifZRewardSystem(blockchain, "0x" + "01" * 20)
+    known = list(blockchain.account_state.balances)
+    queries = [random.Random(4).choice(known) if i % 4 else f"0x{i:040x}" for i in range(lookups)]
+    get_balance = rewards.get_balance
+    return {"addresses": len(known), "lookups": lookups,
+            "balance_lookups_per_sec": _rate(lookups, lambda: [get_balance(q) for q in queries])}
+
+
+def bench_memory(blocks: int = 20_000) -> Dict[str, Any]:
+    """Heap bytes per block of an in-memory chain (blocks plus account state), via tracemalloc."""
+    import gc
+    import tracemalloc
+    from snifz_blockchain_core import SnifZBlockchain
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        blockchain = SnifZBlockchain()
+        _extend_chain(blockchain, blocks)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return {"blocks": blocks, "bytes_per_block": used / blocks,
+            "serialized_bytes_per_block": len(blockchain.chain[-1].serialize())}
+
+
+def bench_metrics(calls: int = 500_000, blocks: int = 1000) -> Dict[str, Any]:
+    """
+    Cost of the hot-path instrumentation: memoized compute_hash calls/sec and
+    blocks minted/sec with metrics disabled, enabled, and enabled with the
+    sampling profiler running.
+    """
+    from snifz_metrics import METRICS, SnifZSamplingProfiler
+    block = _sample_blocks(1, 4)[0]
+    block.compute_hash()
+    was_enabled = METRICS.enabled
+    METRICS.instrument_hot_paths()
+    results: Dict[str, Any] = {"calls": calls, "blocks": blocks}
+    profiler = SnifZSamplingProfiler()
+    try:
+        for mode in ("disabled", "enabled", "profiled"):
+            METRICS.enable() if mode != "disabled" else METRICS.disable()
+            if mode == "profiled":
+                profiler.start()
+            compute_hash = block.compute_hash
+            results[f"{mode}_hashes_per_sec"] = _rate(calls, lambda: [compute_hash() for _ in range(calls)])
+            results[f"{mode}_blocks_minted_per_sec"] = bench_minting(blocks, peers=8)["blocks_minted_per_sec"]
+            profiler.stop()
+    finally:
+        METRICS.enable() if was_enabled else METRICS.disable()
+    results["enabled_hash_overhead_ns"] = 1e9 / results["enabled_hashes_per_sec"] - 1e9 / results["disabled_hashes_per_sec"]
+    return results
+
+
+def bench_timeseries(nodes: int = 2000, seconds: int = 300) -> Dict[str, Any]:
+    """Traffic history: reports recorded/sec, memory, and W13-style top-N / range query latency."""
+    from snifz_timeseries import SnifZTimeSeriesStore
+    store = SnifZTimeSeriesStore(max_series=nodes)
+    addresses = [f"0x{i:040x}" for i in range(nodes)]
+    start = time.perf_counter()
+    for second in range(seconds):
+        for i, address in enumerate(addresses):
+            store.record(address, (i % 97, i % 89, i * 60, i * 40), 1_000_000.0 + second)
+    recorded = nodes * seconds / (time.perf_counter() - start)
+    now = 1_000_000.0 + seconds - 1
+    return {"nodes": nodes, "reports_recorded_per_sec": recorded, "memory_bytes": store.memory_bytes,
+            "top8_10s_per_sec": _rate(20, lambda: [store.top(8, 10, now=now) for _ in range(20)]),
+            "top8_1h_per_sec": _rate(20, lambda: [store.top(8, 3600, now=now) for _ in range(20)]),
+            "series_1h_per_sec": _rate(1000, lambda: [store.series(addresses[7], "packets_in", 3600, now=now)
+                                                      for _ in range(1000)])}
+
+
+def bench_scheduler(rounds: int = 200, period: float = 0.01, busy_threads: int = 2,
+                    jobs: int = 10_000) -> Dict[str, Any]:
+    """
+    Scheduler round-to-round jitter: lateness of a periodic job on the
+    standalone runner, idle and with busy threads holding the GIL, against a
+    once-per-second poll (the old functional loop: up to a second late).
+    Also wheel operations (schedule + cancel) per second with `jobs` armed.
+    """
+    import statistics
+    import threading
+    from snifz_scheduler import SnifZScheduler
+    result: Dict[str, Any] = {"rounds": rounds, "period_ms": period * 1000}
+    for load in (0, busy_threads):
+        scheduler = SnifZScheduler()
+        lateness: List[float] = []
+        done = threading.Event()
+
+        def fire():
+            lateness.append(scheduler.clock() - scheduler.deadline("round") + period)
+            if len(lateness) >= rounds:
+                done.set()
+        stop = threading.Event()
+        spinners = [threading.Thread(target=_spin, args=(stop,), daemon=True) for _ in range(load)]
+        for spinner in spinners:
+            spinner.start()
+        scheduler.every("round", period, fire)
+        scheduler.start_in_thread()
+        done.wait(rounds * period * 20)
+        scheduler.stop()
+        stop.set()
+        for spinner in spinners:
+            spinner.join()
+        lateness.sort()
+        name = "idle" if not load else f"busy{load}"
+        result[f"{name}_lateness_p50_ms"] = statistics.median(lateness) * 1000
+        result[f"{name}_lateness_p99_ms"] = lateness[int(len(lateness) * 0.99) - 1] * 1000
+        result[f"{name}_lateness_max_ms"] = lateness[-1] * 1000
+    result["poll_1s_lateness_mean_ms"] = 500.0  # Uniform over the poll period
+    scheduler = SnifZScheduler()
+    now = scheduler.clock()
+    for i in range(jobs):
+        scheduler.at(f"job{i}", now + 1 + i % 3600, _noop)
+    names = [f"job{i}" for i in range(0, jobs, 7)]
+    result["schedule_cancel_per_sec"] = _rate(2 * len(names), lambda: [
+        (scheduler.at(name, now + 1800, _noop), scheduler.cancel(name)) for name in names])
+    result["next_deadline_per_sec"] = _rate(1000, lambda: [
+        (scheduler.cancel("job0"), scheduler.next_deadline(), scheduler.at("job0", now + 1, _noop))
+        for _ in range(1000)])
+    return result
+
+
+def _noop():
+    pass
+
+
+def _spin(stop):
+    while not stop.is_set():
+        pass
+
+
+IMPORT_TARGETS = {  # Cold-start entry points: what each frontend imports before it can do anything
+    "library": ("snifz_blockchain_core", "snifz_chain_sync", "snifz_chain_validator", "sniff_reward_logic"),
+    "daemon": ("snifz_node",),
+    "gui": ("snifz_gui_manager",),
+}
+HEAVY_MODULES = ("scapy", "web3", "eth_account", "qrcode", "PIL", "PyQt5")
+_IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print(time.perf_counter() - started)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def bench_import_time(repeats: int = 5) -> Dict[str, Any]:
+    """
+    Cold-start import latency of the library, the snifz-node daemon and the GUI,
+    each measured in a fresh interpreter (median of `repeats`), plus which heavy
+    optional dependencies the import dragged in (should be none but PyQt5 for the GUI).
+    """
+    import os
+    import statistics
+    import subprocess
+    import sys
+    probe = _IMPORT_PROBE.format(heavy=HEAVY_MODULES)
+    here = os.path.dirname(os.path.abspath(__file__))
+    result: Dict[str, Any] = {}
+    for target, modules in IMPORT_TARGETS.items():
+        timings, loaded = [], ""
+        for _ in range(repeats):
+            run = subprocess.run([sys.executable, "-c", probe, *modules], cwd=here,
+                                 capture_output=True, text=True)
+            if run.returncode != 0:
+                error = run.stderr.strip().splitlines()[-1] if run.stderr.strip() else f"exit {run.returncode}"
+                result[f"{target}_import_ms"] = f"unavailable ({error})"
+                break
+            seconds, loaded = run.stdout.splitlines()[-2:]
+            timings.append(float(seconds) * 1000)
+        else:
+            result[f"{target}_import_ms"] = statistics.median(timings)
+            result[f"{target}_heavy_modules"] = loaded or "none"
+    return result
+
+
+BENCHMARKS = {
+    "block_encoding": bench_block_encoding,
+    "gossip": bench_gossip,
+    "sync": bench_sync,
+    "mempool": bench_mempool,
+    "merkle_proofs": bench_merkle_proofs,
+    "restart": bench_restart,
+    "chain_index": bench_chain_index,
+    "rpc_client": bench_rpc_client,
+    "settlement": bench_settlement,
+    "import_time": bench_import_time,
+    "replay": bench_replay,
+    "minting": bench_minting,
+    "balances": bench_balances,
+    "memory": bench_memory,
+    "metrics": bench_metrics,
+    "timeseries": bench_timeseries,
+    "scheduler": bench_scheduler,
+}
+SUITES = {
+    # End-to-end throughput: packets counted, blocks minted, hashing, balance reads, memory per block
+    "throughput": ("replay", "minting", "block_encoding", "balances", "memory"),
+}
+
+
+def _run_metadata() -> Dict[str, Any]:
+    """Identifies the build a result file belongs to (git commit when run from a checkout)."""
+    import os
+    import platform
+    import subprocess
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.time()}
+
+
+def _compare(previous: Dict[str, Any], current: Dict[str, Any]):
+    """Prints the change of every numeric metric present in both result files."""
+    print(f"[bench] compared with {previous.get('commit') or 'previous run'}")
+    for name, result in current["results"].items():
+        old = previous.get("results", {}).get(name, {})
+        for key, value in result.items():
+            before = old.get(key)
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+                print(f"    {name}.{key:<28} {before:>14,.1f} -> {value:>14,.1f}  ({(value - before) / before:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnifZ hot-path benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--suite", choices=sorted(SUITES), help="run a predefined set of benchmarks")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="print the change against an earlier --json result file")
+    args = parser.parse_args()
+    names = list(args.names) + list(SUITES.get(args.suite, ()))
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    report = {**_run_metadata(), "results": {}}
+    for name in names or list(BENCHMARKS):
+        result = BENCHMARKS[name]()
+        report["results"][name] = result
+        if args.json == "-":
+            continue
+        print(f"[bench] {name}")
+        for key, value in result.items():
+            print(f"    {key:<28} {value:,.1f}" if isinstance(value, float) else f"    {key:<28} {value}")
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            _compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
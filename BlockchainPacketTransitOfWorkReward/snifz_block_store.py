@@ -0,0 +1,245 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from typing import Iterator, List, Optional
+
+from snifz_blockchain_core import Block
+
+SEGMENT_MAGIC = b"SNFZSEG3"  # Segment file header (v3: blocks with Merkle-root headers)
+RECORD_HEADER = struct.Struct("<II")  # payload length, crc32(payload)
+OFFSET_SIZE = 8  # Each offset index entry is a little-endian uint64
+
+
+class SnifZBlockStore:
+    """
+    Append-only, crash-safe block storage behind SnifZBlockchain.chain.
+
+    Layout on disk:
+      <path>      segment file: magic + [len][crc32][serialized block] records
+      <path>.idx  offset index: one uint64 segment offset per block
+
+    The segment is always synced before the index, so the index never points
+    past durable data. On open, any torn/corrupt tail left by a crash is
+    truncated and unindexed records written before the crash are re-indexed.
+    Reads go through a read-only mmap and decode blocks lazily, so opening a
+    store with millions of blocks only costs loading the offset array. A read
+    only flushes and remaps when its record lies past the mapped length.
+
+    The gossip thread serves reads while the service thread appends, so every
+    read, append, sync and truncate holds one lock: a remap can never close
+    the map under a reader (reads copy their bytes out before releasing it).
+    """
+
+    def __init__(self, path: str, sync_every: int = 64):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.sync_every = max(1, sync_every)  # fsync batching: blocks per fsync
+        self._offsets = array("Q")
+        self._unsynced = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._end = len(SEGMENT_MAGIC)  # End of the last record (appended, possibly still buffered)
+        self._tail_block: Optional[Block] = None  # Cached decoded last block (hot for last_block)
+        self._lock = threading.RLock()  # Guards the segment, offsets and map across threads
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._segment = open(path, "a+b")
+        if new_file:
+            self._segment.write(SEGMENT_MAGIC)
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+        else:
+            self._segment.seek(0)
+            magic = self._segment.read(len(SEGMENT_MAGIC))
+            if magic != SEGMENT_MAGIC:
+                if magic.startswith(SEGMENT_MAGIC[:-1]):
+                    raise ValueError(f"{path} uses an older block format ({magic.decode()}); "
+                                     f"move it aside and re-sync the chain.")
+                raise ValueError(f"{path} is not a SnifZ block segment (bad magic).")
+        self._index = open(self.index_path, "a+b")
+        self._load_and_recover()
+
+    # --- Recovery -----------------------------------------------------------
+
+    def _load_and_recover(self):
+        """Loads the offset index and reconciles it with the segment tail."""
+        self._index.seek(0)
+        raw = self._index.read()
+        usable = len(raw) - (len(raw) % OFFSET_SIZE)  # Drop a torn index entry
+        self._offsets.frombytes(raw[:usable])
+        segment_size = os.path.getsize(self.path)
+
+        # Drop index entries whose records are not fully (and correctly) on disk
+        while self._offsets and not self._record_ok(self._offsets[-1], segment_size):
+            self._offsets.pop()
+
+        # Scan forward for records that reached the segment but not the index
+        position = (self._record_end(self._offsets[-1]) if self._offsets else len(SEGMENT_MAGIC))
+        while self._record_ok(position, segment_size):
+            self._offsets.append(position)
+            position = self._record_end(position)
+
+        if position < segment_size:
+            print(f"[!] Block store: truncating {segment_size - position} bytes of torn tail in {self.path}")
+            self._segment.truncate(position)
+        self._end = position
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+
+        # Rewrite the index so it matches exactly what was recovered
+        self._index.truncate(0)
+        self._index.write(self._offsets.tobytes())
+        self._index.flush()
+        os.fsync(self._index.fileno())
+        self._remap()
+
+    def _read_at(self, offset: int, size: int) -> bytes:
+        self._segment.seek(offset)
+        return self._segment.read(size)
+
+    def _record_ok(self, offset: int, segment_size: int) -> bool:
+        if offset + RECORD_HEADER.size > segment_size:
+            return False
+        length, crc = RECORD_HEADER.unpack(self._read_at(offset, RECORD_HEADER.size))
+        if offset + RECORD_HEADER.size + length > segment_size:
+            return False
+        return zlib.crc32(self._read_at(offset + RECORD_HEADER.size, length)) == crc
+
+    def _record_end(self, offset: int) -> int:
+        length, _ = RECORD_HEADER.unpack(self._read_at(offset, RECORD_HEADER.size))
+        return offset + RECORD_HEADER.size + length
+
+    # --- Reading ------------------------------------------------------------
+
+    def _remap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        size = os.path.getsize(self.path)
+        if size:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+    def read_raw(self, i: int) -> bytes:
+        """Returns the serialized bytes of block i without decoding it."""
+        with self._lock:
+            count = len(self._offsets)
+            if i < 0:
+                i += count
+            offset = self._offsets[i]
+            end = self._offsets[i + 1] if i + 1 < count else self._end
+            if self._mmap is None or end > len(self._mmap):
+                self._segment.flush()  # Make buffered appends visible, then map them
+                self._remap()
+            return self._mmap[offset + RECORD_HEADER.size:end]  # A copy: stays valid after a later remap
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        with self._lock:  # The tail and the offsets must not move between the check and the read
+            count = len(self._offsets)
+            if i < 0:
+                i += count
+            if not 0 <= i < count:
+                raise IndexError("block index out of range")
+            if i == count - 1 and self._tail_block is not None:
+                return self._tail_block
+            block = Block.deserialize(self.read_raw(i))
+            if i == count - 1:
+                self._tail_block = block
+            return block
+
+    def __iter__(self) -> Iterator[Block]:
+        for i in range(len(self._offsets)):
+            yield self[i]
+
+    # --- Writing ------------------------------------------------------------
+
+    def append(self, block: Block):
+        """Appends a block; durability is batched every `sync_every` appends."""
+        payload = block.serialize()
+        with self._lock:
+            self._segment.seek(0, os.SEEK_END)
+            offset = self._segment.tell()
+            self._segment.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            self._segment.write(payload)
+            self._offsets.append(offset)
+            self._end = offset + RECORD_HEADER.size + len(payload)
+            self._tail_block = block
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self.sync()
+
+    def sync(self):
+        """Makes every appended block durable: segment first, then the index."""
+        with self._lock:
+            if not self._unsynced:
+                return
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            indexed = os.path.getsize(self.index_path) // OFFSET_SIZE
+            self._index.seek(0, os.SEEK_END)
+            self._index.write(self._offsets[indexed:].tobytes())
+            self._index.flush()
+            os.fsync(self._index.fileno())
+            self._unsynced = 0
+
+    def truncate(self, count: int):
+        """Drops every block from position `count` on (both files, durably)."""
+        with self._lock:
+            if count >= len(self._offsets):
+                return
+            self.sync()
+            end = self._offsets[count]
+            del self._offsets[count:]
+            self._tail_block = None
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._segment.truncate(end)
+            self._end = end
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._index.truncate(count * OFFSET_SIZE)
+            self._index.flush()
+            os.fsync(self._index.fileno())
+            self._remap()
+
+    def close(self):
+        with self._lock:
+            self.sync()
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._segment.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+def read_raw_records(path: str, start: int, end: int) -> List[bytes]:
+    """
+    Reads serialized blocks [start, end) from a synced store without opening it
+    for writing (used by validator worker processes).
+    """
+    offsets = array("Q")
+    with open(path + ".idx", "rb") as f:
+        f.seek(start * OFFSET_SIZE)
+        offsets.frombytes(f.read((end - start) * OFFSET_SIZE))
+    records = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset in offsets:
+            length, _ = RECORD_HEADER.unpack_from(mapped, offset)
+            start_of_payload = offset + RECORD_HEADER.size
+            records.append(mapped[start_of_payload:start_of_payload + length])
+    return records
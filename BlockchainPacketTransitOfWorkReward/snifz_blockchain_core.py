@@ -1,15 +1,43 @@
 import hashlib
-import json
+import os
+import struct
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+from snifz_codec import encode, encode_into, decode_from
+from snifz_mempool import SnifZMempool
+from snifz_merkle import leaf_hash, merkle_proof, transactions_root, verify_proof
+from snifz_snapshot import read_snapshot, write_snapshot
+from snifz_chain_index import SnifZChainIndex
 
 # Define the Token Name and Symbol
 TOKEN_NAME = "Sniffing-Packeting"
 TOKEN_SYMBOL = "$@SNFZ@$"
 
+BLOCK_FORMAT_VERSION = 2  # v2: hash covers a header with the transactions' Merkle root
+BLOCK_HEADER = struct.Struct("<BQdq")  # format version, index, timestamp, nonce
+RAW_HASH_FLAG = 0x20  # prev_hash stored as 32 raw bytes instead of 64 hex chars
+HEADER_DIGESTS = struct.Struct("<32s32s")  # Merkle root of transactions, sha256 of traffic_data
+SNAPSHOT_INTERVAL = 1000  # Blocks between account-state snapshots (when the chain has a snapshot path)
+INDEX_SAVE_MIN = SNAPSHOT_INTERVAL  # Blocks the chain index must grow by before a snapshot also saves it
+
 class Block:
-    """Represents a block in the Sniffing-Packeting blockchain."""
+    """
+    Represents a block in the Sniffing-Packeting blockchain.
+
+    Blocks use __slots__ and keep transactions as a tuple. The block hash is
+    the SHA-256 of a small header (index, timestamp, nonce, prev_hash, the
+    Merkle root of the transactions and a digest of traffic_data), so a single
+    transaction can be proven with a header and a Merkle path (see snifz_merkle).
+    The header and hash are computed once (at seal time, or on first
+    compute_hash) and memoized; assigning any field afterwards invalidates them.
+    Nested transaction/traffic dicts are treated as frozen once the block is sealed.
+    """
+    __slots__ = ('index', 'timestamp', 'transactions', 'prev_hash', 'traffic_data', 'nonce',
+                 '_hash', '_header', '_pruned')
+
     def __init__(self, index, timestamp, transactions, prev_hash, traffic_data, nonce=0):
+        object.__setattr__(self, '_pruned', False)
         self.index = index
         self.timestamp = timestamp
         self.transactions = transactions # Transactions include block rewards
@@ -17,18 +45,228 @@ class Block:
         self.traffic_data = traffic_data # Packet I/O data used for PoT
         self.nonce = nonce
 
-    def compute_hash(self):
-        """Calculates the SHA-256 hash of the block's contents."""
-        block_string = json.dumps(self.__dict__, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+    def __setattr__(self, name, value):
+        if name == 'transactions':
+            value = tuple(value)
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_hash', None)
+        object.__setattr__(self, '_header', None)
 
-class SnifZBlockchain:
-    """The core decentralized ledger manager."""
+    def seal(self) -> str:
+        """Computes and memoizes the block hash once the block is complete."""
+        return self.compute_hash()
+
+    def compute_hash(self) -> str:
+        """Returns the SHA-256 hash of the block header (memoized)."""
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hashlib.sha256(self.header()).hexdigest())
+        return self._hash
+
+    def _build_header(self) -> bytes:
+        out = bytearray(BLOCK_HEADER.pack(BLOCK_FORMAT_VERSION, self.index, self.timestamp, self.nonce))
+        prev_hash = self.prev_hash
+        if len(prev_hash) == 64 and prev_hash == prev_hash.lower():
+            try:
+                raw = bytes.fromhex(prev_hash)
+            except ValueError:
+                raw = None
+            if raw is not None:
+                out.append(RAW_HASH_FLAG)
+                out += raw
+                prev_hash = None
+        if prev_hash is not None:
+            encode_into(out, prev_hash)
+        out += HEADER_DIGESTS.pack(transactions_root(self.transactions),
+                                   hashlib.sha256(encode(self.traffic_data)).digest())
+        return bytes(out)
+
+    def header(self) -> bytes:
+        """The hashed block header (as stored, for a deserialized block)."""
+        if self._header is None:
+            object.__setattr__(self, '_header', self._build_header())
+        return self._header
+
+    @property
+    def merkle_root(self) -> bytes:
+        return Block.parse_header(self.header())[2]
+
+    def verify_body(self) -> bool:
+        """True if the transactions and traffic_data match the digests in the header."""
+        return self.header() == self._build_header()
+
+    def serialize(self) -> bytes:
+        """Canonical binary encoding (header, traffic_data, transactions), used by the block store."""
+        out = bytearray(self.header())
+        encode_into(out, self.traffic_data)
+        encode_into(out, self.transactions)
+        return bytes(out)
+
+    @staticmethod
+    def parse_header(data) -> Tuple[int, str, bytes, bytes, int]:
+        """(index, prev_hash, merkle_root, traffic_digest, header length) of serialized block/header bytes."""
+        version, index = BLOCK_HEADER.unpack_from(data, 0)[:2]
+        if version != BLOCK_FORMAT_VERSION:
+            raise ValueError(f"Unsupported block format version {version}")
+        pos = BLOCK_HEADER.size
+        if data[pos] == RAW_HASH_FLAG:
+            prev_hash = bytes(data[pos + 1:pos + 33]).hex()
+            pos += 33
+        else:
+            prev_hash, pos = decode_from(data, pos)
+        root, traffic_digest = HEADER_DIGESTS.unpack_from(data, pos)
+        return index, prev_hash, root, traffic_digest, pos + HEADER_DIGESTS.size
+
+    @classmethod
+    def deserialize(cls, data) -> 'Block':
+        """Rebuilds a block previously encoded with serialize()."""
+        _, _, timestamp, nonce = BLOCK_HEADER.unpack_from(data, 0)
+        index, prev_hash, _, _, pos = cls.parse_header(data)
+        header = bytes(data[:pos])
+        traffic_data, pos = decode_from(data, pos)
+        transactions, pos = decode_from(data, pos)
+        block = cls(index, timestamp, transactions, prev_hash, traffic_data, nonce)
+        # Keep the stored header: the hash is taken over it, and verify_body() checks it against the body
+        object.__setattr__(block, '_header', header)
+        object.__setattr__(block, '_hash', hashlib.sha256(header).hexdigest())
+        return block
+
+    @classmethod
+    def from_header(cls, header: bytes) -> 'Block':
+        """Header-only (pruned) block: hash, links and timestamp survive, the body does not."""
+        _, _, timestamp, nonce = BLOCK_HEADER.unpack_from(header, 0)
+        index, prev_hash, _, _, _ = cls.parse_header(header)
+        block = cls(index, timestamp, (), prev_hash, None, nonce)
+        object.__setattr__(block, '_header', bytes(header))
+        object.__setattr__(block, '_hash', hashlib.sha256(header).hexdigest())
+        object.__setattr__(block, '_pruned', True)
+        return block
+
+    @property
+    def pruned(self) -> bool:
+        """True for header-only blocks (see from_header and SnifZBlockchain pruning)."""
+        return self._pruned
+
+    @staticmethod
+    def read_header(data) -> Tuple[int, str, str]:
+        """(index, prev_hash, hash) of a serialized block, without decoding its body."""
+        index, prev_hash, _, _, end = Block.parse_header(data)
+        return index, prev_hash, hashlib.sha256(data[:end]).hexdigest()
+
+class SnifZAccountState:
+    """Account balances and per-address history, maintained incrementally as blocks are appended."""
     def __init__(self):
-        self.chain: List[Block] = []
-        self.current_transactions: List[Dict[str, Any]] = []
+        self.balances: Dict[str, float] = {}
+        self.history: Dict[str, List[Tuple[int, int]]] = {} # address -> [(block index, tx position)]
+        self.sequences: Dict[str, int] = {} # address -> transfers sent so far (next transfer's sequence number)
+        self.height = 0 # Index of the last applied block
+
+    def apply_block(self, block: Block):
+        """Applies every transaction of a freshly appended block to the index."""
+        balances = self.balances
+        history = self.history
+        sequences = self.sequences
+        for position, tx in enumerate(block.transactions):
+            sender, recipient, amount = tx['sender'], tx['recipient'], tx['amount']
+            # Same ordering as the legacy full-chain scan, so float balances match exactly
+            balances[recipient] = balances.get(recipient, 0.0) + amount
+            balances[sender] = balances.get(sender, 0.0) - amount
+            if sender != "BLOCK_REWARD":
+                sequences[sender] = sequences.get(sender, 0) + 1
+            entry = (block.index, position)
+            history.setdefault(recipient, []).append(entry)
+            if sender != recipient:
+                history.setdefault(sender, []).append(entry)
+        self.height = block.index
+
+    def get_balance(self, address: str) -> float:
+        """O(1) balance lookup."""
+        return self.balances.get(address, 0.0)
+
+    def get_history(self, address: str) -> List[Tuple[int, int]]:
+        """Returns (block index, tx position) pairs touching the address, oldest first."""
+        return self.history.get(address, [])
+
+    def get_sequence(self, address: str) -> int:
+        return self.sequences.get(address, 0)
+
+    def rebuild(self, chain: List[Block]):
+        """Discards the index and replays the whole chain (startup path)."""
+        self.balances = {}
+        self.history = {}
+        self.sequences = {}
+        self.height = 0
+        for block in chain:
+            self.apply_block(block)
+
+    def export(self) -> Dict[str, Any]:
+        """Snapshot payload; history is flattened to (index, position, index, position, ...) per address."""
+        return {
+            "height": self.height,
+            "balances": self.balances,
+            "sequences": self.sequences,
+            "history": {address: tuple(value for entry in entries for value in entry)
+                        for address, entries in self.history.items()},
+        }
+
+    def load(self, state: Dict[str, Any]):
+        """Replaces the index with an export() payload."""
+        self.height = state["height"]
+        self.balances = dict(state["balances"])
+        self.sequences = dict(state["sequences"])
+        self.history = {address: list(zip(flat[::2], flat[1::2])) for address, flat in state["history"].items()}
+
+    def verify(self, chain: List[Block]) -> bool:
+        """Rebuilds a scratch index from the chain and compares it against this one."""
+        fresh = SnifZAccountState()
+        fresh.rebuild(chain)
+        return (fresh.height == self.height and fresh.balances == self.balances
+                and fresh.history == self.history and fresh.sequences == self.sequences)
+
+class SnifZBlockchain:
+    """
+    The core decentralized ledger manager.
+
+    With a snapshot path (by default next to the block store) the derived
+    account state is snapshotted every `snapshot_every` blocks; a restart loads
+    the latest snapshot and replays only the blocks after it. In prune mode an
+    in-memory chain replaces blocks covered by a snapshot with header-only
+    blocks (store-backed chains already keep bodies on disk only).
+
+    `index` (SnifZChainIndex) answers block-by-hash, by-winner and
+    by-time queries without scanning the chain. Store-backed chains persist
+    it next to the store (<store>.cidx) on close, and with a snapshot once it
+    has doubled since it was last saved; a restart loads it and indexes only
+    the newer blocks.
+    """
+    def __init__(self, store_path: Optional[str] = None, sync_every: int = 64,
+                 snapshot_path: Optional[str] = None, snapshot_every: int = SNAPSHOT_INTERVAL,
+                 prune: bool = False, index_path: Optional[str] = None):
+        # With a store_path the chain lives in an append-only block store and survives restarts;
+        # blocks are then decoded lazily on access instead of being held in memory.
+        if store_path:
+            from snifz_block_store import SnifZBlockStore
+            self.chain = SnifZBlockStore(store_path, sync_every=sync_every)
+        else:
+            self.chain: List[Block] = []
+        self.snapshot_path = snapshot_path or (store_path + ".snap" if store_path else None)
+        if prune and not self.snapshot_path:
+            raise ValueError("Pruning needs a snapshot_path: pruned blocks can only be dropped once snapshotted")
+        self.snapshot_every = snapshot_every if self.snapshot_path else 0  # Blocks between snapshots (0 = manual)
+        self.prune = prune
+        self.snapshot_height = 0  # Height covered by the latest snapshot
+        self.pruned_height = 0  # Blocks 1..pruned_height are header-only
+        self.validated_checkpoint: Optional[Tuple[int, str]] = None  # (height, hash) of the last clean validation
+        self.account_state = SnifZAccountState()
+        self.mempool = SnifZMempool(self.account_state)  # Pending transactions for the next block
         self.difficulty = 2  # PoT difficulty (e.g., number of leading zeros/packet complexity target)
-        self.create_genesis_block()
+        self.index = SnifZChainIndex(index_path or (store_path + ".cidx" if store_path else None))
+        if len(self.chain):
+            replayed = self._restore_state()
+            indexed = self._restore_index()
+            print(f"[{TOKEN_SYMBOL}] Chain loaded from {store_path}: {len(self.chain)} blocks "
+                  f"(snapshot at {self.snapshot_height}, replayed {replayed}, indexed {indexed})")
+        else:
+            self.create_genesis_block()
 
     def create_genesis_block(self):
         """Creates the first block in the chain (Block 0)."""
@@ -40,34 +278,223 @@ class SnifZBlockchain:
         )
         print(f"[{TOKEN_SYMBOL}] Genesis Block Created: {self.chain[0].compute_hash()}")
 
-    def new_block(self, nonce: int, prev_hash: str, traffic_data: Dict[str, Any]) -> Block:
-        """Adds a new block to the chain."""
+    def new_block(self, nonce: int, prev_hash: str, traffic_data: Dict[str, Any],
+                  timestamp: Optional[float] = None) -> Block:
+        """Adds a new block to the chain, stamped `timestamp` (the minting clock; wall-clock time by default)."""
+        transactions = self.mempool.take()  # Already a tuple, kept by the block as-is
         block = Block(
             index=len(self.chain) + 1,
-            timestamp=time.time(),
-            transactions=list(self.current_transactions),
+            timestamp=time.time() if timestamp is None else timestamp,
+            transactions=transactions,
             prev_hash=prev_hash or (self.chain[-1].compute_hash() if self.chain else '1'),
             traffic_data=traffic_data,
             nonce=nonce
         )
-        self.current_transactions = []
+        try:
+            return self.append_block(block)
+        except Exception:
+            self.mempool.restore(transactions)  # Not minted: the reward and transfers stay pending
+            raise
+
+    def append_block(self, block: Block) -> Block:
+        """
+        Appends a complete block (minted locally or received from a peer).
+        Only the position is checked here: the index must follow the tip and,
+        past genesis, prev_hash must be the tip's hash.
+        """
+        height = len(self.chain)
+        if block.index != height + 1:
+            raise ValueError(f"Block {block.index} does not follow the chain tip (height {height})")
+        if height and block.prev_hash != self.chain[-1].compute_hash():
+            raise ValueError(f"Block {block.index}: prev_hash does not link to block {height}")
+        block.seal()
         self.chain.append(block)
+        self.account_state.apply_block(block)
+        self.index.add(block)
+        if self.snapshot_every and block.index % self.snapshot_every == 0:
+            self.write_snapshot()
         return block
 
-    def new_transaction(self, sender: str, recipient: str, amount: float):
-        """Adds a new transaction (e.g., token transfer or block reward) to be included in the next block."""
-        self.current_transactions.append({
-            'sender': sender,
-            'recipient': recipient,
-            'amount': amount,
+    def block_hash(self, height: int) -> str:
+        """Hash of the block at `height` (1-based); stored blocks are hashed without decoding the body."""
+        read_raw = getattr(self.chain, 'read_raw', None)
+        if read_raw is not None and height < len(self.chain):
+            return Block.read_header(read_raw(height - 1))[2]
+        return self.chain[height - 1].compute_hash()
+
+    def truncate(self, height: int):
+        """Drops every block above `height` (fork switch during sync) and rebuilds the account state."""
+        if height < len(self.chain):
+            if height < self.pruned_height:
+                raise ValueError(f"Cannot roll back to block {height}: bodies up to {self.pruned_height} are pruned")
+            if hasattr(self.chain, 'truncate'):
+                self.chain.truncate(height)
+            else:
+                del self.chain[height:]
+            self.index.truncate(height)
+            self._restore_state()
+
+    # --- Snapshots ----------------------------------------------------------
+
+    def write_snapshot(self) -> int:
+        """
+        Snapshots the account state at the current tip (and the last validated
+        checkpoint), then prunes covered bodies in prune mode. Returns the file size.
+        """
+        if not self.snapshot_path:
+            raise ValueError("This chain has no snapshot_path")
+        if hasattr(self.chain, 'sync'):
+            self.chain.sync()  # A snapshot must never cover blocks that are not durable yet
+        height = len(self.chain)
+        size = write_snapshot(self.snapshot_path, {
+            "last_hash": self.chain[-1].compute_hash(),
+            "validated": self.validated_checkpoint,
+            "state": self.account_state.export(),
         })
+        self.snapshot_height = height
+        if self.index.path and height - self.index.persisted_height >= max(INDEX_SAVE_MIN,
+                                                                            self.index.persisted_height):
+            self.index.save(self.chain[-1].compute_hash())  # Geometric: O(1) amortized per block
+        if self.prune:
+            self._prune(height - 1)  # Keep the tip whole
+        return size
+
+    def _restore_state(self) -> int:
+        """Loads the latest snapshot if it matches this chain, then replays the rest. Returns blocks replayed."""
+        snapshot = read_snapshot(self.snapshot_path) if self.snapshot_path else None
+        start = 0
+        if snapshot is not None:
+            height = snapshot["state"]["height"]
+            if 0 < height <= len(self.chain) and self.block_hash(height) == snapshot["last_hash"]:
+                self.account_state.load(snapshot["state"])
+                start = height
+                validated = snapshot["validated"]
+                if validated and validated[0] <= height:
+                    self.validated_checkpoint = tuple(validated)
+            else:
+                print(f"[!] Snapshot {self.snapshot_path} does not match the chain; replaying every block.")
+        self.snapshot_height = start
+        if not start:
+            if self.pruned_height:
+                raise ValueError("Pruned chain without a usable snapshot: cannot rebuild the account state")
+            self.account_state.rebuild([])
+        for position in range(start, len(self.chain)):
+            self.account_state.apply_block(self.chain[position])
+        return len(self.chain) - start
+
+    def _restore_index(self) -> int:
+        """Loads the saved chain index if it matches the chain, then indexes the rest. Returns blocks indexed."""
+        loaded = self.index.load(len(self.chain), self.block_hash)
+        if not loaded and self.index.path and os.path.exists(self.index.path):
+            print(f"[!] Chain index {self.index.path} does not match the chain; rebuilding it.")
+        start = len(self.index)
+        self.index.rebuild(self.chain, start)
+        return len(self.chain) - start
+
+    def _prune(self, height: int):
+        if hasattr(self.chain, 'read_raw'):
+            return  # Store-backed: bodies are decoded on demand, nothing is held in memory
+        for position in range(self.pruned_height, max(self.pruned_height, height)):
+            self.chain[position] = Block.from_header(self.chain[position].header())
+        self.pruned_height = max(self.pruned_height, height)
+
+    # --- Indexed queries ----------------------------------------------------
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        """Height of the block with this hash, or None (O(log n), no chain scan)."""
+        for height in self.index.heights_for_hash(block_hash):
+            if self.block_hash(height) == block_hash:
+                return height
+        return None
+
+    def get_block_by_hash(self, block_hash: str) -> Optional[Block]:
+        height = self.height_of(block_hash)
+        return self.chain[height - 1] if height is not None else None
+
+    def get_blocks_won_by(self, address: str, offset: int = 0, count: Optional[int] = None) -> List[int]:
+        """Heights of the blocks whose reward went to `address`, oldest first (`count` from `offset`)."""
+        return self.index.won_by(address, offset, count)
+
+    def count_blocks_won_by(self, address: str) -> int:
+        return self.index.won_count(address)
+
+    def get_blocks_between(self, start: float, end: float, offset: int = 0, count: Optional[int] = None) -> List[int]:
+        """Heights of the blocks with start <= timestamp <= end, in timestamp order (`count` from `offset`)."""
+        return self.index.between(start, end, offset, count)
+
+    def count_blocks_between(self, start: float, end: float) -> int:
+        return self.index.between_count(start, end)
+
+    def get_address_transactions(self, address: str) -> List[Dict[str, Any]]:
+        """Returns every confirmed transaction sent or received by the address, oldest first."""
+        # Block indexes are 1-based (see new_block), so height h lives at chain[h - 1]
+        return [self.chain[index - 1].transactions[position]
+                for index, position in self.account_state.get_history(address)
+                if index > self.pruned_height]
+
+    def get_transaction_proof(self, block_index: int, position: int) -> Dict[str, Any]:
+        """
+        Compact inclusion proof for transaction `position` of block `block_index`:
+        {"block_index", "position", "transaction", "header", "path"}. The header
+        (~120 bytes) hashes to the block hash and carries the Merkle root; the
+        path holds one 33-byte step per tree level.
+        """
+        if not 1 <= block_index <= len(self.chain):
+            raise ValueError(f"No block {block_index} (chain height {len(self.chain)})")
+        block = self.chain[block_index - 1]
+        if block.pruned:
+            raise ValueError(f"Block {block_index} is pruned; its transactions are no longer available")
+        leaves = [leaf_hash(tx) for tx in block.transactions]
+        return {
+            "block_index": block_index,
+            "position": position,
+            "transaction": block.transactions[position] if 0 <= position < len(leaves) else None,
+            "header": block.header(),
+            "path": merkle_proof(leaves, position),
+        }
+
+    @staticmethod
+    def verify_transaction_proof(proof: Dict[str, Any], block_hash: Optional[str] = None) -> bool:
+        """
+        Checks a proof from get_transaction_proof without the block body. Pass the
+        block hash taken from a trusted header chain to also pin the header.
+        """
+        try:
+            index, _, root, _, end = Block.parse_header(proof["header"])
+        except (KeyError, ValueError, struct.error, IndexError):
+            return False
+        if index != proof.get("block_index") or end != len(proof["header"]):
+            return False
+        if block_hash is not None and hashlib.sha256(proof["header"]).hexdigest() != block_hash:
+            return False
+        return verify_proof(proof["transaction"], proof["path"], root)
+
+    def new_transaction(self, sender: str, recipient: str, amount: float):
+        """
+        Adds a new transaction (e.g., token transfer or block reward) to be included in the next block.
+        Raises ValueError if a transfer would overdraw the sender (see SnifZMempool).
+        """
+        self.mempool.add(sender, recipient, amount)
         return self.last_block.index + 1
 
+    def new_transactions(self, transactions: List[Dict[str, Any]]) -> List[str]:
+        """Queues a burst of transactions; returns a message for every rejected one."""
+        return self.mempool.add_many(transactions)
+
+    @property
+    def current_transactions(self) -> Tuple[Dict[str, Any], ...]:
+        """Pending transactions, in the order the next block will take them."""
+        return self.mempool.pending()
+
     @property
     def last_block(self):
         """Returns the last block in the chain."""
         return self.chain[-1]
 
-# Example Usage (To be integrated into GUI main loop):
-snifz_chain = SnifZBlockchain()
-# # Block creation logic will be driven by snifz_reward_logic.py
\ No newline at end of file
+    def close(self):
+        """Flushes and closes the block store, if the chain is persistent, and saves the chain index."""
+        tip_hash = self.chain[-1].compute_hash() if len(self.chain) else None
+        if hasattr(self.chain, 'close'):
+            self.chain.close()  # Syncs the store first: the saved index must not cover blocks that are not durable
+        if self.index.path and tip_hash and len(self.index) != self.index.persisted_height:
+            self.index.save(tip_hash)
@@ -0,0 +1,127 @@
+import multiprocessing
+import socket
+from collections import deque
+from typing import Dict, List, Optional
+
+from snifz_traffic_classifier import COUNTER_FIELDS
+from snifz_traffic_counters import SnifZTrafficCounters
+
+ALL_INTERFACES = "all"  # Pseudo-interface name used by the GUI's W9 selector
+
+
+def discover_interfaces(include_loopback: bool = False) -> List[str]:
+    """Lists the OS network interfaces that are up (loopback only if asked)."""
+    interfaces = []
+    for _, name in socket.if_nameindex():
+        if name == "lo" and not include_loopback:
+            continue
+        try:
+            with open(f"/sys/class/net/{name}/operstate") as f:
+                state = f.read().strip()
+        except OSError:
+            state = "unknown"
+        if state in ("up", "unknown"):  # Loopback and tun devices report "unknown"
+            interfaces.append(name)
+    return interfaces
+
+
+def _capture_worker(interface: str, backend: str, bpf_filter, shard, stop_event):
+    """Capture process body: one sniffer writing into a shared-memory counter shard."""
+    from snifz_packet_sniffer import SnifZPacketSniffer
+    sniffer = SnifZPacketSniffer(interface, backend=backend, bpf_filter=bpf_filter, counter_shard=shard)
+    sniffer.start_sniffing()
+    try:
+        while sniffer._is_sniffing and not stop_event.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    sniffer.stop_sniffing()
+
+
+class SnifZCaptureManager:
+    """
+    Captures on several interfaces at once, one worker process per interface,
+    so capture scales across cores instead of sharing one GIL.
+
+    Each worker writes monotonic counters into its own shared-memory array;
+    this process reads them through per-interface SnifZTrafficCounters and
+    merges them into a single PoT traffic record with a per-interface
+    breakdown. Exposes the same interface as SnifZPacketSniffer.
+    """
+    def __init__(self, interfaces: Optional[List[str]] = None, backend: str = "afpacket",
+                 bpf_filter=None, include_loopback: bool = False):
+        self.interfaces = list(interfaces) if interfaces else discover_interfaces(include_loopback)
+        self.interface = ALL_INTERFACES
+        self.backend = backend
+        self.bpf_filter = bpf_filter
+        self._is_sniffing = False
+        self._workers: Dict[str, multiprocessing.Process] = {}
+        self._stop_event = multiprocessing.Event()
+        self._shards = {name: multiprocessing.RawArray('Q', len(COUNTER_FIELDS)) for name in self.interfaces}
+        self.traffic: Dict[str, SnifZTrafficCounters] = {}
+        self.mint_windows = {}
+        self.ui_windows = {}
+        for name, shard in self._shards.items():
+            counters = SnifZTrafficCounters()
+            counters.add_shard(shard)
+            self.traffic[name] = counters
+            self.mint_windows[name] = counters.window()
+            self.ui_windows[name] = counters.window()
+        self.session_io_history = deque(maxlen=10) # Store recent block I/O
+
+    def start_sniffing(self):
+        """Starts one capture process per interface."""
+        if self._is_sniffing:
+            return
+        if not self.interfaces:
+            print("[!] Capture manager: no active interfaces found.")
+            return
+        self._is_sniffing = True
+        self._stop_event.clear()
+        print(f"[*] Starting multi-interface capture on: {', '.join(self.interfaces)} ({self.backend})...")
+        for name in self.interfaces:
+            worker = multiprocessing.Process(
+                target=_capture_worker, name=f"snifz-capture-{name}", daemon=True,
+                args=(name, self.backend, self.bpf_filter, self._shards[name], self._stop_event))
+            worker.start()
+            self._workers[name] = worker
+
+    def stop_sniffing(self):
+        """Signals every worker to stop and reaps them."""
+        self._is_sniffing = False
+        self._stop_event.set()
+        for worker in self._workers.values():
+            worker.join(timeout=2)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers.clear()
+        print("[*] Multi-interface capture stopped.")
+
+    @staticmethod
+    def _merge(per_interface: Dict[str, Dict[str, float]]) -> Dict[str, object]:
+        merged: Dict[str, object] = {field: sum(data[field] for data in per_interface.values())
+                                     for field in COUNTER_FIELDS}
+        merged["interfaces"] = per_interface
+        return merged
+
+    @property
+    def packets_in_count(self) -> int:
+        return sum(window.peek()["packets_in"] for window in self.mint_windows.values())
+
+    @property
+    def packets_out_count(self) -> int:
+        return sum(window.peek()["packets_out"] for window in self.mint_windows.values())
+
+    def get_current_traffic_data(self) -> Dict[str, object]:
+        """Resets and returns the merged mint-interval traffic, with a per-interface breakdown."""
+        data = self._merge({name: window.roll() for name, window in self.mint_windows.items()})
+        self.session_io_history.append(data)
+        return data
+
+    def interface_totals(self) -> Dict[str, List[int]]:
+        """Monotonic counters (indexed like COUNTER_FIELDS) per interface, for the traffic history."""
+        return {name: counters.totals() for name, counters in self.traffic.items()}
+
+    def get_live_traffic_data(self) -> Dict[str, object]:
+        """Merged per-second rates since the previous call."""
+        return self._merge({name: window.roll_rates() for name, window in self.ui_windows.items()})
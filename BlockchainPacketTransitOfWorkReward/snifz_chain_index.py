@@ -0,0 +1,314 @@
+import heapq
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+from snifz_snapshot import read_snapshot, write_snapshot
+
+INDEX_FORMAT = 1
+MERGE_MIN = 4096  # Pending entries before the first merge into the sorted arrays
+NO_WINNER = 0  # Winner id of blocks without a block reward (genesis, header-only blocks)
+
+
+def hash_key(block_hash: str) -> int:
+    """The 64-bit key a block hash is indexed under (its first 8 bytes)."""
+    return int(block_hash[:16], 16)
+
+
+class _SortedColumn:
+    """
+    A sorted (key, height) column with cheap appends: new entries go to a
+    pending area, which is merged into the sorted arrays once it outgrows them
+    (so every entry is re-sorted O(log n) times over the column's life). The
+    pending area is sorted lazily on the first query after appends. Keys
+    that arrive in order (timestamps) go straight to the sorted arrays.
+    """
+    __slots__ = ('typecode', 'keys', 'heights', 'pending_keys', 'pending_heights', '_sorted_pending')
+
+    def __init__(self, typecode: str):
+        self.typecode = typecode
+        self.keys = array(typecode)
+        self.heights = array('I')
+        self.pending_keys = array(typecode)
+        self.pending_heights = array('I')
+        self._sorted_pending: Optional[Tuple[list, list]] = None
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.pending_keys)
+
+    def add(self, key, height: int):
+        if not self.pending_keys and (not self.keys or key >= self.keys[-1]):
+            self.keys.append(key)  # In order (the usual case for timestamps): already sorted
+            self.heights.append(height)
+            return
+        self.pending_keys.append(key)
+        self.pending_heights.append(height)
+        if self._sorted_pending is not None:
+            position = bisect_right(self._sorted_pending[0], key)
+            self._sorted_pending[0].insert(position, key)
+            self._sorted_pending[1].insert(position, height)
+        if len(self.pending_keys) > max(MERGE_MIN, len(self.keys)):
+            self.merge()
+
+    def merge(self):
+        if not self.pending_keys:
+            return
+        pending = self.pending_keys
+        in_order = all(pending[i] <= pending[i + 1] for i in range(len(pending) - 1))
+        if in_order and (not self.keys or self.keys[-1] <= pending[0]):
+            self.keys.extend(pending)
+            self.heights.extend(self.pending_heights)
+        else:
+            keys, heights = self.keys + pending, self.heights + self.pending_heights
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self.keys = array(self.typecode, map(keys.__getitem__, order))
+            self.heights = array('I', map(heights.__getitem__, order))
+        self.pending_keys = array(self.typecode)
+        self.pending_heights = array('I')
+        self._sorted_pending = None
+
+    def load(self, keys: array, heights: array):
+        """Replaces the column with already sorted arrays."""
+        self.keys, self.heights = keys, heights
+        self.pending_keys = array(self.typecode)
+        self.pending_heights = array('I')
+        self._sorted_pending = None
+
+    def _pending_sorted(self) -> Tuple[list, list]:
+        if self._sorted_pending is None:
+            order = sorted(range(len(self.pending_keys)), key=self.pending_keys.__getitem__)
+            self._sorted_pending = ([self.pending_keys[i] for i in order], [self.pending_heights[i] for i in order])
+        return self._sorted_pending
+
+    def _ranges(self, low, high) -> Tuple[int, int, int, int]:
+        """Bisected [start, end) of the matching entries in the sorted arrays and in the pending area."""
+        start, end = bisect_left(self.keys, low), bisect_right(self.keys, high)
+        if not self.pending_keys:
+            return start, end, 0, 0
+        keys = self._pending_sorted()[0]
+        return start, end, bisect_left(keys, low), bisect_right(keys, high)
+
+    def count(self, low, high) -> int:
+        """How many entries have low <= key <= high (O(log n))."""
+        start, end, pending_start, pending_end = self._ranges(low, high)
+        return end - start + pending_end - pending_start
+
+    def find(self, low, high, offset: int = 0, count: Optional[int] = None) -> List[int]:
+        """
+        Heights of the entries with low <= key <= high in key order, `count`
+        of them from position `offset`. Only the requested page is materialized.
+        """
+        start, end, pending_start, pending_end = self._ranges(low, high)
+        stop = None if count is None else offset + count
+        if stop is not None:
+            end = min(end, start + stop)  # No page reaches past the first `stop` matches of either part
+        if pending_start == pending_end:
+            return self.heights[start + offset:end].tolist()
+        keys, heights = self._pending_sorted()
+        if stop is not None:
+            pending_end = min(pending_end, pending_start + stop)
+        merged = heapq.merge(zip(self.keys[start:end], self.heights[start:end]),
+                             zip(keys[pending_start:pending_end], heights[pending_start:pending_end]))
+        return [height for _, height in islice(merged, offset, stop)]
+
+    def truncate(self, height: int):
+        """Drops every entry above `height`."""
+        if any(h > height for h in self.pending_heights):
+            kept = [i for i, h in enumerate(self.pending_heights) if h <= height]
+            self.pending_keys = array(self.typecode, (self.pending_keys[i] for i in kept))
+            self.pending_heights = array('I', (self.pending_heights[i] for i in kept))
+            self._sorted_pending = None
+        if self.heights and max(self.heights) > height:
+            kept = [i for i, h in enumerate(self.heights) if h <= height]
+            self.keys = array(self.typecode, (self.keys[i] for i in kept))
+            self.heights = array('I', (self.heights[i] for i in kept))
+
+
+class SnifZChainIndex:
+    """
+    Secondary indexes over SnifZBlockchain.chain, maintained as blocks are
+    appended (append_block, so both minted and synced blocks) and rolled back
+    with truncate():
+
+      - hash -> height: 64-bit hash prefixes in a sorted column, confirmed
+        against the full hash of the candidate block (O(log n));
+      - winner -> heights: every block whose reward an address received (O(1));
+      - timestamp -> heights: a sorted timestamp column for time windows
+        (O(log n) plus the blocks returned).
+
+    Everything is kept in typed arrays (about 48 bytes per block), and the
+    per-height columns are what gets persisted: load() restores them and the
+    sorted arrays in bulk, then only the blocks appended since are indexed.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.hash_keys = array('Q')  # Per height (position = height - 1)
+        self.timestamps = array('d')
+        self.winner_ids = array('I')
+        self.winners: List[Optional[str]] = [None]  # Winner id -> address (id 0: no winner)
+        self._winner_id: Dict[str, int] = {}
+        self._won: Dict[int, array] = {}  # Winner id -> heights, ascending
+        self._by_hash = _SortedColumn('Q')
+        self._by_time = _SortedColumn('d')
+        self.persisted_height = 0
+
+    def __len__(self) -> int:
+        return len(self.hash_keys)
+
+    @property
+    def height(self) -> int:
+        return len(self.hash_keys)
+
+    # --- Maintenance --------------------------------------------------------
+
+    @staticmethod
+    def block_winner(block) -> Optional[str]:
+        """Recipient of the block reward, if the block carries one."""
+        for tx in block.transactions:
+            if tx['sender'] == "BLOCK_REWARD":
+                return tx['recipient']
+        return None
+
+    def add(self, block):
+        """Indexes the block at height len(self) + 1."""
+        height = len(self.hash_keys) + 1
+        if block.index != height:
+            raise ValueError(f"Chain index is at height {height - 1}; cannot index block {block.index}")
+        key = hash_key(block.compute_hash())
+        self.hash_keys.append(key)
+        self.timestamps.append(block.timestamp)
+        self._by_hash.add(key, height)
+        self._by_time.add(block.timestamp, height)
+        winner = self.block_winner(block)
+        winner_id = NO_WINNER
+        if winner is not None:
+            winner_id = self._winner_id.get(winner)
+            if winner_id is None:
+                winner_id = self._winner_id[winner] = len(self.winners)
+                self.winners.append(winner)
+                self._won[winner_id] = array('I')
+            self._won[winner_id].append(height)
+        self.winner_ids.append(winner_id)
+
+    def truncate(self, height: int):
+        """Forgets every block above `height` (chain rollback)."""
+        if height >= len(self.hash_keys):
+            return
+        for position in range(len(self.hash_keys) - 1, height - 1, -1):
+            winner_id = self.winner_ids[position]
+            if winner_id != NO_WINNER:
+                self._won[winner_id].pop()
+        del self.hash_keys[height:], self.timestamps[height:], self.winner_ids[height:]
+        self._by_hash.truncate(height)
+        self._by_time.truncate(height)
+        self.persisted_height = min(self.persisted_height, height)
+
+    def rebuild(self, chain, start: int = 0):
+        """Indexes chain[start:] (everything after a loaded index, or the whole chain)."""
+        for position in range(start, len(chain)):
+            self.add(chain[position])
+        self._by_hash.merge()
+        self._by_time.merge()
+
+    # --- Queries ------------------------------------------------------------
+
+    def heights_for_hash(self, block_hash: str) -> List[int]:
+        """Candidate heights for a hash (its 64-bit prefix); callers confirm the full hash."""
+        try:
+            key = hash_key(block_hash)
+        except ValueError:
+            return []
+        return self._by_hash.find(key, key)
+
+    def won_by(self, address: str, offset: int = 0, count: Optional[int] = None) -> List[int]:
+        """Heights of the blocks whose reward went to `address`, ascending, `count` from position `offset`."""
+        winner_id = self._winner_id.get(address)
+        if winner_id is None:
+            return []
+        return self._won[winner_id][offset:None if count is None else offset + count].tolist()
+
+    def won_count(self, address: str) -> int:
+        winner_id = self._winner_id.get(address)
+        return len(self._won[winner_id]) if winner_id is not None else 0
+
+    def between(self, start: float, end: float, offset: int = 0, count: Optional[int] = None) -> List[int]:
+        """
+        Heights of the blocks with start <= timestamp <= end in timestamp order
+        (chain order unless a block was stamped earlier than its parent),
+        `count` from position `offset`.
+        """
+        return self._by_time.find(start, end, offset, count)
+
+    def between_count(self, start: float, end: float) -> int:
+        return self._by_time.count(start, end)
+
+    # --- Persistence --------------------------------------------------------
+
+    def save(self, tip_hash: str) -> int:
+        """Writes the index (atomically, like snapshots); returns the file size."""
+        if not self.path:
+            raise ValueError("This chain index has no path")
+        self._by_hash.merge()
+        self._by_time.merge()
+        size = write_snapshot(self.path, {
+            "format": INDEX_FORMAT,
+            "height": len(self.hash_keys),
+            "tip": tip_hash,
+            "hash_keys": self.hash_keys.tobytes(),
+            "timestamps": self.timestamps.tobytes(),
+            "winner_ids": self.winner_ids.tobytes(),
+            "winners": self.winners[1:],
+            "hash_order": self._by_hash.heights.tobytes(),
+            "time_order": self._by_time.heights.tobytes(),
+        })
+        self.persisted_height = len(self.hash_keys)
+        return size
+
+    def load(self, chain_height: int, block_hash) -> bool:
+        """
+        Restores a saved index if it is consistent with the chain: the hash of
+        its last block must match `block_hash(height)`. An index that is ahead
+        of the chain (a crash lost the chain's unsynced tail) is cut back to the
+        chain height first. False if there is nothing usable; the caller then rebuilds.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        saved = read_snapshot(self.path)
+        if saved is None or saved.get("format") != INDEX_FORMAT:
+            return False
+        try:
+            hash_keys, timestamps, winner_ids = array('Q'), array('d'), array('I')
+            hash_keys.frombytes(saved["hash_keys"])
+            timestamps.frombytes(saved["timestamps"])
+            winner_ids.frombytes(saved["winner_ids"])
+            hash_order, time_order = array('I'), array('I')
+            hash_order.frombytes(saved["hash_order"])
+            time_order.frombytes(saved["time_order"])
+            height = min(saved["height"], chain_height)
+            if not len(hash_keys) == len(timestamps) == len(winner_ids) == len(hash_order) == len(time_order):
+                return False
+            if height == 0 or hash_key(block_hash(height)) != hash_keys[height - 1]:
+                return False
+            winners = [None] + list(saved["winners"])
+        except (KeyError, ValueError, IndexError, TypeError):
+            return False
+        self.hash_keys, self.timestamps, self.winner_ids, self.winners = hash_keys, timestamps, winner_ids, winners
+        self._winner_id = {address: winner_id for winner_id, address in enumerate(winners) if winner_id}
+        self._won = {winner_id: array('I') for winner_id in self._winner_id.values()}
+        for position, winner_id in enumerate(winner_ids):
+            if winner_id != NO_WINNER:
+                self._won[winner_id].append(position + 1)
+        self._by_hash.load(array('Q', (hash_keys[h - 1] for h in hash_order)), hash_order)
+        self._by_time.load(array('d', (timestamps[h - 1] for h in time_order)), time_order)
+        self.persisted_height = len(hash_keys)
+        self.truncate(height)
+        return True
+
+    @property
+    def memory_bytes(self) -> int:
+        arrays = [self.hash_keys, self.timestamps, self.winner_ids, *self._won.values()]
+        for column in (self._by_hash, self._by_time):
+            arrays += [column.keys, column.heights, column.pending_keys, column.pending_heights]
+        return sum(len(a) * a.itemsize for a in arrays)
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from snifz_blockchain_core import Block, SnifZBlockchain, TOKEN_SYMBOL
+from snifz_chain_validator import check_block_rules
+from snifz_peer_gossip import (SnifZGossipNode, SnifZPeerConnection,
+                               MAX_HEADERS_PER_REPLY, MAX_BLOCKS_PER_REPLY)
+
+HEADER_REQUESTS_IN_FLIGHT = 8  # Pipelined header requests to the sync peer
+BODY_BATCH = 250  # Blocks per body request (capped by MAX_BLOCKS_PER_REPLY)
+BATCHES_AHEAD_PER_PEER = 4  # How far body downloads may run ahead of the block being applied
+
+
+class SnifZChainSync:
+    """
+    Headers-first chain sync over the gossip layer.
+
+      1. Ask every peer for its tip and pick the highest one above ours.
+      2. Find the common ancestor with that peer (normally our own tip, which
+         is what makes an interrupted sync resume where it stopped) and pull
+         the header chain (index, prev_hash, hash) above it, checking links.
+      3. Fetch block bodies in batches from every peer at that height, in
+         parallel. Batches are applied strictly in order as they arrive: every
+         block must hash to its header and pass the validator's block rules
+         before the batch is appended. A bad or missing batch is refetched
+         from another peer and the peer that served it is dropped. With
+         deterministic=True every block must carry its PoT candidates and
+         its winner is recomputed (see verify_pot_block).
+
+    The node service starts syncs and waits for them, so blocks are never
+    appended from two threads at once; announced blocks are its business.
+    Headers are kept as packed 32-byte hashes, so a million-block sync holds
+    ~32 MB of headers; bodies are never buffered beyond the download window.
+    """
+    def __init__(self, blockchain: SnifZBlockchain, node: SnifZGossipNode,
+                 body_batch: int = BODY_BATCH, batches_ahead: int = BATCHES_AHEAD_PER_PEER,
+                 timeout: float = 30.0, deterministic: bool = False):
+        self.blockchain = blockchain
+        self.node = node
+        self.body_batch = max(1, min(body_batch, MAX_BLOCKS_PER_REPLY))
+        self.batches_ahead = max(1, batches_ahead)
+        self.timeout = timeout
+        self.deterministic = deterministic
+        self.syncing = False
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    # --- Local chain helpers ------------------------------------------------
+
+    def _local_hash(self, height: int) -> str:
+        return self.blockchain.block_hash(height)
+
+    # --- Sync ---------------------------------------------------------------
+
+    async def sync(self, exclude: Collection[str] = ()) -> Dict[str, Any]:
+        """
+        Syncs to the best peer's tip, ignoring the peers (node addresses) in
+        `exclude`, and returns a report: {"synced", "height", "target",
+        "peers", "sources", "seconds", "blocks_per_sec"}; `sources` are the
+        addresses of the peers at the target height.
+        """
+        if self.syncing:
+            return {"synced": 0, "height": len(self.blockchain.chain), "target": None,
+                    "peers": 0, "sources": [], "seconds": 0.0, "blocks_per_sec": 0.0}
+        self.syncing = True
+        started = time.perf_counter()
+        synced, target, peers = 0, None, []
+        try:
+            peers, target = await self._best_peers(exclude)
+            if peers:
+                ancestor = await self._find_ancestor(peers[0])
+                hashes = await self._download_headers(peers[0], ancestor, target)
+                if hashes:
+                    if ancestor < len(self.blockchain.chain):
+                        print(f"[!] Sync: switching to a longer chain, dropping blocks above {ancestor}")
+                        self.blockchain.truncate(ancestor)
+                    synced = await self._download_bodies(peers, ancestor + 1, hashes)
+        except (asyncio.TimeoutError, ConnectionError, ValueError) as e:
+            print(f"[!] Sync interrupted: {e!r}; the next sync resumes from block {len(self.blockchain.chain)}.")
+        finally:
+            if hasattr(self.blockchain.chain, 'sync'):
+                self.blockchain.chain.sync()
+            self.syncing = False
+        seconds = time.perf_counter() - started
+        self.last_report = {
+            "synced": synced,
+            "height": len(self.blockchain.chain),
+            "target": target,
+            "peers": len(peers),
+            "sources": [peer.remote_address for peer in peers],
+            "seconds": seconds,
+            "blocks_per_sec": synced / seconds if seconds else 0.0,
+        }
+        if synced:
+            print(f"[{TOKEN_SYMBOL}] Synced {synced} blocks from {len(peers)} peers "
+                  f"({self.last_report['blocks_per_sec']:,.0f} blocks/s), height {len(self.blockchain.chain)}")
+        return self.last_report
+
+    async def _best_peers(self, exclude: Collection[str] = ()) -> Tuple[List[SnifZPeerConnection], Optional[int]]:
+        """Peers at the highest advertised height, if that is above ours (the first one serves headers)."""
+        peers = [peer for address, peer in list(self.node.peers.items()) if address not in exclude]
+        tips = await asyncio.gather(*(peer.request_tip(self.timeout) for peer in peers), return_exceptions=True)
+        heights = {peer: tip[0] for peer, tip in zip(peers, tips) if not isinstance(tip, BaseException)}
+        target = max(heights.values(), default=0)
+        if target <= len(self.blockchain.chain):
+            return [], None
+        best_hash = next(peer.tip[1] for peer, height in heights.items() if height == target)
+        return [peer for peer, height in heights.items() if peer.tip == (target, best_hash)], target
+
+    async def _remote_hash(self, peer: SnifZPeerConnection, height: int) -> Optional[str]:
+        headers = await peer.get_headers(height, 1, self.timeout)
+        return headers[0][2] if headers else None
+
+    async def _find_ancestor(self, peer: SnifZPeerConnection) -> int:
+        """Highest height where our chain and the peer's agree (0 if even genesis differs)."""
+        height = len(self.blockchain.chain)
+        step, mismatch = 1, height + 1
+        probe = height
+        while probe >= 1:  # Walk back exponentially from our tip...
+            if await self._remote_hash(peer, probe) == self._local_hash(probe):
+                break
+            mismatch = probe
+            probe, step = probe - step, step * 2
+        low = max(probe, 0)
+        while mismatch - low > 1:  # ...then bisect between the last match and the first mismatch
+            middle = (low + mismatch) // 2
+            if await self._remote_hash(peer, middle) == self._local_hash(middle):
+                low = middle
+            else:
+                mismatch = middle
+        return low
+
+    async def _download_headers(self, peer: SnifZPeerConnection, ancestor: int, target: int) -> bytearray:
+        """Header hashes for heights ancestor+1 .. target, packed 32 bytes each, link-checked."""
+        hashes = bytearray()
+        prev_hash = self._local_hash(ancestor) if ancestor else None
+        height = ancestor + 1
+        while height <= target:
+            starts = range(height, target + 1, MAX_HEADERS_PER_REPLY)[:HEADER_REQUESTS_IN_FLIGHT]
+            replies = await asyncio.gather(*(peer.get_headers(start, MAX_HEADERS_PER_REPLY, self.timeout)
+                                             for start in starts))
+            for headers in replies:
+                for index, header_prev_hash, block_hash in headers:
+                    if index != height:
+                        raise ValueError(f"header {index} out of order (expected {height})")
+                    if prev_hash is not None and header_prev_hash != prev_hash:
+                        raise ValueError(f"header {index} does not link to header {index - 1}")
+                    hashes += bytes.fromhex(block_hash)
+                    prev_hash = block_hash
+                    height += 1
+                if len(headers) < MAX_HEADERS_PER_REPLY:  # The peer's chain ends here
+                    return hashes
+        return hashes
+
+    def _check_batch(self, start: int, raws, hashes: bytearray, first: int) -> List[Block]:
+        """Decodes a body batch and checks it against the headers and block rules; raises ValueError."""
+        blocks = []
+        chain = self.blockchain.chain
+        prev_timestamp = chain[-1].timestamp if len(chain) else float("-inf")
+        for offset, raw in enumerate(raws):
+            height = start + offset
+            block = Block.deserialize(raw)  # Hash comes from the received bytes
+            position = (height - first) * 32
+            if bytes.fromhex(block.compute_hash()) != hashes[position:position + 32]:
+                raise ValueError(f"block {height} does not match its header")
+            errors = check_block_rules(block, height - 1, self.deterministic)
+            if errors:
+                raise ValueError(errors[0])
+            if block.timestamp < prev_timestamp:
+                raise ValueError(f"block {height}: timestamp goes backwards")
+            prev_timestamp = block.timestamp
+            blocks.append(block)
+        return blocks
+
+    async def _download_bodies(self, peers: List[SnifZPeerConnection], first: int, hashes: bytearray) -> int:
+        """Fetches heights first .. first+len(hashes)/32-1 in parallel and applies them in order."""
+        end = first + len(hashes) // 32
+        pending = deque(range(first, end, self.body_batch))
+        arrived: Dict[int, Tuple[SnifZPeerConnection, Any]] = {}
+        window = self.batches_ahead * len(peers) * self.body_batch
+        state = {"next": first, "active": len(peers)}
+        changed = asyncio.Condition()
+
+        async def fetch(peer: SnifZPeerConnection):
+            try:
+                while True:
+                    async with changed:
+                        await changed.wait_for(lambda: not pending or pending[0] < state["next"] + window
+                                               or peer.closed)
+                        if not pending or peer.closed:
+                            return
+                        start = pending.popleft()
+                    count = min(self.body_batch, end - start)
+                    try:
+                        raws = await peer.get_blocks(start, count, self.timeout)
+                    except (asyncio.TimeoutError, ConnectionError):
+                        raws = None
+                    async with changed:
+                        if raws is None or len(raws) != count:
+                            pending.appendleft(start)  # Someone else gets it; this peer is done
+                            changed.notify_all()
+                            return
+                        arrived[start] = (peer, raws)
+                        changed.notify_all()
+            finally:
+                async with changed:
+                    state["active"] -= 1
+                    changed.notify_all()
+
+        workers = [asyncio.ensure_future(fetch(peer)) for peer in peers]
+        applied = 0
+        try:
+            while state["next"] < end:
+                async with changed:
+                    await changed.wait_for(lambda: state["next"] in arrived or not state["active"])
+                    if state["next"] not in arrived:
+                        print(f"[!] Sync: no peer could serve block {state['next']}; stopping here.")
+                        break
+                    peer, raws = arrived.pop(state["next"])
+                try:
+                    blocks = self._check_batch(state["next"], raws, hashes, first)
+                except ValueError as e:
+                    print(f"[!] Sync: dropping peer {peer.remote_address}: {e}")
+                    await peer.close()
+                    async with changed:
+                        pending.appendleft(state["next"])
+                        changed.notify_all()
+                    continue
+                for block in blocks:
+                    self.blockchain.append_block(block)  # Also checks the link to the current tip
+                applied += len(blocks)
+                async with changed:
+                    state["next"] += len(blocks)
+                    changed.notify_all()
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return applied
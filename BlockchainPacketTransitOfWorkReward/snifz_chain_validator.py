@@ -0,0 +1,161 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from snifz_blockchain_core import Block, SnifZBlockchain
+from sniff_reward_logic import TOKEN_REWARD_AMOUNT
+from snifz_pot_scoring import verify_pot_block
+
+GENESIS_PREV_HASH = '1'
+VALIDATION_CHUNK_SIZE = 20000  # Blocks per worker task; smaller chains are validated inline
+
+
+def check_block_rules(block: Block, position: int, deterministic: bool = False) -> List[str]:
+    """
+    Checks the rules that only depend on the block itself. With deterministic=True
+    (a node in deterministic PoT mode) every block past genesis must carry its
+    PoT candidates, so the lottery winner is always re-checked.
+    """
+    errors = []
+    if not block.verify_body():
+        errors.append(f"Block {block.index}: transactions or traffic data do not match the header")
+    if block.index != position + 1:
+        errors.append(f"Block {block.index}: index does not match chain position {position + 1}")
+    rewards = [tx for tx in block.transactions if tx['sender'] == "BLOCK_REWARD"]
+    if position == 0:
+        if block.prev_hash != GENESIS_PREV_HASH:
+            errors.append(f"Block {block.index}: genesis prev_hash must be '{GENESIS_PREV_HASH}'")
+        if rewards:
+            errors.append(f"Block {block.index}: genesis block must not mint a reward")
+    elif len(rewards) != 1:
+        errors.append(f"Block {block.index}: expected exactly one BLOCK_REWARD, found {len(rewards)}")
+    elif rewards[0]['amount'] != TOKEN_REWARD_AMOUNT:
+        errors.append(f"Block {block.index}: BLOCK_REWARD of {rewards[0]['amount']} != {TOKEN_REWARD_AMOUNT}")
+    pot_error = verify_pot_block(block, required=deterministic and position > 0)  # Recompute the lottery
+    if pot_error:
+        errors.append(pot_error)
+    return errors
+
+
+def _validate_range(start: int, records: Sequence[bytes]) -> Dict[str, Any]:
+    """
+    Validates a contiguous run of serialized blocks starting at chain position `start`.
+    Runs in a worker process; links to neighbouring ranges are checked by the caller.
+    """
+    errors: List[str] = []
+    prev: Optional[Block] = None
+    first = last = None
+    for offset, raw in enumerate(records):
+        block = Block.deserialize(raw)
+        block_hash = block.compute_hash()  # Hash of the stored bytes
+        errors.extend(check_block_rules(block, start + offset))
+        if prev is not None:
+            if block.prev_hash != last[1]:
+                errors.append(f"Block {block.index}: prev_hash does not link to block {prev.index}")
+            if block.timestamp < prev.timestamp:
+                errors.append(f"Block {block.index}: timestamp goes backwards")
+        else:
+            first = (block.index, block.prev_hash, block.timestamp)
+        prev = block
+        last = (block.index, block_hash, block.timestamp)
+    return {"first": first, "last": last, "errors": errors}
+
+
+def _validate_store_range(path: str, start: int, end: int) -> Dict[str, Any]:
+    """Worker entry for persistent chains: maps the segment itself instead of receiving bytes."""
+    from snifz_block_store import read_raw_records
+    return _validate_range(start, read_raw_records(path, start, end))
+
+
+class SnifZChainValidator:
+    """
+    Full and incremental chain validation (hash links, index continuity,
+    timestamp monotonicity, the single BLOCK_REWARD per block and, for blocks
+    minted in deterministic PoT mode, the lottery winner).
+
+    Long chains are split into ranges that are decoded and hashed in a process
+    pool; only the range boundaries are linked in this process. After a clean
+    run the validator remembers a checkpoint so the next run only covers the
+    blocks appended since.
+    """
+    def __init__(self, blockchain: SnifZBlockchain, workers: Optional[int] = None,
+                 chunk_size: int = VALIDATION_CHUNK_SIZE):
+        self.blockchain = blockchain
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        # (validated block count, hash of last validated block); restored from the chain's snapshot if any
+        self.checkpoint: Optional[Tuple[int, str]] = getattr(blockchain, 'validated_checkpoint', None)
+
+    def _ranges(self, start: int, end: int) -> List[Tuple[int, int]]:
+        return [(i, min(i + self.chunk_size, end)) for i in range(start, end, self.chunk_size)]
+
+    def _run_ranges(self, start: int, end: int) -> List[Dict[str, Any]]:
+        chain = self.blockchain.chain
+        ranges = self._ranges(start, end)
+        store_path = getattr(chain, 'path', None)
+
+        def records(lo, hi):
+            if store_path:
+                return [chain.read_raw(i) for i in range(lo, hi)]
+            return [chain[i].serialize() for i in range(lo, hi)]
+
+        if len(ranges) <= 1 or self.workers <= 1:
+            return [_validate_range(lo, records(lo, hi)) for lo, hi in ranges]
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(ranges))) as pool:
+            if store_path:
+                chain.sync()  # Workers read the on-disk index
+                futures = [pool.submit(_validate_store_range, store_path, lo, hi) for lo, hi in ranges]
+            else:
+                futures = [pool.submit(_validate_range, lo, records(lo, hi)) for lo, hi in ranges]
+            return [future.result() for future in futures]
+
+    def validate_chain(self, incremental: bool = True) -> Dict[str, Any]:
+        """
+        Validates the chain and returns a report:
+        {"valid", "checked", "errors", "checkpoint", "seconds"}.
+        With incremental=True only blocks after the last checkpoint are checked.
+        """
+        started = time.perf_counter()
+        chain = self.blockchain.chain
+        end = len(chain)
+        start = 0
+        prev_link: Optional[Tuple[str, float]] = None  # (hash, timestamp) of the block before `start`
+        if incremental and self.checkpoint and self.checkpoint[0] <= end:
+            height, checkpoint_hash = self.checkpoint
+            anchor = chain[height - 1]
+            if anchor.compute_hash() == checkpoint_hash:
+                start = height
+                prev_link = (checkpoint_hash, anchor.timestamp)
+        pruned = getattr(self.blockchain, 'pruned_height', 0)
+        if start < pruned:  # Header-only blocks cannot be re-checked; trust them up to the last pruned one
+            anchor = chain[pruned - 1]
+            start = pruned
+            prev_link = (anchor.compute_hash(), anchor.timestamp)
+
+        errors: List[str] = []
+        for result in self._run_ranges(start, end):
+            errors.extend(result["errors"])
+            if result["first"] is None:
+                continue
+            first_index, first_prev_hash, first_timestamp = result["first"]
+            if prev_link is not None:
+                if first_prev_hash != prev_link[0]:
+                    errors.append(f"Block {first_index}: prev_hash does not link to block {first_index - 1}")
+                if first_timestamp < prev_link[1]:
+                    errors.append(f"Block {first_index}: timestamp goes backwards")
+            _, last_hash, last_timestamp = result["last"]
+            prev_link = (last_hash, last_timestamp)
+
+        valid = not errors
+        if valid and end:
+            self.checkpoint = (end, prev_link[0])
+            self.blockchain.validated_checkpoint = self.checkpoint  # Recorded in the next snapshot
+        return {
+            "valid": valid,
+            "checked": end - start,
+            "errors": errors,
+            "checkpoint": self.checkpoint,
+            "seconds": time.perf_counter() - started,
+        }
@@ -0,0 +1,150 @@
+import struct
+from typing import Any, Dict, Tuple
+
+# Compact, deterministic binary encoding shared by blocks, the block store and
+# anything else that needs canonical bytes (hashing, wire formats).
+#
+# Every value is a one-byte tag followed by its payload:
+#   None/False/True   tag only
+#   int               zigzag varint (arbitrary precision)
+#   float             IEEE-754 double, little endian
+#   str / bytes       varint length + raw bytes (str is UTF-8)
+#   list / tuple      varint count + items           (decoded as tuple)
+#   dict              varint count + sorted (str key, value) pairs
+# Two equal values always produce identical bytes, so the encoding can be hashed.
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STR = 5
+TAG_BYTES = 6
+TAG_SEQ = 7
+TAG_DICT = 8
+
+_DOUBLE = struct.Struct("<d")
+_KEY_CACHE: Dict[str, bytes] = {}  # Dict keys repeat constantly ('sender', 'packets_in', ...)
+
+
+def _write_varint(out: bytearray, n: int):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_into(out: bytearray, value: Any):
+    """Appends the canonical encoding of value to out."""
+    kind = type(value)
+    if kind is str:
+        raw = value.encode()
+        out.append(TAG_STR)
+        _write_varint(out, len(raw))
+        out += raw
+    elif kind is float:
+        out.append(TAG_FLOAT)
+        out += _DOUBLE.pack(value)
+    elif kind is bool or value is None:
+        out.append(TAG_NONE if value is None else (TAG_TRUE if value else TAG_FALSE))
+    elif kind is int:
+        out.append(TAG_INT)
+        _write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+    elif isinstance(value, dict):
+        out.append(TAG_DICT)
+        _write_varint(out, len(value))
+        for key in sorted(value):
+            prefix = _KEY_CACHE.get(key)
+            if prefix is None:
+                if type(key) is not str:
+                    raise TypeError(f"Canonical encoding requires str dict keys, got {key!r}")
+                raw = key.encode()
+                prefix = bytearray()
+                _write_varint(prefix, len(raw))
+                prefix = bytes(prefix + raw)
+                if len(_KEY_CACHE) < 4096:
+                    _KEY_CACHE[key] = prefix
+            out += prefix
+            encode_into(out, value[key])
+    elif isinstance(value, (list, tuple)):
+        out.append(TAG_SEQ)
+        _write_varint(out, len(value))
+        for item in value:
+            encode_into(out, item)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        raw = bytes(value)
+        out.append(TAG_BYTES)
+        _write_varint(out, len(raw))
+        out += raw
+    elif isinstance(value, int):  # int subclasses other than bool
+        encode_into(out, int(value))
+    elif isinstance(value, float):
+        encode_into(out, float(value))
+    else:
+        raise TypeError(f"Cannot canonically encode {type(value).__name__}")
+
+
+def decode_from(data, pos: int = 0) -> Tuple[Any, int]:
+    """Decodes one value starting at pos; returns (value, next position)."""
+    tag = data[pos]
+    pos += 1
+    if tag == TAG_STR:
+        length, pos = _read_varint(data, pos)
+        return str(data[pos:pos + length], "utf-8"), pos + length
+    if tag == TAG_INT:
+        z, pos = _read_varint(data, pos)
+        return (z >> 1) ^ -(z & 1), pos
+    if tag == TAG_FLOAT:
+        return _DOUBLE.unpack_from(data, pos)[0], pos + 8
+    if tag == TAG_DICT:
+        count, pos = _read_varint(data, pos)
+        result = {}
+        for _ in range(count):
+            length, pos = _read_varint(data, pos)
+            key = str(data[pos:pos + length], "utf-8")
+            result[key], pos = decode_from(data, pos + length)
+        return result, pos
+    if tag == TAG_SEQ:
+        count, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = decode_from(data, pos)
+            items.append(item)
+        return tuple(items), pos
+    if tag == TAG_BYTES:
+        length, pos = _read_varint(data, pos)
+        return bytes(data[pos:pos + length]), pos + length
+    if tag == TAG_NONE:
+        return None, pos
+    if tag == TAG_FALSE:
+        return False, pos
+    if tag == TAG_TRUE:
+        return True, pos
+    raise ValueError(f"Unknown codec tag {tag} at offset {pos - 1}")
+
+
+def encode(value: Any) -> bytes:
+    """Returns the canonical encoding of a single value."""
+    out = bytearray()
+    encode_into(out, value)
+    return bytes(out)
+
+
+def decode(data) -> Any:
+    """Decodes a buffer holding exactly one encoded value."""
+    value, pos = decode_from(data, 0)
+    if pos != len(data):
+        raise ValueError(f"Trailing bytes after encoded value ({len(data) - pos})")
+    return value
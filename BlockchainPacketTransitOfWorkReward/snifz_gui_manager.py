@@ -1,24 +1,28 @@
 import random
-import time
 import sys
+import time
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QTabWidget, QGridLayout, QLabel, QLineEdit, QPushButton, 
-    QProgressBar, QGroupBox, QScrollArea, QComboBox
+    QProgressBar, QGroupBox, QScrollArea, QComboBox, QTableWidget, QTableWidgetItem, QHeaderView
 )
 from PyQt5.QtCore import QTimer, Qt, QObject, pyqtSignal
 from PyQt5.QtGui import QColor, QPalette, QPixmap
 
 # --- Core Application Logic Imports ---
-from snifz_blockchain_core import SnifZBlockchain, TOKEN_SYMBOL
-from snifz_packet_sniffer import SnifZPacketSniffer
-from sniff_reward_logic import SnifZRewardSystem, MINT_INTERVAL_SECONDS
-from snifz_web3_connect import SnifZWeb3Connector
+from snifz_blockchain_core import TOKEN_SYMBOL
+from snifz_capture_manager import discover_interfaces, ALL_INTERFACES
+from snifz_node_service import SnifZNodeService, DEFAULT_FRAME_RATE, GRID_ROWS, GRID_WINDOW_SECONDS
+from snifz_metrics import METRICS
 
 class GUILogger(QObject):
     """A signal-based logger to safely update GUI from other threads."""
     log_signal = pyqtSignal(str)
 
+class GUIStateBridge(QObject):
+    """Carries backend state snapshots from the service thread to the Qt thread (queued signal)."""
+    state_signal = pyqtSignal(dict)
+
 class SnifZGUI(QMainWindow):
     """The main high-level quality GUI for the Sniffing-Packeting blockchain."""
     
@@ -29,7 +33,7 @@ class SnifZGUI(QMainWindow):
         "indicator": QColor("#4CAF50") # Green for success
     }
 
-    def __init__(self):
+    def __init__(self, frame_rate: float = DEFAULT_FRAME_RATE, deterministic: bool = False):
         super().__init__()
         self.setWindowTitle("Sniffing-Packeting Core Node Interface")
         self.setGeometry(100, 100, 1200, 800)
@@ -37,27 +41,29 @@ class SnifZGUI(QMainWindow):
         self._setup_style()
 
         # --- Initialize Backend Components ---
+        # The service thread owns the chain, reward system and sniffer; this thread only renders
+        # the state snapshots it publishes (at most frame_rate per second, only when changed).
         self.logger = GUILogger()
         self.logger.log_signal.connect(self._update_log)
+        self.bridge = GUIStateBridge()
+        self.bridge.state_signal.connect(self._apply_state)
+        self._state = {}
+        self._shown = {}  # widget -> last value pushed to it
 
-        self.blockchain = SnifZBlockchain()
-        self.web3_connector = SnifZWeb3Connector()
-        my_address = self.web3_connector.generate_unique_core_address()
-        
-        self.reward_system = SnifZRewardSystem(self.blockchain, my_address)
-        self.sniffer = SnifZPacketSniffer(interface="wlan0") # Default interface
+        self.service = SnifZNodeService(interface="wlan0", frame_rate=frame_rate,
+                                        deterministic=deterministic) # Default interface
+        self.service.on_log = self.logger.log_signal.emit
+        self.service.on_state = self.bridge.state_signal.emit
 
         self._setup_ui()
         self._initial_ui_update()
         
-        # QTimer for the core functional loop and GUI updates (simulating real-time)
-        self.main_loop_timer = QTimer(self)
-        self.main_loop_timer.timeout.connect(self._run_functional_loop)
-        self.main_loop_timer.start(1000) # Update every 1 second
+        # Cosmetic only: the functional loop itself runs on the service thread
+        self.theme_timer = QTimer(self)
+        self.theme_timer.timeout.connect(self._run_theme_effect)
+        self.theme_timer.start(1000)
 
-        self.logger.log_signal.emit(f"Genesis Block Created: {self.blockchain.chain[0].compute_hash()}")
-        self.logger.log_signal.emit(f"Your unique core address is: {my_address}")
-        self.logger.log_signal.emit("System Initialized. Select an interface and start sniffing.")
+        self.service.start()
 
 
     def _setup_style(self):
@@ -135,8 +141,16 @@ class SnifZGUI(QMainWindow):
         self.w7_log.setReadOnly(True)
         layout.addWidget(QLabel("Chain Log:"), 4, 0)
         layout.addWidget(self.w7_log, 4, 1, 1, 2) # This will show the latest log message
-        
-        # W3, W5, W8 placeholders are managed similarly...
+
+        # W8: Hot-Path Metrics (off by default: timing is only patched in while enabled)
+        self.w8_metrics_toggle = QPushButton("W8: Enable Hot-Path Metrics")
+        self.w8_metrics_toggle.clicked.connect(self._toggle_metrics)
+        self.w8_hot_paths = QLabel("W8: Hot-Path Metrics: Off")
+        self.w8_hot_paths.setWordWrap(True)
+        layout.addWidget(self.w8_metrics_toggle, 5, 0, 1, 3)
+        layout.addWidget(self.w8_hot_paths, 6, 0, 1, 3)
+
+        # W3, W5 placeholders are managed similarly...
         
         return group
 
@@ -148,7 +162,8 @@ class SnifZGUI(QMainWindow):
         
         # W9: Active Network Interface
         self.w9_iface_select = QComboBox()
-        self.w9_iface_select.addItems(["wlan0", "eth0", "lo"])
+        interfaces = discover_interfaces(include_loopback=True) or ["wlan0", "eth0", "lo"]
+        self.w9_iface_select.addItems(interfaces + [ALL_INTERFACES]) # "all": one capture process per interface
         self.w9_iface_select.currentTextChanged.connect(self._change_interface)
         layout.addWidget(QLabel("W9: Interface:"), 0, 0)
         layout.addWidget(self.w9_iface_select, 0, 1)
@@ -167,8 +182,16 @@ class SnifZGUI(QMainWindow):
         self.w16_start_stop.clicked.connect(self._toggle_sniffer)
         layout.addWidget(self.w16_start_stop, 3, 0, 1, 2)
 
-        # W13: External Node Traffic (Data Grid Placeholder)
-        self.w13_traffic_grid = QLabel("W13: External Node Traffic Grid (Dynamic Table)")
+        # W13: External Node Traffic (busiest nodes from the rolling traffic history)
+        self.w13_traffic_grid = QTableWidget(GRID_ROWS, 3)
+        self.w13_traffic_grid.setHorizontalHeaderLabels(
+            ["W13: Node", f"In pkt/s ({GRID_WINDOW_SECONDS}s)", f"Out pkt/s ({GRID_WINDOW_SECONDS}s)"])
+        self.w13_traffic_grid.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.w13_traffic_grid.verticalHeader().setVisible(False)
+        self.w13_traffic_grid.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row in range(GRID_ROWS):
+            for column in range(3):
+                self.w13_traffic_grid.setItem(row, column, QTableWidgetItem(""))
         layout.addWidget(self.w13_traffic_grid, 4, 0, 1, 2)
         
         # W12, W14, W15 placeholders...
@@ -244,83 +267,121 @@ class SnifZGUI(QMainWindow):
 
     def _initial_ui_update(self):
         """Sets the initial state of the UI from the backend components."""
-        self.w17_address.setText(self.reward_system.my_node_address)
-        self.w6_difficulty.setValue(self.reward_system.blockchain.difficulty * 10) # Scale for visibility
+        self._apply_state(self.service.state())
 
     def _update_log(self, message: str):
         """Updates the log widget with a new message."""
         self.w7_log.setText(message)
+        self._shown[self.w7_log] = message
 
     def _change_interface(self, interface_name: str):
         """Handles changing the network interface."""
-        if self.sniffer._is_sniffing:
+        if self._state.get("sniffing"):
             self.logger.log_signal.emit("Stop sniffer before changing interface.")
             # Revert selection
-            self.w9_iface_select.setCurrentText(self.sniffer.interface)
+            self._set_interface_selection(self._state["interface"])
             return
-        self.sniffer.interface = interface_name
-        self.logger.log_signal.emit(f"Interface set to {interface_name}. Ready to start.")
+        self.service.change_interface(interface_name)
 
     def _toggle_sniffer(self):
         """Starts or stops the packet sniffer."""
-        if self.sniffer._is_sniffing:
-            self.sniffer.stop_sniffing()
-            self.logger.log_signal.emit("Packet capture stopped.")
-            self.w1_status_led.setStyleSheet("background-color: red;")
-        else:
-            self.sniffer.start_sniffing()
-            self.logger.log_signal.emit(f"Packet capture started on {self.sniffer.interface}.")
-            self.w1_status_led.setStyleSheet(f"background-color: {self.THEME_COLORS['indicator'].name()};")
+        self.service.toggle_sniffer()
+
+    def _toggle_metrics(self):
+        """Switches hot-path timing on or off (shown live in W8)."""
+        self.service.set_metrics(not self._state.get("metrics"))
 
     def _toggle_qr_code(self):
         """Shows or hides the wallet address QR code."""
         if self.w18_qr_code.pixmap():
             self.w18_qr_code.clear()
         else:
-            qr_stream = self.web3_connector.generate_address_qr_code()
+            qr_stream = self.service.web3_connector.generate_address_qr_code()
             pixmap = QPixmap()
             pixmap.loadFromData(qr_stream.getvalue())
             self.w18_qr_code.setPixmap(pixmap.scaled(200, 200, Qt.KeepAspectRatio))
 
-    def _run_functional_loop(self):
-        """
-        The main functional loop running every second. 
-        This is where the high-level system logic is executed and the GUI is updated.
-        """
-        # 1. Update Block Count and Timer
-        self.w2_block_count.setText(f"W2: Current Block Count: {self.blockchain.last_block.index:06d}")
-        remaining_time = MINT_INTERVAL_SECONDS - (time.time() - self.reward_system._last_mint_time)
-        remaining_time = max(0, remaining_time)
-        self.w4_mint_timer.setText(f"W4: Next Mint Timer: {int(remaining_time // 60):02d}:{int(remaining_time % 60):02d}")
-        
-        # 2. Check for new blocks (and attempt to mint if time is up)
-        if self.sniffer._is_sniffing:
-            my_traffic = self.sniffer.get_current_traffic_data()
-            if self.reward_system.try_to_mint_block(my_traffic):
-                # A block was minted, update log and balance
-                last_block = self.blockchain.last_block
-                winner = last_block.transactions[0]['recipient']
-                self.logger.log_signal.emit(f"Block {last_block.index} minted! Winner: {winner[:10]}...")
-                # Update balance if we are the winner
-                if winner == self.reward_system.my_node_address:
-                    balance = self.reward_system.get_balance(self.reward_system.my_node_address)
-                    self.w19_balance.setText(f"W19: Current {TOKEN_SYMBOL} Balance: {balance:,.2f}")
-        
-        # 3. Update Packet I/O in Dock 2
-        if self.sniffer._is_sniffing:
-            total_io = self.sniffer.packets_in_count + self.sniffer.packets_out_count
-            self.w10_total_packets.setText(f"W10: Total Packets I/O: {total_io}")
+    def _set_text(self, widget, text: str):
+        """Pushes text to a widget only if it differs from what it already shows."""
+        if self._shown.get(widget) != text:
+            widget.setText(text)
+            self._shown[widget] = text
+
+    def _set_value(self, widget, value: int):
+        if self._shown.get(widget) != value:
+            widget.setValue(value)
+            self._shown[widget] = value
+
+    def _set_interface_selection(self, interface_name: str):
+        self.w9_iface_select.blockSignals(True) # A programmatic change is not a user request
+        self.w9_iface_select.setCurrentText(interface_name)
+        self.w9_iface_select.blockSignals(False)
+
+    def _apply_state(self, state: dict):
+        """Renders a state snapshot from the service; only changed values touch widgets."""
+        with METRICS.timer("snifz_gui_render_seconds", "Time to render one state snapshot"):
+            self._render_state(state)
+
+    def _render_state(self, state: dict):
+        previous, self._state = self._state, state
+        remaining = state["mint_remaining"]
+        self._set_text(self.w17_address, state["address"])
+        self._set_value(self.w6_difficulty, state["difficulty"] * 10) # Scale for visibility
+        self._set_text(self.w2_block_count, f"W2: Current Block Count: {state['block_count']:06d}")
+        self._set_text(self.w4_mint_timer, f"W4: Next Mint Timer: {remaining // 60:02d}:{remaining % 60:02d}")
+        if state["next_mint_at"] != previous.get("next_mint_at"):
+            # The scheduler's deadline for the round, not an estimate from the countdown
+            self.w4_mint_timer.setToolTip(
+                f"Next PoT round at {time.strftime('%H:%M:%S', time.localtime(state['next_mint_at']))}")
+        if state["validation"] != previous.get("validation"):
+            self._set_text(self.w7_log, state["validation"])
+        if state["sniffing"] != previous.get("sniffing"):
+            color = self.THEME_COLORS['indicator'].name() if state["sniffing"] else "red"
+            self.w1_status_led.setStyleSheet(f"background-color: {color};")
+        if state["interface"] != previous.get("interface"):
+            self._set_interface_selection(state["interface"])
+        if state["sniffing"]:
+            self._set_text(self.w10_total_packets,
+                           f"W10: Total Packets I/O: {state['total_io']} ({state['live_rate']:,} pkt/s)")
             # Simulate progress to next block (based on time)
-            progress = ((MINT_INTERVAL_SECONDS - remaining_time) / MINT_INTERVAL_SECONDS) * 100
-            self.w11_progress.setValue(int(progress))
-        
+            self._set_value(self.w11_progress, state["progress"])
+        self._set_text(self.w19_balance, f"W19: Current {TOKEN_SYMBOL} Balance: {state['balance']:,.2f}")
+        # W29: this node plus every connected peer
+        self._set_text(self.w29_peer_count, f"W29: Network Peer Count: {state['peers']}")
+        if state["traffic_grid"] != previous.get("traffic_grid"):
+            self._render_traffic_grid(state["traffic_grid"])
+        if state["metrics"] != previous.get("metrics"):
+            self._set_text(self.w8_metrics_toggle,
+                           f"W8: {'Disable' if state['metrics'] else 'Enable'} Hot-Path Metrics")
+        if state["metrics"]:
+            self._set_text(self.w8_hot_paths, "\n".join(state["hot_paths"]) or "W8: Hot-Path Metrics: No samples yet")
+        else:
+            self._set_text(self.w8_hot_paths, "W8: Hot-Path Metrics: Off")
+
+    def _render_traffic_grid(self, rows: tuple):
+        """Fills W13's fixed rows in place; only cells whose text changed are touched."""
+        for row in range(GRID_ROWS):
+            if row < len(rows):
+                address, packets_in, packets_out = rows[row]
+                label = f"{address[:10]}...{address[-4:]}" + (" (you)" if address == self._state["address"] else "")
+                cells = (label, f"{packets_in:,}", f"{packets_out:,}")
+            else:
+                cells = ("", "", "")
+            for column, text in enumerate(cells):
+                self._set_text(self.w13_traffic_grid.item(row, column), text)
+
+    def _run_theme_effect(self):
         # 4. Color Changing (Thematic Engine Concept)
         # Change a widget's color randomly for the "color changing GUI system" effect
         if random.randint(1, 20) == 1:
             self.w16_start_stop.setStyleSheet(f"background-color: #{random.randint(0, 0xFFFFFF):06x}; color: white; padding: 10px; border-radius: 5px;")
 
+    def closeEvent(self, event):
+        self.service.stop()
+        super().closeEvent(event)
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    gui = SnifZGUI()
+    gui = SnifZGUI(deterministic="--deterministic" in sys.argv)
     gui.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,170 @@
+import itertools
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+REWARD_SENDER = "BLOCK_REWARD"  # Minted by consensus; never checked against a balance
+MEMPOOL_MAX_SIZE = 100000  # Pending transfers kept before the oldest are evicted
+MEMPOOL_MAX_AGE = 3600.0  # Seconds a transfer may wait for a block
+MAX_TRANSACTIONS_PER_BLOCK = 5000  # Transfers taken per block (rewards not counted)
+
+
+class SnifZMempool:
+    """
+    Pending transactions waiting for the next block.
+
+    Transfers are kept in arrival order (a dict keyed by a sequence number)
+    and indexed by sender and recipient. Each sender's pending outflow is
+    tracked, so a transfer is rejected up front if it would overdraw the
+    confirmed balance (see SnifZAccountState) minus what the sender already
+    has pending. BLOCK_REWARD transactions skip the balance check and are
+    always placed first in the next block.
+
+    take() hands the next block's transactions over as one tuple, which Block
+    keeps as-is instead of copying; restore() puts them back if that block
+    could not be appended.
+    """
+    def __init__(self, account_state, max_size: int = MEMPOOL_MAX_SIZE, max_age: float = MEMPOOL_MAX_AGE,
+                 max_per_block: int = MAX_TRANSACTIONS_PER_BLOCK, clock: Callable[[], float] = time.time):
+        self.account_state = account_state
+        self.max_size = max(1, max_size)
+        self.max_age = max_age
+        self.max_per_block = max(1, max_per_block)
+        self.clock = clock
+        self._rewards: List[Dict[str, Any]] = []
+        self._entries: Dict[int, Tuple[float, Dict[str, Any]]] = {}  # seq -> (received at, tx), oldest first
+        self._by_sender: Dict[str, Dict[int, None]] = {}  # address -> ordered set of seqs
+        self._by_recipient: Dict[str, Dict[int, None]] = {}
+        self._pending_out: Dict[str, float] = {}  # sender -> sum of pending transfer amounts
+        self._sequence = itertools.count()
+        self._restored = itertools.count(-1, -1)  # Restored transfers sort ahead of everything queued
+        self.dropped_stale = 0  # Transfers take() dropped because the sender's balance no longer covered them
+
+    def __len__(self) -> int:
+        return len(self._rewards) + len(self._entries)
+
+    # --- Adding -------------------------------------------------------------
+
+    def _check(self, sender: str, recipient: str, amount: float) -> None:
+        if type(amount) not in (int, float) or not math.isfinite(amount) or amount <= 0:  # bool is not an amount
+            raise ValueError(f"Transaction amount must be a positive finite number, got {amount!r}")
+        if not sender or not recipient:
+            raise ValueError("Transaction needs a sender and a recipient")
+        if sender == REWARD_SENDER:
+            return
+        available = self.account_state.get_balance(sender) - self._pending_out.get(sender, 0.0)
+        if amount > available:
+            raise ValueError(f"Overdraft: {sender} has {available:,.2f} available, tried to send {amount:,.2f}")
+
+    def add(self, sender: str, recipient: str, amount: float) -> Dict[str, Any]:
+        """Validates and queues one transaction; raises ValueError if it is rejected."""
+        self._check(sender, recipient, amount)
+        tx = {'sender': sender, 'recipient': recipient, 'amount': amount}
+        if sender == REWARD_SENDER:
+            self._rewards.append(tx)
+            return tx
+        if len(self._entries) >= self.max_size:
+            self._evict_oldest(len(self._entries) - self.max_size + 1)
+        seq = next(self._sequence)
+        self._entries[seq] = (self.clock(), tx)
+        self._by_sender.setdefault(sender, {})[seq] = None
+        self._by_recipient.setdefault(recipient, {})[seq] = None
+        self._pending_out[sender] = self._pending_out.get(sender, 0.0) + amount
+        return tx
+
+    def add_many(self, transactions: Iterable[Dict[str, Any]]) -> List[str]:
+        """Queues a burst of {'sender', 'recipient', 'amount'} dicts; returns one message per rejection."""
+        rejected = []
+        for tx in transactions:
+            try:
+                self.add(tx['sender'], tx['recipient'], tx['amount'])
+            except (KeyError, ValueError) as e:
+                rejected.append(f"{tx!r}: {e}")
+        return rejected
+
+    # --- Removing -----------------------------------------------------------
+
+    def _discard(self, seq: int) -> Dict[str, Any]:
+        _, tx = self._entries.pop(seq)
+        sender, recipient = tx['sender'], tx['recipient']
+        for index, address in ((self._by_sender, sender), (self._by_recipient, recipient)):
+            seqs = index[address]
+            del seqs[seq]
+            if not seqs:
+                del index[address]
+        remaining = self._pending_out[sender] - tx['amount']
+        if sender in self._by_sender:
+            self._pending_out[sender] = remaining
+        else:
+            del self._pending_out[sender]  # Drop float residue once nothing is pending
+        return tx
+
+    def _evict_oldest(self, count: int):
+        for seq in list(itertools.islice(self._entries, count)):
+            self._discard(seq)
+
+    def evict_expired(self) -> int:
+        """Drops transfers older than max_age; returns how many were dropped."""
+        cutoff = self.clock() - self.max_age
+        expired = list(itertools.takewhile(lambda seq: self._entries[seq][0] < cutoff, self._entries))
+        for seq in expired:
+            self._discard(seq)
+        return len(expired)
+
+    def take(self) -> Tuple[Dict[str, Any], ...]:
+        """
+        Removes and returns the next block's transactions: every pending reward,
+        then up to max_per_block transfers, oldest first. Transfers are re-checked
+        against the current balances (blocks may have arrived from peers since
+        they were queued) and dropped if they no longer fit.
+        """
+        self.evict_expired()
+        block_txs = self._rewards
+        self._rewards = []
+        spent: Dict[str, float] = {}
+        taken = 0
+        while self._entries and taken < self.max_per_block:
+            for seq in list(itertools.islice(self._entries, self.max_per_block - taken)):
+                tx = self._discard(seq)
+                sender = tx['sender']
+                if tx['amount'] > self.account_state.get_balance(sender) - spent.get(sender, 0.0):
+                    self.dropped_stale += 1  # The balance changed since it was queued
+                    continue
+                spent[sender] = spent.get(sender, 0.0) + tx['amount']
+                block_txs.append(tx)
+                taken += 1
+        return tuple(block_txs)
+
+    def restore(self, transactions: Iterable[Dict[str, Any]]):
+        """Puts the transactions of a block that failed to append back at the front, in their order."""
+        rewards = [tx for tx in transactions if tx['sender'] == REWARD_SENDER]
+        transfers = [tx for tx in transactions if tx['sender'] != REWARD_SENDER]
+        self._rewards[:0] = rewards
+        now = self.clock()
+        front = {}
+        for tx in reversed(transfers):
+            seq = next(self._restored)
+            front[seq] = (now, tx)
+            sender, recipient = tx['sender'], tx['recipient']
+            self._by_sender[sender] = {seq: None, **self._by_sender.get(sender, {})}
+            self._by_recipient[recipient] = {seq: None, **self._by_recipient.get(recipient, {})}
+            self._pending_out[sender] = self._pending_out.get(sender, 0.0) + tx['amount']
+        self._entries = {**dict(reversed(front.items())), **self._entries}
+
+    def withdraw_reward(self, reward: Dict[str, Any]):
+        """Drops a pending reward (the exact dict add() returned), e.g. the reward of a round that failed."""
+        self._rewards = [tx for tx in self._rewards if tx is not reward]
+
+    # --- Queries ------------------------------------------------------------
+
+    def pending(self) -> Tuple[Dict[str, Any], ...]:
+        """Every pending transaction in block order (rewards first)."""
+        return tuple(self._rewards) + tuple(tx for _, tx in self._entries.values())
+
+    def pending_for(self, address: str) -> List[Dict[str, Any]]:
+        """Pending transfers sent or received by the address, oldest first."""
+        seqs = set(self._by_sender.get(address, ())) | set(self._by_recipient.get(address, ()))
+        return [self._entries[seq][1] for seq in sorted(seqs)]
+
+    def pending_outflow(self, address: str) -> float:
+        return self._pending_out.get(address, 0.0)
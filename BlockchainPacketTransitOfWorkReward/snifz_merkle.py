@@ -0,0 +1,74 @@
+import hashlib
+from typing import Any, List, Sequence, Tuple
+
+from snifz_codec import encode
+
+LEAF_PREFIX = b"\x00"  # Domain separation: a leaf can never be mistaken for an inner node
+NODE_PREFIX = b"\x01"
+EMPTY_ROOT = hashlib.sha256(b"").digest()  # Root of a block without transactions
+PROOF_LEFT = 0  # Proof step: the sibling sits to the left of the running hash
+PROOF_RIGHT = 1
+
+
+def leaf_hash(tx: Any) -> bytes:
+    """Leaf of one transaction: sha256(0x00 || canonical encoding)."""
+    return hashlib.sha256(LEAF_PREFIX + encode(tx)).digest()
+
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: Sequence[bytes]) -> List[bytes]:
+    # An odd last node is promoted unchanged (never paired with itself, so two
+    # different transaction lists cannot share a root by duplicating the tail)
+    parents = [_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaves: Sequence[bytes]) -> bytes:
+    """Root over already hashed leaves (see leaf_hash)."""
+    if not leaves:
+        return EMPTY_ROOT
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def transactions_root(transactions: Sequence[Any]) -> bytes:
+    return merkle_root([leaf_hash(tx) for tx in transactions])
+
+
+def merkle_proof(leaves: Sequence[bytes], position: int) -> Tuple[bytes, ...]:
+    """
+    Inclusion proof for leaves[position]: one 33-byte step (side byte +
+    sibling hash) per tree level where the node has a sibling.
+    """
+    if not 0 <= position < len(leaves):
+        raise ValueError(f"No transaction at position {position} (block has {len(leaves)})")
+    path = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):  # Otherwise the node is promoted and this level adds nothing
+            side = PROOF_LEFT if sibling < position else PROOF_RIGHT
+            path.append(bytes((side,)) + level[sibling])
+        level = _next_level(level)
+        position //= 2
+    return tuple(path)
+
+
+def verify_proof(tx: Any, path: Sequence[bytes], root: bytes) -> bool:
+    """Checks that `tx` is committed to by `root` through `path` (see merkle_proof)."""
+    running = leaf_hash(tx)
+    for step in path:
+        if len(step) != 33:
+            return False
+        if step[0] == PROOF_LEFT:
+            running = _parent(step[1:], running)
+        else:
+            running = _parent(running, step[1:])
+    return running == root
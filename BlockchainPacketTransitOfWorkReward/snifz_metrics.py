@@ -0,0 +1,411 @@
+import functools
+import importlib
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Callable, Dict, List, MutableSequence, Optional, Sequence, Tuple
+
+# Latency bucket upper bounds in seconds (1 us .. 10 s); a final +Inf bucket is implied
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_INTERVAL = 0.005  # Seconds between profiler samples
+PROFILE_DEPTH = 32  # Innermost frames kept per sampled stack
+
+# The node's hot paths: (module, class, method, metric name, help). Timed only while metrics are enabled.
+HOT_PATHS = (
+    ("snifz_packet_sniffer", "SnifZPacketSniffer", "_packet_callback", "snifz_packet_callback_seconds",
+     "Time spent classifying one scapy-captured packet"),
+    ("snifz_packet_sniffer", "SnifZPacketSniffer", "get_current_traffic_data", "snifz_traffic_snapshot_seconds",
+     "Time to roll the mint-interval traffic window"),
+    ("snifz_capture_manager", "SnifZCaptureManager", "get_current_traffic_data", "snifz_traffic_snapshot_seconds",
+     "Time to roll the mint-interval traffic window"),
+    ("sniff_reward_logic", "SnifZRewardSystem", "_determine_winner", "snifz_determine_winner_seconds",
+     "Time to rank the PoT candidates and pick a winner"),
+    ("sniff_reward_logic", "SnifZRewardSystem", "get_balance", "snifz_get_balance_seconds",
+     "Time of one balance lookup"),
+    ("snifz_blockchain_core", "SnifZBlockchain", "new_block", "snifz_new_block_seconds",
+     "Time to forge, store and index a new block"),
+    ("snifz_blockchain_core", "Block", "compute_hash", "snifz_compute_hash_seconds",
+     "Time of one block hash (memoized after the first call)"),
+    ("snifz_node_service", "SnifZNodeService", "_tick", "snifz_functional_loop_seconds",
+     "Time of one pass of the node's functional loop"),
+)
+
+
+class SnifZCounter:
+    """A monotonic counter with one shard per writing thread (no locks on the hot path)."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._shards: List[MutableSequence[float]] = []
+        self._local = threading.local()
+        self._register_lock = threading.Lock()
+
+    def _shard(self, size: int) -> MutableSequence[float]:
+        shard = [0] * size
+        with self._register_lock:
+            self._shards = self._shards + [shard]  # Copy-on-write, like SnifZTrafficCounters
+        self._local.shard = shard
+        return shard
+
+    def inc(self, amount: float = 1):
+        shard = getattr(self._local, 'shard', None) or self._shard(1)
+        shard[0] += amount
+
+    @property
+    def value(self) -> float:
+        return sum(shard[0] for shard in self._shards)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, "", self.value)]
+
+
+class SnifZHistogram(SnifZCounter):
+    """
+    A latency histogram with fixed buckets. Each thread writes its own shard
+    ([count, sum, bucket 0, ..., +Inf]), so observing takes no locks; readers
+    copy every shard in one slice and add them up.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float):
+        shard = getattr(self._local, 'shard', None) or self._shard(len(self.buckets) + 3)
+        shard[0] += 1
+        shard[1] += value
+        shard[2 + bisect_left(self.buckets, value)] += 1
+
+    def time(self) -> '_Timer':
+        """Context manager that observes the duration of its block."""
+        return _Timer(self)
+
+    def totals(self) -> List[float]:
+        totals = [0] * (len(self.buckets) + 3)
+        for shard in self._shards:
+            for i, value in enumerate(shard[:]):
+                totals[i] += value
+        return totals
+
+    @property
+    def count(self) -> int:
+        return int(self.totals()[0])
+
+    def quantile(self, q: float, totals: Optional[List[float]] = None) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if it is past the last bucket)."""
+        totals = totals or self.totals()
+        rank, seen = q * totals[0], 0
+        for bound, in_bucket in zip(self.buckets, totals[2:]):
+            seen += in_bucket
+            if seen >= rank and seen:
+                return bound
+        return float("inf")
+
+    def summary(self) -> Dict[str, float]:
+        totals = self.totals()
+        return {"count": int(totals[0]), "seconds": totals[1],
+                "mean": totals[1] / totals[0] if totals[0] else 0.0,
+                "p50": self.quantile(0.5, totals), "p99": self.quantile(0.99, totals)}
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        totals = self.totals()
+        samples, cumulative = [], 0
+        for bound, in_bucket in zip(self.buckets, totals[2:]):
+            cumulative += in_bucket
+            samples.append((self.name + "_bucket", f'le="{bound!r}"', cumulative))
+        samples.append((self.name + "_bucket", 'le="+Inf"', totals[0]))
+        samples.append((self.name + "_sum", "", totals[1]))
+        samples.append((self.name + "_count", "", totals[0]))
+        return samples
+
+
+class SnifZGauge:
+    """A value read when metrics are exported: set() explicitly, or computed by `function`."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, function: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        if self.function is None:
+            return self._value
+        try:
+            return float(self.function())
+        except Exception:  # A gauge over torn-down state must not break the export
+            return float("nan")
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, "", self.value)]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: Optional[SnifZHistogram]):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.histogram is not None:
+            self.histogram.observe(time.perf_counter() - self.started)
+
+
+def _timed(function: Callable, histogram: SnifZHistogram) -> Callable:
+    perf_counter, observe = time.perf_counter, histogram.observe
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe(perf_counter() - started)
+    return timed
+
+
+class SnifZMetrics:
+    """
+    The node's metrics registry: counters, latency histograms and gauges,
+    exported in the Prometheus text format.
+
+    Hot paths are instrumented by swapping the timed wrapper into their class
+    when metrics are enabled and the original function back when they are
+    disabled, so a disabled registry costs nothing at all on those paths.
+    Because the swap is on the class, a bound method taken before enable()
+    (e.g. the callback of a scapy capture that is already running) keeps the
+    version it was bound with until it is taken again.
+
+    Counters always count; they are only touched by rare events (mints, RPC
+    calls). Use timer() for code that is timed explicitly.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.metrics: Dict[str, Any] = {}
+        self._hooks: List[Tuple[type, str, Callable, SnifZHistogram]] = []  # owner, attribute, original, histogram
+        self._lock = threading.Lock()
+
+    # --- Registration -------------------------------------------------------
+
+    def _register(self, metric: Any) -> Any:
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if existing.kind != metric.kind:
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.kind}")
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str) -> SnifZCounter:
+        return self._register(SnifZCounter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> SnifZHistogram:
+        return self._register(SnifZHistogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, function: Optional[Callable[[], float]] = None) -> SnifZGauge:
+        gauge = self._register(SnifZGauge(name, help, function))
+        if function is not None:
+            gauge.function = function  # The latest owner wins (e.g. a restarted service)
+        return gauge
+
+    def instrument(self, owner: type, attribute: str, name: str, help: str) -> SnifZHistogram:
+        """Times owner.<attribute> into histogram `name` whenever metrics are enabled."""
+        histogram = self.histogram(name, help)
+        with self._lock:
+            if any(hook[0] is owner and hook[1] == attribute for hook in self._hooks):
+                return histogram
+            original = owner.__dict__.get(attribute)
+            if not callable(original):
+                raise ValueError(f"{owner.__name__}.{attribute} is not a method defined on the class")
+            self._hooks.append((owner, attribute, original, histogram))
+            if self.enabled:
+                setattr(owner, attribute, _timed(original, histogram))
+        return histogram
+
+    def instrument_hot_paths(self):
+        """Registers HOT_PATHS (importing their modules)."""
+        for module_name, class_name, attribute, name, help in HOT_PATHS:
+            owner = getattr(importlib.import_module(module_name), class_name)
+            self.instrument(owner, attribute, name, help)
+
+    def timer(self, name: str, help: str = "") -> _Timer:
+        """Times a block into histogram `name` if metrics are enabled (a no-op timer otherwise)."""
+        return _Timer(self.histogram(name, help) if self.enabled else None)
+
+    # --- Switching ----------------------------------------------------------
+
+    def enable(self):
+        with self._lock:
+            if not self.enabled:
+                for owner, attribute, original, histogram in self._hooks:
+                    setattr(owner, attribute, _timed(original, histogram))
+                self.enabled = True
+
+    def disable(self):
+        with self._lock:
+            if self.enabled:
+                for owner, attribute, original, _ in self._hooks:
+                    setattr(owner, attribute, original)
+                self.enabled = False
+
+    # --- Export -------------------------------------------------------------
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample, labels, value in metric.samples():
+                lines.append(f"{sample}{{{labels}}} {_format_value(value)}" if labels
+                             else f"{sample} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def hot_paths(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Histogram summaries, the most total time first."""
+        rows = [{"name": name, **metric.summary()} for name, metric in self.metrics.items()
+                if metric.kind == "histogram"]
+        rows = [row for row in rows if row["count"]]
+        rows.sort(key=lambda row: row["seconds"], reverse=True)
+        return rows[:top] if top is not None else rows
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_seconds(seconds: float) -> str:
+    """Short human form of a latency (for the GUI and logs)."""
+    if seconds == float("inf"):
+        return f">{LATENCY_BUCKETS[-1]:g}s"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1.0:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+class SnifZSamplingProfiler:
+    """
+    A statistical profiler for a running node: a daemon thread wakes every
+    `interval` seconds and records the stack of every other thread
+    (sys._current_frames). Nothing runs in the profiled threads, so the cost is
+    bounded by the sampling rate no matter how hot the code is.
+
+    With on_cpu (the default) and a Linux /proc, only threads the kernel
+    reports as running are sampled, so threads parked in select(), queue waits
+    or sleeps do not drown out the ones doing work. The thread holding the GIL
+    is the one that is running; the others show up as waiting.
+
+    top() ranks functions by samples where they were on the stack top
+    ("self") and anywhere on it ("total"); collapsed() emits the folded-stack
+    format flamegraph.pl and speedscope read.
+    """
+    def __init__(self, interval: float = PROFILE_INTERVAL, depth: int = PROFILE_DEPTH, on_cpu: bool = True):
+        self.interval = interval
+        self.depth = depth
+        self.on_cpu = on_cpu and os.path.isdir("/proc/self/task")
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="snifz-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    @staticmethod
+    def _running(native_id: Optional[int]) -> bool:
+        """Whether the kernel has the thread in state R (running or runnable)."""
+        try:
+            with open(f"/proc/self/task/{native_id}/stat", "rb") as f:
+                return f.read().rpartition(b")")[2].split(None, 1)[0] == b"R"
+        except (OSError, IndexError):
+            return True  # Unknown: sample it rather than lose it
+
+    def _run(self):
+        me = threading.get_ident()
+        names, native_ids = {}, {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                threads = threading.enumerate()
+                names = {thread.ident: thread.name for thread in threads}
+                native_ids = {thread.ident: thread.native_id for thread in threads}
+            stacks = []
+            for ident, frame in frames.items():
+                if ident == me or (self.on_cpu and not self._running(native_ids.get(ident))):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.depth:
+                    code = frame.f_code
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stacks.append(tuple(reversed(stack)))
+            del frames
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def top(self, count: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            stacks = list(self._stacks.items())
+        own, total = Counter(), Counter()
+        for stack, hits in stacks:
+            if len(stack) > 1:
+                own[stack[-1]] += hits
+                for function in set(stack[1:]):
+                    total[function] += hits
+        return [{"function": function, "self": hits, "total": total[function]}
+                for function, hits in own.most_common(count)]
+
+    def collapsed(self) -> str:
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return "".join(f"{';'.join(stack)} {hits}\n" for stack, hits in stacks)
+
+
+METRICS = SnifZMetrics()  # The process-wide registry
@@ -0,0 +1,426 @@
+import argparse
+import json
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from snifz_blockchain_core import Block, SnifZBlockchain, TOKEN_SYMBOL
+from snifz_node_service import SnifZNodeService
+from snifz_peer_gossip import DEFAULT_GOSSIP_PORT
+from snifz_web3_connect import SnifZWeb3Connector
+from snifz_settlement import SnifZRewardSettlement, SETTLEMENT_WINDOW_BLOCKS
+from snifz_metrics import METRICS
+
+DEFAULT_RPC_PORT = 47801
+RPC_TIMEOUT = 10.0  # Seconds an RPC call may wait for the service thread
+MAX_BLOCKS_PER_CALL = 100
+MAX_TOP_NODES = 1000
+MAX_REQUEST_BYTES = 1024 * 1024
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def block_to_json(block: Block) -> Dict[str, Any]:
+    return {
+        "index": block.index,
+        "hash": block.compute_hash(),
+        "prev_hash": block.prev_hash,
+        "timestamp": block.timestamp,
+        "nonce": block.nonce,
+        "merkle_root": block.merkle_root.hex(),
+        "pruned": block.pruned,
+        "transactions": list(block.transactions),
+        "traffic_data": block.traffic_data,
+    }
+
+
+class SnifZNodeRPC:
+    """
+    The daemon's JSON-RPC 2.0 methods. Every call is executed on the node
+    service thread (SnifZNodeService.query), so it sees the chain between
+    ticks, never halfway through a mint or a sync. The metrics, profiler and
+    schedule methods are the exception: they run on the HTTP thread, so they
+    still answer when the service thread is the thing that is stuck.
+    """
+    def __init__(self, service: SnifZNodeService, timeout: float = RPC_TIMEOUT,
+                 settlement: Optional[SnifZRewardSettlement] = None):
+        self.service = service
+        self.timeout = timeout
+        self.settlement = settlement
+        self.methods: Dict[str, Callable[..., Any]] = {
+            "snifz_getBalance": self.get_balance,
+            "snifz_getTip": self.get_tip,
+            "snifz_getBlock": self.get_block,
+            "snifz_getBlocks": self.get_blocks,
+            "snifz_getBlockByHash": self.get_block_by_hash,
+            "snifz_getBlocksWonBy": self.get_blocks_won_by,
+            "snifz_getBlocksByTime": self.get_blocks_by_time,
+            "snifz_getTraffic": self.get_traffic,
+            "snifz_getStatus": self.get_status,
+            "snifz_getTrafficHistory": self.get_traffic_history,
+            "snifz_getTopNodes": self.get_top_nodes,
+            "snifz_getMetrics": self.get_metrics,
+            "snifz_setMetrics": self.set_metrics,
+            "snifz_setProfiling": self.set_profiling,
+            "snifz_getProfile": self.get_profile,
+            "snifz_getSchedule": self.get_schedule,
+        }
+        self.direct = {"snifz_getMetrics", "snifz_setMetrics", "snifz_setProfiling", "snifz_getProfile",
+                       "snifz_getSchedule"}
+        self.requests = METRICS.counter("snifz_rpc_requests_total", "JSON-RPC calls handled")
+
+    # --- Methods (run on the service thread) --------------------------------
+
+    def get_balance(self, address: Optional[str] = None) -> Dict[str, Any]:
+        address = address or self.service.my_address
+        blockchain = self.service.blockchain
+        return {
+            "address": address,
+            "balance": blockchain.account_state.get_balance(address),
+            "pending_outflow": blockchain.mempool.pending_outflow(address),
+            "sequence": blockchain.account_state.get_sequence(address),
+        }
+
+    def get_tip(self) -> Dict[str, Any]:
+        blockchain = self.service.blockchain
+        tip = blockchain.last_block
+        return {"height": len(blockchain.chain), "hash": tip.compute_hash(),
+                "timestamp": tip.timestamp, "difficulty": blockchain.difficulty}
+
+    def get_block(self, index: int) -> Dict[str, Any]:
+        chain = self.service.blockchain.chain
+        if not isinstance(index, int) or not 1 <= index <= len(chain):
+            raise ValueError(f"No block {index!r} (height is {len(chain)})")
+        return block_to_json(chain[index - 1])
+
+    def get_blocks(self, start: int, count: int = MAX_BLOCKS_PER_CALL) -> List[Dict[str, Any]]:
+        chain = self.service.blockchain.chain
+        if not isinstance(start, int) or not isinstance(count, int) or start < 1 or count < 0:
+            raise ValueError("start must be >= 1 and count >= 0")
+        end = min(len(chain), start + min(count, MAX_BLOCKS_PER_CALL) - 1)
+        return [block_to_json(chain[index - 1]) for index in range(start, end + 1)]
+
+    def get_block_by_hash(self, block_hash: str) -> Optional[Dict[str, Any]]:
+        if not isinstance(block_hash, str):
+            raise ValueError("block_hash must be a hex string")
+        block = self.service.blockchain.get_block_by_hash(block_hash.lower().removeprefix("0x"))
+        return block_to_json(block) if block is not None else None
+
+    def get_blocks_won_by(self, address: str, start: int = 0, count: int = MAX_BLOCKS_PER_CALL) -> Dict[str, Any]:
+        """Heights of the blocks `address` won, oldest first, `count` at a time from position `start`."""
+        if not isinstance(start, int) or not isinstance(count, int) or start < 0 or count < 0:
+            raise ValueError("start and count must be >= 0")
+        blockchain = self.service.blockchain
+        return {"address": address, "total": blockchain.count_blocks_won_by(address),
+                "heights": blockchain.get_blocks_won_by(address, start, min(count, MAX_BLOCKS_PER_CALL))}
+
+    def get_blocks_by_time(self, start: float, end: float, count: int = MAX_BLOCKS_PER_CALL,
+                           offset: int = 0) -> Dict[str, Any]:
+        """Heights of the blocks with start <= timestamp <= end, in timestamp order, `count` from `offset`."""
+        if not all(isinstance(value, (int, float)) for value in (start, end)):
+            raise ValueError("start and end must be timestamps")
+        if not isinstance(count, int) or not isinstance(offset, int) or count < 0 or offset < 0:
+            raise ValueError("count and offset must be integers >= 0")
+        blockchain = self.service.blockchain
+        return {"total": blockchain.count_blocks_between(start, end),
+                "heights": blockchain.get_blocks_between(start, end, offset, min(count, MAX_BLOCKS_PER_CALL))}
+
+    def get_traffic(self) -> Dict[str, Any]:
+        service = self.service
+        sniffer = service.sniffer
+        state = service.state()
+        return {
+            "sniffing": state["sniffing"],
+            "interface": state["interface"],
+            "packets_in": sniffer.packets_in_count,
+            "packets_out": sniffer.packets_out_count,
+            "live_rate": state["live_rate"],
+            "mint_remaining": state["mint_remaining"],
+            "nodes": service.reward_system.known_node_traffic,
+        }
+
+    def get_traffic_history(self, key: Optional[str] = None, field: str = "packets_in", seconds: float = 300,
+                            step: Optional[int] = None, kind: str = "node") -> Dict[str, Any]:
+        """Bucketed counts of one field for a node address (kind="node") or an interface (kind="interface")."""
+        if kind not in ("node", "interface"):
+            raise ValueError("kind must be 'node' or 'interface'")
+        history = self.service.reward_system.traffic_history if kind == "node" else self.service.interface_history
+        if field not in history.fields:
+            raise ValueError(f"field must be one of {list(history.fields)}")
+        if not isinstance(seconds, (int, float)) or seconds <= 0:
+            raise ValueError("seconds must be positive")
+        key = key or (self.service.my_address if kind == "node" else self.service.sniffer.interface)
+        start, step, counts = history.series(key, field, seconds, step)
+        return {"key": key, "field": field, "start": start, "step": step, "counts": counts.tolist()}
+
+    def get_top_nodes(self, count: int = 10, seconds: float = 60,
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """The busiest nodes over the last `seconds` by the per-second rate of the summed fields."""
+        history = self.service.reward_system.traffic_history
+        fields = fields or ["packets_in", "packets_out"]
+        if not isinstance(count, int) or not 1 <= count <= MAX_TOP_NODES:
+            raise ValueError(f"count must be between 1 and {MAX_TOP_NODES}")
+        if not isinstance(seconds, (int, float)) or seconds <= 0:
+            raise ValueError("seconds must be positive")
+        if any(field not in history.fields for field in fields):
+            raise ValueError(f"fields must be from {list(history.fields)}")
+        return [{"address": address, "rate": rate} for address, rate in history.top(count, seconds, fields)]
+
+    def get_status(self) -> Dict[str, Any]:
+        service = self.service
+        status = service.state()
+        status["mempool"] = len(service.blockchain.mempool)
+        status["snapshot_height"] = service.blockchain.snapshot_height
+        if service.gossip is not None:
+            status["gossip"] = {"host": service.gossip.host, "port": service.gossip.port,
+                                "peers": sorted(service.gossip.peers), **service.gossip.stats}
+        if self.settlement is not None:
+            status["settlement"] = dict(self.settlement.stats)
+        return status
+
+    # --- Metrics methods (run on the HTTP thread) ---------------------------
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {"enabled": METRICS.enabled, "profiling": self.service.profiler.running,
+                "hot_paths": METRICS.hot_paths()}
+
+    def set_metrics(self, enabled: bool) -> bool:
+        self.service.set_metrics(bool(enabled))
+        return METRICS.enabled
+
+    def set_profiling(self, enabled: bool, reset: bool = False) -> bool:
+        self.service.set_profiling(bool(enabled), bool(reset))
+        return self.service.profiler.running
+
+    def get_profile(self, top: int = 20) -> Dict[str, Any]:
+        profiler = self.service.profiler
+        if not isinstance(top, int) or top < 1:
+            raise ValueError("top must be a positive integer")
+        return {"running": profiler.running, "samples": profiler.samples, "interval": profiler.interval,
+                "top": profiler.top(top)}
+
+    def get_schedule(self) -> List[Dict[str, Any]]:
+        """The service's scheduled jobs (mint round, report cutoff, tick, settlement) with their timing."""
+        return self.service.scheduler.jobs()
+
+    # --- Dispatch (HTTP threads) --------------------------------------------
+
+    def call(self, method: str, params: Any) -> Any:
+        function = self.methods[method]
+        self.requests.inc()
+        if method in self.direct:
+            return function(**params) if isinstance(params, dict) else function(*params)
+        if isinstance(params, dict):
+            return self.service.query(lambda: function(**params)).result(self.timeout)
+        return self.service.query(function, *params).result(self.timeout)
+
+    def handle(self, request: Any) -> Optional[Dict[str, Any]]:
+        """Answers one JSON-RPC request object; None for notifications (no "id")."""
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return self._error(None, INVALID_REQUEST, "Invalid Request")
+        request_id = request.get("id")
+        method, params = request["method"], request.get("params", [])
+        if method not in self.methods:
+            response = self._error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}")
+        elif not isinstance(params, (list, dict)):
+            response = self._error(request_id, INVALID_PARAMS, "params must be an array or an object")
+        else:
+            try:
+                response = {"jsonrpc": "2.0", "id": request_id, "result": self.call(method, params)}
+            except (TypeError, ValueError) as e:
+                response = self._error(request_id, INVALID_PARAMS, str(e))
+            except Exception as e:  # Includes a timeout waiting for the service thread
+                response = self._error(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        return response if "id" in request else None
+
+    @staticmethod
+    def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class SnifZRPCHandler(BaseHTTPRequestHandler):
+    """
+    POST / takes a JSON-RPC request or batch. GET /status, /tip and /traffic
+    are shortcuts for the matching no-argument methods (for curl and health checks).
+    GET /metrics is the Prometheus scrape endpoint and GET /profile returns the
+    sampling profiler's folded stacks (flamegraph.pl / speedscope input).
+    """
+    rpc: SnifZNodeRPC  # Set on the per-server subclass
+    protocol_version = "HTTP/1.1"
+    GET_ROUTES = {"/status": "snifz_getStatus", "/tip": "snifz_getTip", "/traffic": "snifz_getTraffic"}
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True  # The body is left unread
+            self._send(413, {"error": "request too large"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._send(200, SnifZNodeRPC._error(None, PARSE_ERROR, "Parse error"))
+            return
+        if isinstance(request, list):
+            if not request:
+                self._send(200, SnifZNodeRPC._error(None, INVALID_REQUEST, "Empty batch"))
+                return
+            replies = [reply for reply in map(self.rpc.handle, request) if reply is not None]
+            self._send(200 if replies else 204, replies or None)
+        else:
+            reply = self.rpc.handle(request)
+            self._send(200 if reply is not None else 204, reply)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/metrics":
+            self._send_text(METRICS.render_prometheus(), PROMETHEUS_CONTENT_TYPE)
+            return
+        if path == "/profile":
+            self._send_text(self.rpc.service.profiler.collapsed(), "text/plain; charset=utf-8")
+            return
+        method = self.GET_ROUTES.get(path)
+        if method is None:
+            self._send(404, {"error": f"unknown path {self.path}",
+                             "paths": sorted(self.GET_ROUTES) + ["/metrics", "/profile"]})
+            return
+        reply = self.rpc.handle({"jsonrpc": "2.0", "id": None, "method": method})
+        self._send(500 if "error" in reply else 200, reply.get("result", reply.get("error")))
+
+    def _send(self, status: int, payload: Any):
+        body = b"" if payload is None else json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, text: str, content_type: str):
+        body = text.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Per-request access logs would drown the node's own output
+
+
+def start_rpc_server(rpc: SnifZNodeRPC, host: str = "127.0.0.1",
+                     port: int = DEFAULT_RPC_PORT) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+    """Serves the JSON-RPC API on a daemon thread (port 0 picks a free port)."""
+    handler = type("BoundSnifZRPCHandler", (SnifZRPCHandler,), {"rpc": rpc})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="snifz-rpc", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def _parse_peer(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    if not host or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"expected host:port, got '{value}'")
+    return host, int(port)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="snifz-node",
+                                     description=f"Headless {TOKEN_SYMBOL} node with a local JSON-RPC API.")
+    parser.add_argument("--interface", default="wlan0", help="Capture interface (pcap file for --backend pcap)")
+    parser.add_argument("--backend", default="scapy", choices=("scapy", "afpacket", "pcap"), help="Capture backend")
+    parser.add_argument("--replay-rate", type=float, default=None, metavar="PPS",
+                        help="Packets/sec for --backend pcap (as fast as possible if omitted)")
+    parser.add_argument("--replay-loop", action="store_true", help="Restart the pcap at its end")
+    parser.add_argument("--no-capture", action="store_true", help="Do not start packet capture")
+    parser.add_argument("--store", default=None, help="Block store path (in-memory chain if omitted)")
+    parser.add_argument("--snapshot", default=None,
+                        help="Account-state snapshot path (default: <store>.snap with --store, none in memory)")
+    parser.add_argument("--prune", action="store_true",
+                        help="In-memory chains: drop block bodies covered by the latest snapshot, keeping "
+                             "headers (needs --snapshot; a --store chain keeps bodies on disk only)")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="Verifiable PoT lottery: record each round in the block and verify received blocks")
+    parser.add_argument("--rpc-host", default="127.0.0.1")
+    parser.add_argument("--rpc-port", type=int, default=DEFAULT_RPC_PORT)
+    parser.add_argument("--gossip-host", default="127.0.0.1")
+    parser.add_argument("--gossip-port", type=int, default=DEFAULT_GOSSIP_PORT)
+    parser.add_argument("--no-gossip", action="store_true", help="Run without peers")
+    parser.add_argument("--metrics", action="store_true", help="Time the hot paths from startup (see GET /metrics)")
+    parser.add_argument("--profile", action="store_true", help="Run the sampling profiler from startup")
+    parser.add_argument("--peer", action="append", type=_parse_peer, default=[], metavar="HOST:PORT",
+                        help="Peer to connect to (repeatable)")
+    parser.add_argument("--settle-treasury", default=None, metavar="ADDRESS",
+                        help="Settle minted rewards on-chain from this node-managed EVM account")
+    parser.add_argument("--settle-rpc", default="http://127.0.0.1:8545", help="EVM JSON-RPC endpoint for settlement")
+    parser.add_argument("--settle-token", default=None, metavar="ADDRESS",
+                        help="ERC-20 token contract (native transfers if omitted)")
+    parser.add_argument("--settle-journal", default=None, help="Settlement journal path (default: <store>.settle)")
+    parser.add_argument("--settle-window", type=int, default=SETTLEMENT_WINDOW_BLOCKS,
+                        help="Confirmed blocks aggregated per settlement batch")
+    args = parser.parse_args(argv)
+    if args.prune and args.store:
+        parser.error("--prune applies to in-memory chains only: a --store chain already keeps bodies on disk")
+    if args.prune and not args.snapshot:
+        parser.error("--prune needs --snapshot (bodies are only dropped once a snapshot covers them)")
+    if args.settle_treasury and not (args.settle_journal or args.store):
+        parser.error("--settle-treasury needs --settle-journal or --store (the journal must survive restarts)")
+
+    blockchain = SnifZBlockchain(store_path=args.store, snapshot_path=args.snapshot, prune=args.prune)
+    service = SnifZNodeService(interface=args.interface, blockchain=blockchain, gossip=not args.no_gossip,
+                               backend=args.backend, gossip_host=args.gossip_host, gossip_port=args.gossip_port,
+                               deterministic=args.deterministic)
+    service.sniffer.replay_rate = args.replay_rate
+    service.sniffer.replay_loop = args.replay_loop
+    if args.metrics:
+        service.set_metrics(True)
+    if args.profile:
+        service.set_profiling(True)
+    service.start()
+    for host, port in args.peer:
+        service.connect_peer(host, port)
+    if not args.no_capture:
+        service.toggle_sniffer()
+    settlement = None
+    if args.settle_treasury:
+        connector = SnifZWeb3Connector(args.settle_rpc)
+        connector.token_contract = args.settle_token
+        settlement = SnifZRewardSettlement(blockchain, connector, args.settle_treasury,
+                                           args.settle_journal or args.store + ".settle",
+                                           window_blocks=args.settle_window)
+        # The service's scheduler collects on its thread; transfers run on the settlement thread's own loop
+        settlement.start_in_thread(interval=None)
+        service.schedule_settlement(settlement)
+    server, _ = start_rpc_server(SnifZNodeRPC(service, settlement=settlement), args.rpc_host, args.rpc_port)
+    print(f"[{TOKEN_SYMBOL}] snifz-node serving JSON-RPC on http://{args.rpc_host}:{server.server_address[1]}/")
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    while not stopping.wait(1.0):
+        pass
+    print("[*] Shutting down snifz-node...")
+    server.shutdown()
+    service.stop()
+    if settlement is not None:
+        settlement.close()
+
+
+if __name__ == "__main__":
+    main()
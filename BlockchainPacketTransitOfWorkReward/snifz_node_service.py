@@ -0,0 +1,469 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from snifz_blockchain_core import Block, SnifZBlockchain
+from snifz_packet_sniffer import SnifZPacketSniffer
+from sniff_reward_logic import SnifZRewardSystem
+from snifz_web3_connect import SnifZWeb3Connector
+from snifz_chain_validator import SnifZChainValidator, check_block_rules
+from snifz_capture_manager import SnifZCaptureManager, ALL_INTERFACES
+from snifz_peer_gossip import SnifZGossipNode, SnifZPeerConnection, DEFAULT_GOSSIP_PORT
+from snifz_chain_sync import SnifZChainSync
+from snifz_metrics import METRICS, SnifZSamplingProfiler, format_seconds
+from snifz_timeseries import SnifZTimeSeriesStore
+from snifz_scheduler import SnifZScheduler
+from snifz_settlement import SETTLEMENT_POLL_INTERVAL
+
+DEFAULT_FRAME_RATE = 10.0  # State snapshots published per second (at most)
+TICK_SECONDS = 1.0  # Period of the functional loop (live rates, traffic reports, sync check)
+REPORT_CUTOFF_SECONDS = 0.5  # Final traffic report to peers this long before each mint boundary
+MINT_RETRY_SECONDS = 1.0  # Retry delay of a round that produced no block (no traffic reported)
+SYNC_BACKOFF_SECONDS = 30.0  # A peer whose sync gained nothing is not synced from again for this long...
+SYNC_BACKOFF_MAX = 600.0  # ...doubling per fruitless sync up to this
+SYNC_CANCEL_GRACE = 5.0  # Extra wait for a timed-out sync to unwind on the gossip loop
+HOT_PATH_ROWS = 4  # Hot paths summarized in the state (GUI W8)
+GRID_ROWS = 8  # Busiest nodes shown in the W13 traffic grid
+GRID_WINDOW_SECONDS = 10  # Averaging window of the grid's rates
+
+
+class SnifZNodeService:
+    """
+    The node backend, run on its own thread: it owns the chain, the reward
+    system, the sniffer/capture manager, the validator and the gossip node.
+
+    Timed work runs from a SnifZScheduler driven by the service loop: the
+    functional loop (live rates, traffic reports, sync check) every
+    TICK_SECONDS, and each mint round exactly at its interval boundary,
+    preceded by a final traffic report to peers (REPORT_CUTOFF_SECONDS
+    before) and, with settlement attached, followed by a settlement pass.
+    The loop sleeps until the next deadline, a command or, with an `on_state`
+    listener attached, the next frame; it then publishes a small state dict to
+    `on_state` at most `frame_rate` times per second, and only when something
+    in it changed. Headless, it only wakes for deadlines and commands.
+    Frontends never touch the backend objects directly: they call the
+    command methods (toggle_sniffer, change_interface, connect_peer), which
+    are queued and executed on the service thread, and read through query().
+    Nothing here depends on Qt, so blocks are minted the same way under the
+    GUI and in the headless daemon.
+
+    When a peer advertises a longer chain, the tick runs a chain sync on the
+    gossip loop and waits for it, so blocks are never appended from two
+    threads at once. Blocks announced by peers are handed to this thread
+    too: one that extends our tip is validated, appended and relayed; any
+    other only raises the peer's tip, so the next tick syncs. After a sync
+    the new tip is announced to every peer.
+    """
+    def __init__(self, interface: str = "wlan0", frame_rate: float = DEFAULT_FRAME_RATE,
+                 blockchain: Optional[SnifZBlockchain] = None, gossip: bool = True,
+                 backend: str = "scapy", gossip_host: str = "127.0.0.1", gossip_port: int = DEFAULT_GOSSIP_PORT,
+                 deterministic: bool = False):
+        self.blockchain = blockchain or SnifZBlockchain()
+        self.web3_connector = SnifZWeb3Connector()
+        self.my_address = self.web3_connector.generate_unique_core_address()
+        # Deterministic PoT: minted blocks record the round and received blocks must pass verify_pot_block
+        self.deterministic = deterministic
+        self.reward_system = SnifZRewardSystem(self.blockchain, self.my_address, deterministic=deterministic)
+        self.backend = backend
+        self.sniffer = SnifZPacketSniffer(interface=interface, backend=backend)
+        self.validator = SnifZChainValidator(self.blockchain)
+        # Peer gossip runs on its own event loop thread; reports feed register_traffic_from_node
+        self.gossip = None
+        self.chain_sync = None
+        if gossip:
+            self.gossip = SnifZGossipNode(self.my_address, self.reward_system, self.blockchain,
+                                          host=gossip_host, port=gossip_port)
+            self.chain_sync = SnifZChainSync(self.blockchain, self.gossip, deterministic=deterministic)
+            self.gossip.on_block = self._on_announced_block
+        self.frame_rate = max(0.1, frame_rate)
+        # Deadlines in the reward system's clock, so mint rounds land on its interval boundaries
+        self.scheduler = SnifZScheduler(clock=self.reward_system.clock, wake=self._wake, log=self.log)
+        self.settlement = None
+        self._settlement_interval = SETTLEMENT_POLL_INTERVAL
+        self.on_state: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.on_log: Optional[Callable[[str], None]] = None
+        self._commands: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._live_rate = 0.0
+        self._sync_backoff: Dict[str, Tuple[float, float]] = {}  # peer address -> (retry at, current delay)
+        self._validation_text = "W7: Chain Validation Log: Initializing..."
+        self._published: Optional[Dict[str, Any]] = None
+        self._hot_paths: tuple = ()
+        self._traffic_grid: tuple = ()
+        # Per-node history lives with the reward system (peer reports land there); per-interface here
+        self.interface_history = SnifZTimeSeriesStore()
+        self.profiler = SnifZSamplingProfiler()
+        self.blocks_minted = METRICS.counter("snifz_blocks_minted_total", "Blocks minted by this node's PoT round")
+        METRICS.gauge("snifz_chain_height", "Blocks in the local chain", lambda: len(self.blockchain.chain))
+        METRICS.gauge("snifz_mempool_transactions", "Pending transactions", lambda: len(self.blockchain.mempool))
+        METRICS.gauge("snifz_peers", "Connected gossip peers",
+                      lambda: len(self.gossip.peers) if self.gossip is not None else 0)
+        METRICS.gauge("snifz_sniffing", "1 while packet capture runs", lambda: int(self.sniffer._is_sniffing))
+        METRICS.gauge("snifz_interval_packets", "Packets counted in the current mint interval",
+                      lambda: self.sniffer.packets_in_count + self.sniffer.packets_out_count)
+        METRICS.gauge("snifz_live_packet_rate", "Packets/sec over the last tick", lambda: self._live_rate)
+        METRICS.gauge("snifz_seconds_until_mint", "Seconds until the next PoT round",
+                      self.reward_system.seconds_until_mint)
+
+    # --- Lifecycle ----------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.gossip is not None:
+            self.gossip.start_in_thread()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snifz-node-service", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the loop (finishing the current tick), the capture and the block store."""
+        self._stop.set()
+        self._commands.put(None)  # Wake the loop
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.sniffer._is_sniffing:
+            self.sniffer.stop_sniffing()
+        self.profiler.stop()
+        self.blockchain.close()
+
+    def _wake(self):
+        """Cuts the loop's wait short when another thread schedules an earlier job."""
+        if threading.current_thread() is not self._thread:
+            self._commands.put(None)
+
+    def log(self, message: str):
+        print(f"[*] {message}")
+        if self.on_log is not None:
+            self.on_log(message)
+
+    # --- Commands (any thread) ----------------------------------------------
+
+    def submit(self, command: Callable, *args):
+        """Runs `command(*args)` on the service thread."""
+        self._commands.put((command, args))
+
+    def query(self, function: Callable, *args) -> Future:
+        """Runs `function(*args)` on the service thread and returns a Future for its result."""
+        future: Future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(function(*args))
+            except Exception as e:
+                future.set_exception(e)
+        self.submit(run)
+        return future
+
+    def toggle_sniffer(self):
+        self.submit(self._toggle_sniffer)
+
+    def connect_peer(self, host: str, port: int):
+        self.submit(self._connect_peer, host, port)
+
+    def change_interface(self, interface_name: str):
+        self.submit(self._change_interface, interface_name)
+
+    def set_metrics(self, enabled: bool):
+        """Switches hot-path timing on or off; safe from any thread (the swap is atomic per method)."""
+        if enabled:
+            METRICS.instrument_hot_paths()
+            METRICS.enable()
+        else:
+            METRICS.disable()
+            self._hot_paths = ()
+        self.log(f"Hot-path metrics {'enabled' if enabled else 'disabled'}.")
+
+    def set_profiling(self, enabled: bool, reset: bool = False):
+        """Starts or stops the sampling profiler (any thread)."""
+        if reset:
+            self.profiler.reset()
+        if enabled:
+            self.profiler.start()
+        else:
+            self.profiler.stop()
+
+    def schedule_settlement(self, settlement, interval: float = SETTLEMENT_POLL_INTERVAL):
+        """
+        Collects confirmed rewards on the service thread (every `interval`
+        seconds and right after each mint) and wakes the settlement thread
+        when there is something to settle. Start that thread with interval=None.
+        """
+        self.settlement = settlement
+        self._settlement_interval = interval
+        self.scheduler.every("settlement", interval, self._settlement_pass)
+
+    def _toggle_sniffer(self):
+        if self.sniffer._is_sniffing:
+            self.sniffer.stop_sniffing()
+            self.log("Packet capture stopped.")
+        else:
+            self.sniffer.start_sniffing()
+            self.log(f"Packet capture started on {self.sniffer.interface}.")
+            self._schedule_mint()  # A boundary that passed while idle is minted right away
+
+    def _change_interface(self, interface_name: str):
+        if self.sniffer._is_sniffing:
+            self.log("Stop sniffer before changing interface.")
+            return
+        if interface_name == ALL_INTERFACES:
+            if self.backend == "pcap":
+                self.log("All interfaces needs a live capture backend; the pcap backend replays one file.")
+                return
+            self.sniffer = SnifZCaptureManager(backend=self.backend)
+            interface_name = ", ".join(self.sniffer.interfaces)
+        elif isinstance(self.sniffer, SnifZCaptureManager):
+            self.sniffer = SnifZPacketSniffer(interface=interface_name, backend=self.backend)
+        else:
+            self.sniffer.interface = interface_name
+        self.log(f"Interface set to {interface_name}. Ready to start.")
+
+    def _connect_peer(self, host: str, port: int):
+        if self.gossip is None or self.gossip.loop is None:
+            self.log(f"Gossip is not running; cannot connect to {host}:{port}.")
+            return
+        # The peer's HELLO carries its tip; the next tick syncs if it is ahead of us
+        self.gossip.call_threadsafe(self.gossip.connect(host, port)).result(self.chain_sync.timeout)
+        self.log(f"Connected to peer {host}:{port}.")
+
+    # --- Service thread -----------------------------------------------------
+
+    def _run(self):
+        self.log(f"Your unique core address is: {self.my_address}")
+        self.log("System Initialized. Select an interface and start sniffing.")
+        self._run_chain_validation()
+        self.scheduler.every("tick", TICK_SECONDS, self._tick)
+        self._schedule_mint()
+        frame = 1.0 / self.frame_rate
+        while not self._stop.is_set():
+            self.scheduler.run_pending()
+            if self.on_state is not None:
+                self._publish()
+                timeout = self.scheduler.seconds_until_next(frame)
+            else:
+                timeout = self.scheduler.seconds_until_next()  # Headless: nothing to draw between deadlines
+            try:
+                item = self._commands.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            if item is not None:
+                command, args = item
+                try:
+                    command(*args)
+                except Exception as e:  # A failed command must not kill the node
+                    self.log(f"Command {getattr(command, '__name__', command)} failed: {e}")
+
+    def _run_chain_validation(self):
+        """Validates blocks appended since the last checkpoint and reports to W7."""
+        report = self.validator.validate_chain(incremental=True)
+        if report["valid"]:
+            height = report["checkpoint"][0]
+            self._validation_text = (f"W7: Chain valid: {height} blocks "
+                                     f"({report['checked']} checked in {report['seconds']:.2f}s)")
+        else:
+            self._validation_text = (f"W7: Chain INVALID: {report['errors'][0]} "
+                                     f"(+{len(report['errors']) - 1} more)")
+
+    def _sync_if_behind(self):
+        """
+        Runs a chain sync (blocking this thread for at most the sync timeout)
+        when a peer advertises a longer chain. Tips are only claims: a peer
+        whose sync gained nothing is backed off (SYNC_BACKOFF_SECONDS,
+        doubling), so a peer advertising a height it cannot serve does not
+        stall every tick.
+        """
+        height = len(self.blockchain.chain)
+        now = self.scheduler.clock()
+        for address in [a for a, (retry_at, _) in self._sync_backoff.items() if a not in self.gossip.peers
+                        and retry_at <= now]:
+            del self._sync_backoff[address]  # Disconnected and expired: forget it
+        backed_off = {address for address, (retry_at, _) in self._sync_backoff.items() if retry_at > now}
+        if not any(peer.tip[0] > height and address not in backed_off
+                   for address, peer in list(self.gossip.peers.items())):
+            return
+        timeout = self.chain_sync.timeout
+        # wait_for cancels the sync on the gossip loop and waits for it to unwind, so no block is
+        # appended from that thread once this returns
+        future = self.gossip.call_threadsafe(asyncio.wait_for(self.chain_sync.sync(exclude=backed_off), timeout))
+        try:
+            report = future.result(timeout + SYNC_CANCEL_GRACE)
+        except TimeoutError:
+            future.cancel()
+            report = None
+        gained = len(self.blockchain.chain) > height
+        if report is None:
+            self.log(f"Chain sync timed out after {timeout:.0f}s at height {len(self.blockchain.chain)}.")
+            sources = [address for address, peer in list(self.gossip.peers.items())
+                       if peer.tip[0] > height and address not in backed_off]
+        else:
+            sources = report["sources"]
+        for address in sources:
+            if gained:
+                self._sync_backoff.pop(address, None)
+            else:
+                delay = min(SYNC_BACKOFF_MAX, self._sync_backoff.get(address, (0.0, SYNC_BACKOFF_SECONDS / 2))[1] * 2)
+                self._sync_backoff[address] = (now + delay, delay)
+        if gained:
+            if report is not None:
+                self.log(f"Synced {report['synced']} blocks from {report['peers']} peers; "
+                         f"height {report['height']}.")
+            self._run_chain_validation()
+            # Peers behind us learn the new tip (and append it, or sync from us)
+            self.gossip.call_threadsafe(self.gossip.announce_block(self.blockchain.last_block))
+
+    async def _on_announced_block(self, block: Block, peer: SnifZPeerConnection) -> bool:
+        """Gossip on_block hook (gossip thread): returns whether the service thread appended the block."""
+        return await asyncio.wrap_future(self.query(self._accept_block, block, peer.remote_address))
+
+    def _accept_block(self, block: Block, source: str) -> bool:
+        """Appends an announced block if it extends our tip and passes the block rules."""
+        height = len(self.blockchain.chain)
+        if block.index != height + 1:
+            return False  # Gap or competing tip: the peer's tip is now ahead, so the next tick syncs
+        tip = self.blockchain.last_block
+        errors = check_block_rules(block, height, self.deterministic)
+        if block.prev_hash != tip.compute_hash():
+            errors.append(f"Block {block.index}: prev_hash does not link to block {tip.index}")
+        if block.timestamp < tip.timestamp:
+            errors.append(f"Block {block.index}: timestamp goes backwards")
+        if errors:
+            self.log(f"Block {block.index} from {source[:10]}... rejected: {errors[0]}")
+            return False
+        self.blockchain.append_block(block)
+        self.log(f"Block {block.index} received from {source[:10]}...")
+        self._run_chain_validation()
+        return True
+
+    def _tick(self):
+        """One pass of the functional loop (formerly SnifZGUI._run_functional_loop)."""
+        if self.gossip is not None and self.gossip.loop is not None:
+            self._sync_if_behind()
+        sniffer = self.sniffer
+        if sniffer._is_sniffing:
+            live = sniffer.get_live_traffic_data()
+            self._live_rate = live["packets_in"] + live["packets_out"]
+            self._record_history(sniffer)
+            self._report_traffic()
+        else:
+            self._live_rate = 0.0
+        self._traffic_grid = self._grid_rows()
+        if METRICS.enabled:
+            self._hot_paths = tuple(
+                f"{row['name'].removeprefix('snifz_').removesuffix('_seconds')}: {row['count']:,} calls, "
+                f"p50 {format_seconds(row['p50'])}, p99 {format_seconds(row['p99'])}, total {row['seconds']:.2f}s"
+                for row in METRICS.hot_paths(HOT_PATH_ROWS))
+
+    def _report_traffic(self):
+        """Shares this node's interval traffic with peers (coalesced into the next gossip batch)."""
+        sniffer = self.sniffer
+        if sniffer._is_sniffing and self.gossip is not None and self.gossip.loop is not None:
+            self.gossip.report_traffic_threadsafe(self.my_address, {
+                "packets_in": sniffer.packets_in_count, "packets_out": sniffer.packets_out_count})
+
+    # --- Scheduled jobs -----------------------------------------------------
+
+    def _schedule_mint(self, deadline: Optional[float] = None):
+        """Arms the next mint round (and its report cutoff) at the reward system's interval boundary."""
+        deadline = self.reward_system.next_mint_time() if deadline is None else deadline
+        self.scheduler.at("mint", deadline, self._mint_round)
+        cutoff = deadline - REPORT_CUTOFF_SECONDS
+        if cutoff > self.scheduler.clock():
+            self.scheduler.at("report_cutoff", cutoff, self._report_traffic)
+
+    def _mint_round(self):
+        """Closes the sniffer's traffic window and runs the PoT round (the "mint" job)."""
+        sniffer = self.sniffer
+        if not sniffer._is_sniffing:
+            return  # Re-armed when capture starts
+        retry: Optional[float] = self.scheduler.clock() + MINT_RETRY_SECONDS
+        try:
+            # The mint window accumulates the whole interval; reading it closes it and opens the next one
+            if self.reward_system.mint_block(sniffer.get_current_traffic_data()):
+                retry = None
+                self._after_mint()
+        finally:
+            # Always re-armed: a round that raised (e.g. a store write error) is retried, not dropped
+            self._schedule_mint(retry)
+
+    def _settlement_pass(self):
+        settlement = self.settlement
+        settlement.collect()
+        if settlement.open_batches or settlement.due():
+            settlement.wake()
+
+    def _record_history(self, sniffer):
+        """Feeds the capture counters into the per-interface and per-node traffic history."""
+        node_totals = None
+        for interface, totals in sniffer.interface_totals().items():
+            self.interface_history.record_totals(interface, totals)
+            node_totals = totals if node_totals is None else [a + b for a, b in zip(node_totals, totals)]
+        if node_totals is not None:
+            self.reward_system.traffic_history.record_totals(self.my_address, node_totals)
+
+    def _grid_rows(self) -> tuple:
+        """The busiest nodes over the last GRID_WINDOW_SECONDS as (address, in pkt/s, out pkt/s)."""
+        history = self.reward_system.traffic_history
+        rows = []
+        for address, _ in history.top(GRID_ROWS, GRID_WINDOW_SECONDS):
+            rates = history.rates(address, GRID_WINDOW_SECONDS)
+            rows.append((address, round(rates["packets_in"]), round(rates["packets_out"])))
+        return tuple(rows)
+
+    def _after_mint(self):
+        last_block = self.blockchain.last_block
+        winner = last_block.transactions[0]['recipient']
+        self.blocks_minted.inc()
+        if self.settlement is not None:
+            # Pull the pass forward; the block is settled once it has enough confirmations on top
+            self.scheduler.at("settlement", self.scheduler.clock(), self._settlement_pass, self._settlement_interval)
+        self.log(f"Block {last_block.index} minted! Winner: {winner[:10]}...")
+        self._run_chain_validation()
+        if self.gossip is not None and self.gossip.loop is not None:
+            self.gossip.call_threadsafe(self.gossip.announce_block(last_block))
+        if winner == self.my_address:
+            # Wallet-side confirmation: the reward (position 0) against the block header only
+            proof = self.blockchain.get_transaction_proof(last_block.index, 0)
+            if self.blockchain.verify_transaction_proof(proof, last_block.compute_hash()):
+                proof_size = len(proof["header"]) + sum(len(step) for step in proof["path"])
+                self.log(f"Reward confirmed by Merkle proof ({proof_size} bytes).")
+
+    def state(self) -> Dict[str, Any]:
+        """The values the frontend displays; cheap enough to build every frame."""
+        sniffer = self.sniffer
+        interval = self.reward_system.mint_interval
+        next_mint = self.scheduler.deadline("mint")
+        if next_mint is None:  # Not armed (capture stopped): the boundary it will be armed for
+            next_mint = self.reward_system.next_mint_time()
+        remaining = min(interval, max(0.0, next_mint - self.reward_system.clock()))
+        sniffing = sniffer._is_sniffing
+        return {
+            "address": self.my_address,
+            "block_count": self.blockchain.last_block.index,
+            "mint_remaining": int(remaining),
+            "next_mint_at": next_mint,
+            "progress": int((interval - remaining) / interval * 100),
+            "difficulty": self.blockchain.difficulty,
+            "validation": self._validation_text,
+            "sniffing": sniffing,
+            "interface": ALL_INTERFACES if isinstance(sniffer, SnifZCaptureManager) else sniffer.interface,
+            "total_io": sniffer.packets_in_count + sniffer.packets_out_count if sniffing else 0,
+            "live_rate": round(self._live_rate),
+            "balance": round(self.reward_system.get_balance(self.my_address), 2),
+            "peers": len(self.gossip.peers) + 1 if self.gossip is not None else 1,
+            "metrics": METRICS.enabled,
+            "hot_paths": self._hot_paths,
+            "traffic_grid": self._traffic_grid,
+        }
+
+    def _publish(self):
+        state = self.state()
+        if state != self._published:  # Coalesce: unchanged frames are not sent at all
+            self._published = state
+            if self.on_state is not None:
+                self.on_state(state)
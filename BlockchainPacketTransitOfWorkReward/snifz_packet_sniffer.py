@@ -1,22 +1,56 @@
-from scapy.all import sniff, Packet
 from threading import Thread
-import time
 from collections import deque
+from typing import TYPE_CHECKING
+from snifz_traffic_classifier import SnifZTrafficClassifier
+from snifz_traffic_counters import SnifZTrafficCounters
+
+if TYPE_CHECKING:
+    from scapy.packet import Packet
 
 class SnifZPacketSniffer:
-    """Listens, counts, and reports packet I/O data for the PoT algorithm."""
-    def __init__(self, interface: str):
+    """
+    Listens, counts, and reports packet I/O data for the PoT algorithm.
+
+    backend="scapy" dissects every frame with scapy (portable, slow);
+    backend="afpacket" counts straight from a Linux TPACKET_V3 ring with an
+    optional kernel BPF filter (see snifz_afpacket_capture);
+    backend="pcap" replays the pcap file named by `interface` instead of
+    capturing, at full speed or at replay_rate packets/sec (see snifz_pcap_replay).
+    """
+    BACKENDS = ("scapy", "afpacket", "pcap")
+
+    def __init__(self, interface: str, backend: str = "scapy", bpf_filter=None, counter_shard=None,
+                 replay_rate=None, replay_loop: bool = False):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown capture backend '{backend}', expected one of {self.BACKENDS}")
         self.interface = interface
+        self.backend = backend
+        self.bpf_filter = bpf_filter # tcpdump expression or classic BPF program (afpacket only)
         self._is_sniffing = False
-        self.packets_in_count = 0
-        self.packets_out_count = 0
+        self.traffic = SnifZTrafficCounters() # Direction and per-protocol packet/byte counters
+        self.counter_shard = counter_shard # Externally owned shard (e.g. shared memory for a capture process)
+        if counter_shard is not None:
+            self.traffic.add_shard(counter_shard)
+        self.mint_window = self.traffic.window() # Traffic accumulated over the current mint interval
+        self.ui_window = self.traffic.window() # Short window behind the live rate shown in the GUI
+        self.replay_rate = replay_rate # Packets/sec for the pcap backend (None = as fast as possible)
+        self.replay_loop = replay_loop # Restart the pcap at its end instead of stopping
+        self.classifier = None
+        self._replay = None
         self.session_io_history = deque(maxlen=10) # Store recent block I/O
 
     def start_sniffing(self):
         """Starts the packet sniffing thread."""
         if not self._is_sniffing:
             self._is_sniffing = True
-            print(f"[*] Starting packet capture on interface: {self.interface}...")
+            if self.backend == "pcap":
+                from snifz_pcap_replay import SnifZPcapReplay
+                self._replay = SnifZPcapReplay(self.interface, rate=self.replay_rate, loop=self.replay_loop)
+                self.classifier = self._replay.classifier() # Direction from the recording host's addresses
+            else:
+                # Resolve this interface's own MAC/IPs so frames can be classified as in/out
+                self.classifier = SnifZTrafficClassifier.for_interface(self.interface)
+            print(f"[*] Starting packet capture on interface: {self.interface} ({self.backend})...")
             # Run sniff in a separate thread to prevent GUI lockup
             self.sniff_thread = Thread(target=self._sniff_loop, daemon=True)
             self.sniff_thread.start()
@@ -26,44 +60,63 @@ class SnifZPacketSniffer:
         self._is_sniffing = False
         print("[*] Packet capture stopped.")
 
-    def _packet_callback(self, packet: Packet):
+    @property
+    def packets_in_count(self) -> int:
+        """Inbound packets in the current mint interval."""
+        return self.mint_window.peek()["packets_in"]
+
+    @property
+    def packets_out_count(self) -> int:
+        """Outbound packets in the current mint interval."""
+        return self.mint_window.peek()["packets_out"]
+
+    def _packet_callback(self, packet: 'Packet'):
         """Callback function executed on every captured packet."""
         if not self._is_sniffing:
             return
+        # Classify from the raw frame bytes scapy captured, not from its dissected layers
+        frame = packet.original
+        self.classifier.count_frame(frame, 0, len(frame))
 
-        # Simple logic: check direction based on IP layer
-        # This requires more complex logic for accurate in/out tracking, 
-        # but provides the skeleton concept.
-        
-        # Example: Check if the packet is destined for this machine's IP (Inbound)
-        # Note: True I/O is usually determined by the network adapter driver.
-        # For Scapy, we approximate:
-        
-        # Assume all packets are counted as I/O for the PoT metric
-        self.packets_in_count += 1
-        self.packets_out_count += 1
-        
     def _sniff_loop(self):
-        """The main sniffing loop using scapy."""
-        # Use store=0 to avoid excessive memory usage
+        """The main sniffing loop, dispatched to the selected capture backend."""
+        # The capture thread is the only writer of its own counter shard
+        self.classifier.counters = self.counter_shard if self.counter_shard is not None else self.traffic.shard()
         try:
-            sniff(iface=self.interface, prn=self._packet_callback, stop_filter=lambda x: not self._is_sniffing, store=0)
+            if self.backend == "afpacket":
+                from snifz_afpacket_capture import SnifZAFPacketCapture
+                capture = SnifZAFPacketCapture(self.interface, bpf_filter=self.bpf_filter)
+                capture.run(lambda: self._is_sniffing, classifier=self.classifier)
+            elif self.backend == "pcap":
+                self._replay.run(lambda: self._is_sniffing, classifier=self.classifier)
+                if self._is_sniffing: # The file ended (not stopped by the user)
+                    print(f"[*] Replay of {self.interface} finished ({self._replay.packets_replayed} packets).")
+                    self.stop_sniffing()
+            else:
+                from scapy.all import sniff  # scapy takes seconds to import; only load it once capture starts
+                # Use store=0 to avoid excessive memory usage
+                sniff(iface=self.interface, prn=self._packet_callback, stop_filter=lambda x: not self._is_sniffing, store=0)
         except Exception as e:
             print(f"[!] Sniffing Error on {self.interface}: {e}")
             self.stop_sniffing()
+        finally:
+            if self._replay is not None:
+                self._replay.close()
+                self._replay = None
 
     def get_current_traffic_data(self) -> dict[str, int]:
-        """Resets and returns the traffic count for the PoT algorithm."""
-        data = {
-            "packets_in": self.packets_in_count,
-            "packets_out": self.packets_out_count
-        }
-        # Reset counters for the next 5-minute block
-        self.packets_in_count = 0
-        self.packets_out_count = 0
+        """
+        Resets and returns the traffic accumulated since the last call, for the PoT algorithm.
+        Call this once per mint interval; use get_live_traffic_data() for UI refreshes.
+        """
+        data = self.mint_window.roll() # Snapshot-and-swap: no increments are lost or double counted
         self.session_io_history.append(data)
         return data
 
-# Example Usage (To be run by GUI):
-sniffer = SnifZPacketSniffer(interface="wlan0") # Replace "wlan0" with your adapter name
-sniffer.start_sniffing()
\ No newline at end of file
+    def interface_totals(self) -> dict[str, list]:
+        """Monotonic counters (indexed like COUNTER_FIELDS) per interface, for the traffic history."""
+        return {self.interface: self.traffic.totals()}
+
+    def get_live_traffic_data(self) -> dict[str, float]:
+        """Returns per-second rates since the previous call (independent of the mint window)."""
+        return self.ui_window.roll_rates()
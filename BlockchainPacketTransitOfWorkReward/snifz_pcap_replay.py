@@ -0,0 +1,171 @@
+import struct
+import time
+from collections import Counter
+from typing import Callable, Iterable, Iterator, Optional, Set, Tuple
+
+from snifz_traffic_classifier import SnifZTrafficClassifier
+
+PCAP_MAGIC_MICRO = 0xA1B2C3D4
+PCAP_MAGIC_NANO = 0xA1B23C4D
+PCAP_FILE_HEADER = struct.Struct("IHHiIII")  # magic, major, minor, thiszone, sigfigs, snaplen, linktype
+PCAP_RECORD_SIZE = 16  # ts_sec, ts_frac, incl_len, orig_len
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101  # Frames start with the IP header
+LINKTYPE_RAW_LEGACY = 12
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL = 113  # "any"-device captures: 16-byte cooked header with the packet direction
+SLL_HEADER_SIZE = 16
+RAW_LINKTYPES = (LINKTYPE_RAW, LINKTYPE_RAW_LEGACY, LINKTYPE_IPV4, LINKTYPE_IPV6)
+
+PACE_EVERY = 256  # Frames between pacing checks (and on_packets reports) at most
+PACE_SLEEP_SECONDS = 0.004  # Paced replays check the clock at least this often, so bursts stay this short
+GUESS_FRAMES = 10000  # Frames sampled to guess the recording host's addresses
+
+
+def write_pcap(path: str, frames: Iterable[bytes], linktype: int = LINKTYPE_ETHERNET,
+               start: float = 0.0, interval: float = 0.0001) -> int:
+    """Writes frames to a classic (microsecond) pcap file; returns how many were written."""
+    count = 0
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", PCAP_MAGIC_MICRO, 2, 4, 0, 0, 65535, linktype))
+        for count, frame in enumerate(frames, 1):
+            timestamp = start + (count - 1) * interval
+            f.write(struct.pack("<IIII", int(timestamp), int(timestamp % 1 * 1e6), len(frame), len(frame)))
+            f.write(frame)
+    return count
+
+
+class SnifZPcapReplay:
+    """
+    Offline capture source: replays a classic pcap file into the same
+    classifier the live backends use, so recorded traffic can stand in for an
+    interface (SnifZPacketSniffer backend="pcap") and hot paths can be measured.
+
+    The file is read once and every frame is classified in place at its
+    offset, like frames in the AF_PACKET ring (no per-packet copies). By default frames are replayed as fast as
+    they can be counted. `rate` paces the replay at that many packets per
+    second, checking the clock every few milliseconds of traffic (every frame
+    at low rates) so frames are not released in bursts, and `loop` starts
+    over at the end of the file until stopped.
+
+    Ethernet, raw IP and Linux cooked (SLL) captures are supported. SLL
+    captures carry the packet direction. For the other link types it comes
+    from the recording host's MAC/IPs, which are guessed from the busiest
+    address in the capture unless they are given.
+    """
+    def __init__(self, path: str, rate: Optional[float] = None, loop: bool = False):
+        self.path = path
+        self.rate = rate
+        self.loop = loop
+        self.packets_replayed = 0
+        with open(path, "rb") as f:
+            self._data = f.read()
+        if len(self._data) < PCAP_FILE_HEADER.size:
+            raise ValueError(f"{path} is too short to be a pcap file")
+        magic = struct.unpack_from("<I", self._data)[0]
+        if magic in (PCAP_MAGIC_MICRO, PCAP_MAGIC_NANO):
+            self._endian = "<"
+        elif struct.unpack_from(">I", self._data)[0] in (PCAP_MAGIC_MICRO, PCAP_MAGIC_NANO):
+            self._endian = ">"
+        else:
+            raise ValueError(f"{path} is not a classic pcap file (pcapng is not supported; convert with editcap -F pcap)")
+        self.linktype = struct.unpack_from(self._endian + "I", self._data, 20)[0] & 0xFFFF
+        if self.linktype not in (LINKTYPE_ETHERNET, LINKTYPE_LINUX_SLL) + RAW_LINKTYPES:
+            raise ValueError(f"{path}: unsupported pcap link type {self.linktype}")
+        self._record = struct.Struct(self._endian + "IIII")
+
+    def close(self):
+        self._data = b""
+
+    def frames(self) -> Iterator[Tuple[int, int, int]]:
+        """Yields (offset of the frame in the file, captured length, length on the wire)."""
+        data, unpack_from = self._data, self._record.unpack_from
+        offset, end = PCAP_FILE_HEADER.size, len(self._data)
+        while offset + PCAP_RECORD_SIZE <= end:
+            _, _, captured, wire = unpack_from(data, offset)
+            offset += PCAP_RECORD_SIZE
+            if offset + captured > end:
+                break  # Truncated last record (capture killed mid-write)
+            yield offset, captured, wire
+            offset += captured
+
+    # --- Classification -----------------------------------------------------
+
+    def guess_local_addresses(self) -> Tuple[Optional[bytes], Set[bytes]]:
+        """The MAC and IP that appear in the most frames: the host the capture was taken on."""
+        macs, ips = Counter(), Counter()
+        data = self._data
+        for count, (offset, captured, _) in enumerate(self.frames()):
+            if count >= GUESS_FRAMES:
+                break
+            l3 = offset
+            if self.linktype == LINKTYPE_ETHERNET:
+                if captured < 14:
+                    continue
+                for mac in (data[offset:offset + 6], data[offset + 6:offset + 12]):
+                    if not mac[0] & 1:  # Skip broadcast/multicast
+                        macs[mac] += 1
+                l3 = offset + 14
+            elif self.linktype == LINKTYPE_LINUX_SLL:
+                continue
+            version = data[l3] >> 4 if l3 < offset + captured else 0
+            if version == 4 and captured - (l3 - offset) >= 20:
+                ips.update((data[l3 + 12:l3 + 16], data[l3 + 16:l3 + 20]))
+            elif version == 6 and captured - (l3 - offset) >= 40:
+                ips.update((data[l3 + 8:l3 + 24], data[l3 + 24:l3 + 40]))
+        mac = macs.most_common(1)[0][0] if macs else None
+        return mac, {ips.most_common(1)[0][0]} if ips else set()
+
+    def classifier(self, local_mac: Optional[bytes] = None, local_ips: Optional[Set[bytes]] = None,
+                   counters=None) -> SnifZTrafficClassifier:
+        if local_mac is None and local_ips is None and self.linktype != LINKTYPE_LINUX_SLL:
+            local_mac, local_ips = self.guess_local_addresses()
+        return SnifZTrafficClassifier(local_mac, local_ips or set(),
+                                      has_ethernet=self.linktype == LINKTYPE_ETHERNET, counters=counters)
+
+    # --- Replay -------------------------------------------------------------
+
+    def run(self, is_running: Callable[[], bool], on_packets: Optional[Callable[[int], None]] = None,
+            classifier: Optional[SnifZTrafficClassifier] = None):
+        """
+        Replays until the file ends (or, with loop, until is_running() returns
+        False), with the same contract as SnifZAFPacketCapture.run.
+        """
+        count_frame = classifier.count_frame if classifier is not None else None
+        data = self._data
+        sll = self.linktype == LINKTYPE_LINUX_SLL
+        interval = 1.0 / self.rate if self.rate else 0.0
+        batch = max(1, min(PACE_EVERY, int(PACE_SLEEP_SECONDS / interval))) if interval else PACE_EVERY
+        started = time.perf_counter()
+        replayed = 0
+        while is_running():
+            pending = 0
+            for offset, captured, wire in self.frames():
+                if count_frame is not None:
+                    if sll:
+                        if captured >= SLL_HEADER_SIZE:
+                            count_frame(data, offset + SLL_HEADER_SIZE, wire - SLL_HEADER_SIZE,
+                                        (data[offset] << 8) | data[offset + 1])
+                    else:
+                        count_frame(data, offset, wire)
+                pending += 1
+                if pending == batch:
+                    replayed += pending
+                    if on_packets is not None:
+                        on_packets(pending)
+                    pending = 0
+                    if not is_running():
+                        break
+                    if interval:
+                        ahead = started + replayed * interval - time.perf_counter()
+                        if ahead > 0:
+                            time.sleep(ahead)
+            replayed += pending
+            if pending and on_packets is not None:
+                on_packets(pending)
+            if not self.loop:
+                break
+        self.packets_replayed += replayed
+
@@ -0,0 +1,443 @@
+import asyncio
+import hashlib
+import re
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from snifz_blockchain_core import Block
+from snifz_codec import encode, decode
+
+DEFAULT_GOSSIP_PORT = 47800
+FRAME_HEADER = struct.Struct("!IB")  # payload length, message type
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Message types (payloads are snifz_codec values)
+MSG_HELLO = 1         # {"node", "height", "tip"}
+MSG_TRAFFIC = 2       # ((address, traffic_data), ...) - batched, latest report per node
+MSG_NEW_BLOCK = 3     # Block.serialize() bytes
+MSG_TIP_REQUEST = 4   # None
+MSG_TIP = 5           # {"height", "tip"}
+MSG_GET_HEADERS = 6   # {"start", "count"} - heights are 1-based block indexes
+MSG_HEADERS = 7       # {"start", "count", "headers": ((index, prev_hash, hash), ...)}
+MSG_GET_BLOCKS = 8    # {"start", "count"}
+MSG_BLOCKS = 9        # {"start", "count", "blocks": (Block.serialize() bytes, ...)}
+MAX_HEADERS_PER_REPLY = 2000
+MAX_BLOCKS_PER_REPLY = 500
+MAX_REPORTS_PER_FRAME = 4096  # Traffic reports per batch frame (larger batches are split when flushed)
+MAX_ADDRESS_LENGTH = 128
+TRAFFIC_COUNTERS = ("packets_in", "packets_out", "bytes_in", "bytes_out")  # The only fields a report may carry
+MAX_TRACKED_REPORTS = 65536  # Report digests remembered for de-duplication (least recently updated go first)
+MAX_SEEN_BLOCKS = 4096  # Block hashes remembered so announcements are handled and relayed once
+BLOCK_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def encode_frame(msg_type: int, payload: Any) -> bytes:
+    body = encode(payload)
+    return FRAME_HEADER.pack(len(body), msg_type) + body
+
+
+def check_traffic_batch(batch: Any):
+    """Raises ValueError unless `batch` is a sequence of (address, {counter: non-negative int}) pairs."""
+    if not isinstance(batch, (tuple, list)) or len(batch) > MAX_REPORTS_PER_FRAME:
+        raise ValueError(f"traffic batch must be a sequence of at most {MAX_REPORTS_PER_FRAME} reports")
+    for item in batch:
+        if not isinstance(item, (tuple, list)) or len(item) != 2:
+            raise ValueError("traffic report must be an (address, traffic_data) pair")
+        address, traffic_data = item
+        if not isinstance(address, str) or not 0 < len(address) <= MAX_ADDRESS_LENGTH:
+            raise ValueError(f"traffic report address must be a string of 1-{MAX_ADDRESS_LENGTH} characters")
+        if not isinstance(traffic_data, dict):
+            raise ValueError(f"traffic report for {address} is not a mapping")
+        for key, value in traffic_data.items():
+            if key not in TRAFFIC_COUNTERS:
+                raise ValueError(f"traffic report for {address} has unknown field {key!r}")
+            if type(value) is not int or value < 0:
+                raise ValueError(f"traffic report for {address}: {key} must be a non-negative integer")
+
+
+def check_tip(height: Any, tip: Any) -> Tuple[int, str]:
+    """Returns an advertised (height, tip hash), or raises ValueError unless it is a valid chain tip."""
+    if type(height) is not int or height < 0:
+        raise ValueError("chain tip height must be a non-negative integer")
+    if height == 0 and tip == '':
+        return height, tip  # Empty chain
+    if not isinstance(tip, str) or not BLOCK_HASH_PATTERN.fullmatch(tip):
+        raise ValueError("chain tip must be a 64-character hex block hash")
+    return height, tip
+
+
+class SnifZPeerConnection:
+    """
+    One reusable connection to a peer. Outgoing frames go through a bounded
+    queue, so a slow peer pushes back on its senders instead of growing memory;
+    the writer drains whatever is queued in one write before awaiting drain().
+    """
+    def __init__(self, node: 'SnifZGossipNode', reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, queue_limit: int):
+        self.node = node
+        self.reader = reader
+        self.writer = writer
+        self.remote_address: Optional[str] = None  # Peer node address, learned from HELLO
+        self.tip: Tuple[int, str] = (0, '')  # (height, hash) last advertised by the peer
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=queue_limit)
+        self.closed = False
+        self._waiters: Dict[Tuple[int, Any], asyncio.Future] = {}  # (reply type, key) -> pending request
+        self._tasks = [asyncio.ensure_future(self._write_loop()), asyncio.ensure_future(self._read_loop())]
+
+    async def send(self, msg_type: int, payload: Any):
+        """Queues a frame; waits while the peer's outbox is full (backpressure)."""
+        if not self.closed:
+            await self.outbox.put(encode_frame(msg_type, payload))
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frames = [await self.outbox.get()]
+                while not self.outbox.empty():
+                    frames.append(self.outbox.get_nowait())
+                self.writer.write(b"".join(frames))
+                self.node.stats["frames_out"] += len(frames)
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            await self.close()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                length, msg_type = FRAME_HEADER.unpack(await self.reader.readexactly(FRAME_HEADER.size))
+                if length > MAX_FRAME_SIZE:
+                    print(f"[!] Gossip: oversized frame ({length} bytes) from {self.remote_address}; dropping peer.")
+                    break
+                payload = decode(await self.reader.readexactly(length))
+                self.node.stats["frames_in"] += 1
+                await self.node._dispatch(self, msg_type, payload)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        except (ValueError, TypeError, KeyError, struct.error) as e:  # Bad payload shape: drop the peer
+            print(f"[!] Gossip: malformed frame from {self.remote_address}: {e!r}")
+        finally:
+            await self.close()
+
+    async def request(self, msg_type: int, payload: Any, reply_type: int, key: Any = None,
+                      timeout: float = 10.0) -> Any:
+        """Sends a request and waits for the reply of `reply_type` carrying the same key."""
+        waiter = self._waiters.get((reply_type, key))
+        if waiter is None:  # Identical requests in flight share one reply
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[(reply_type, key)] = waiter
+            await self.send(msg_type, payload)
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._waiters.pop((reply_type, key), None)
+            raise
+
+    def _resolve(self, reply_type: int, key: Any, value: Any):
+        waiter = self._waiters.pop((reply_type, key), None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(value)
+
+    async def request_tip(self, timeout: float = 5.0) -> Tuple[int, str]:
+        """Asks the peer for its current chain tip."""
+        return await self.request(MSG_TIP_REQUEST, None, MSG_TIP, timeout=timeout)
+
+    async def get_headers(self, start: int, count: int, timeout: float = 10.0):
+        """((index, prev_hash, hash), ...) for heights start .. start+count-1 (fewer at the peer's tip)."""
+        return await self.request(MSG_GET_HEADERS, {"start": start, "count": count},
+                                  MSG_HEADERS, (start, count), timeout)
+
+    async def get_blocks(self, start: int, count: int, timeout: float = 30.0):
+        """Serialized blocks for heights start .. start+count-1 (fewer at the peer's tip)."""
+        return await self.request(MSG_GET_BLOCKS, {"start": start, "count": count},
+                                  MSG_BLOCKS, (start, count), timeout)
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_exception(ConnectionError("peer connection closed"))
+        for task in self._tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        self.writer.close()
+        self.node._forget(self)
+
+
+class SnifZGossipNode:
+    """
+    Asyncio peer-to-peer layer: traffic reports, new-block announcements,
+    chain-tip exchange and header/block serving for sync (see snifz_chain_sync)
+    over length-prefixed binary frames.
+
+    Traffic reports are coalesced (latest per node) and flushed to every peer
+    as one batch frame per interval. Reports and blocks seen for the first
+    time are relayed once, so they cross partial meshes (blocks only after
+    on_block has accepted them). The de-duplication caches are bounded LRUs.
+    Many nodes can run in a single process/event loop for testing and
+    benchmarks.
+    """
+    def __init__(self, node_address: str, reward_system=None, blockchain=None,
+                 host: str = "127.0.0.1", port: int = DEFAULT_GOSSIP_PORT,
+                 batch_interval: float = 0.05, max_batch: int = 512, queue_limit: int = 256,
+                 relay: bool = True):
+        self.node_address = node_address
+        self.reward_system = reward_system
+        self.blockchain = blockchain
+        self.host = host
+        self.port = port
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.queue_limit = queue_limit
+        self.relay = relay  # Forward first-seen reports/blocks (needed unless the mesh is complete)
+        self.peers: Dict[str, SnifZPeerConnection] = {}  # Remote node address -> connection
+        # Returns whether the block was accepted; only accepted blocks are relayed. It runs as its own
+        # task, so it may wait on another thread without stalling the peer's read loop.
+        self.on_block: Optional[Callable[[Block, SnifZPeerConnection], Awaitable[bool]]] = None
+        self.on_peer: Optional[Callable[[SnifZPeerConnection], Awaitable[None]]] = None  # After HELLO
+        self.stats = {"frames_in": 0, "frames_out": 0, "reports_in": 0, "blocks_in": 0}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connections = set()
+        self._dialed: Dict[Tuple[str, int], SnifZPeerConnection] = {}
+        self._pending_reports: Dict[str, Dict[str, Any]] = {}
+        self._report_digests: 'OrderedDict[str, bytes]' = OrderedDict()  # LRU, MAX_TRACKED_REPORTS entries
+        self._seen_blocks: 'OrderedDict[str, None]' = OrderedDict()  # LRU, MAX_SEEN_BLOCKS entries
+        self._block_tasks = set()  # Running on_block calls (the loop only keeps weak references)
+        self._flush_wakeup: Optional[asyncio.Event] = None
+        self._server = None
+        self._flusher = None
+
+    # --- Lifecycle ----------------------------------------------------------
+
+    async def start(self):
+        """Starts listening (port 0 picks a free port) and the batch flusher."""
+        self._flush_wakeup = asyncio.Event()
+        self._server = await asyncio.start_server(self._accept, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.loop = asyncio.get_running_loop()  # Only set once listening, so callers can test it
+        self._flusher = asyncio.ensure_future(self._flush_loop())
+
+    async def close(self):
+        if self._flusher:
+            self._flusher.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for connection in list(self._connections):
+            await connection.close()
+
+    def start_in_thread(self) -> threading.Thread:
+        """Runs the node on its own event loop in a daemon thread (for the GUI/daemon)."""
+        ready = threading.Event()
+
+        def run():
+            async def main():
+                await self.start()
+                ready.set()
+                await asyncio.Event().wait()  # Serve until the process exits
+            try:
+                asyncio.run(main())
+            except OSError as e:
+                print(f"[!] Gossip node failed to start on {self.host}:{self.port}: {e}")
+                ready.set()
+
+        thread = threading.Thread(target=run, name="snifz-gossip", daemon=True)
+        thread.start()
+        ready.wait(5)
+        return thread
+
+    def call_threadsafe(self, coro) -> 'asyncio.Future':
+        """Schedules a coroutine on the node's loop from another thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    # --- Connections --------------------------------------------------------
+
+    def _hello(self) -> Dict[str, Any]:
+        height, tip = self._local_tip()
+        return {"node": self.node_address, "height": height, "tip": tip}
+
+    def _local_tip(self) -> Tuple[int, str]:
+        if self.blockchain is None or not len(self.blockchain.chain):
+            return 0, ''
+        return len(self.blockchain.chain), self.blockchain.last_block.compute_hash()
+
+    async def _accept(self, reader, writer):
+        connection = SnifZPeerConnection(self, reader, writer, self.queue_limit)
+        self._connections.add(connection)
+        await connection.send(MSG_HELLO, self._hello())
+
+    async def connect(self, host: str, port: int) -> SnifZPeerConnection:
+        """Connects to a peer, reusing an existing open connection to the same endpoint."""
+        existing = self._dialed.get((host, port))
+        if existing is not None and not existing.closed:
+            return existing
+        reader, writer = await asyncio.open_connection(host, port)
+        connection = SnifZPeerConnection(self, reader, writer, self.queue_limit)
+        self._connections.add(connection)
+        self._dialed[(host, port)] = connection
+        await connection.send(MSG_HELLO, self._hello())
+        return connection
+
+    def _forget(self, connection: SnifZPeerConnection):
+        self._connections.discard(connection)
+        if connection.remote_address and self.peers.get(connection.remote_address) is connection:
+            del self.peers[connection.remote_address]
+
+    # --- Outgoing -----------------------------------------------------------
+
+    def report_traffic(self, address: str, traffic_data: Dict[str, Any]):
+        """Queues a traffic report for the next batch (call on the node's loop)."""
+        self._pending_reports[address] = traffic_data
+        self._remember(self._report_digests, address, hashlib.sha256(encode(traffic_data)).digest(),
+                       MAX_TRACKED_REPORTS)
+        if len(self._pending_reports) >= self.max_batch:
+            self._flush_wakeup.set()
+
+    def report_traffic_threadsafe(self, address: str, traffic_data: Dict[str, Any]):
+        self.loop.call_soon_threadsafe(self.report_traffic, address, traffic_data)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), self.batch_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            if self._pending_reports:
+                batch = tuple(self._pending_reports.items())
+                self._pending_reports = {}
+                for start in range(0, len(batch), MAX_REPORTS_PER_FRAME):
+                    await self._broadcast(MSG_TRAFFIC, batch[start:start + MAX_REPORTS_PER_FRAME])
+
+    async def _broadcast(self, msg_type: int, payload: Any, exclude: Optional[SnifZPeerConnection] = None):
+        frame_peers = [peer for peer in self.peers.values() if peer is not exclude]
+        await asyncio.gather(*(peer.send(msg_type, payload) for peer in frame_peers))
+
+    async def announce_block(self, block: Block):
+        """Announces a freshly minted block to every peer."""
+        self._remember(self._seen_blocks, block.compute_hash(), None, MAX_SEEN_BLOCKS)
+        await self._broadcast(MSG_NEW_BLOCK, block.serialize())
+
+    @staticmethod
+    def _remember(entries: OrderedDict, key: Any, value: Any, limit: int):
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > limit:
+            entries.popitem(last=False)
+
+    # --- Incoming -----------------------------------------------------------
+
+    async def _dispatch(self, peer: SnifZPeerConnection, msg_type: int, payload: Any):
+        handler = self.HANDLERS.get(msg_type)
+        if handler is None:
+            print(f"[!] Gossip: unknown message type {msg_type} from {peer.remote_address}")
+            return
+        await handler(self, peer, payload)
+
+    async def _on_hello(self, peer: SnifZPeerConnection, payload: Dict[str, Any]):
+        if not isinstance(payload["node"], str) or not 0 < len(payload["node"]) <= MAX_ADDRESS_LENGTH:
+            raise ValueError("HELLO without a valid node address")
+        peer.tip = check_tip(payload["height"], payload["tip"])
+        peer.remote_address = payload["node"]
+        self.peers[peer.remote_address] = peer
+        if self.on_peer is not None:
+            await self.on_peer(peer)
+
+    async def _on_traffic(self, peer: SnifZPeerConnection, batch):
+        if peer.remote_address is None:
+            raise ValueError("traffic batch before HELLO")
+        check_traffic_batch(batch)  # Validate the whole frame before anything reaches the scorer
+        self.stats["reports_in"] += len(batch)
+        for address, traffic_data in batch:
+            if address == self.node_address:
+                continue  # Our own report relayed back; the local counters are authoritative
+            digest = hashlib.sha256(encode(traffic_data)).digest()
+            if self._report_digests.get(address) == digest:
+                continue  # Already seen (and relayed) this exact report
+            self._remember(self._report_digests, address, digest, MAX_TRACKED_REPORTS)
+            if self.reward_system is not None:
+                self.reward_system.register_traffic_from_node(address, traffic_data)
+            if self.relay:
+                self._pending_reports[address] = traffic_data  # Relay with the next batch
+
+    async def _on_new_block(self, peer: SnifZPeerConnection, raw: bytes):
+        block = Block.deserialize(raw)
+        block_hash = block.compute_hash()
+        if block_hash in self._seen_blocks:
+            return
+        self._remember(self._seen_blocks, block_hash, None, MAX_SEEN_BLOCKS)  # Handled once, accepted or not
+        self.stats["blocks_in"] += 1
+        peer.tip = max(peer.tip, (block.index, block_hash))
+        if self.on_block is not None:
+            # Started in arrival order, so on_block sees a peer's blocks in the order they were sent
+            task = asyncio.ensure_future(self._accept_block(block, raw, peer))
+            self._block_tasks.add(task)
+            task.add_done_callback(self._block_tasks.discard)
+
+    async def _accept_block(self, block: Block, raw: bytes, peer: SnifZPeerConnection):
+        try:
+            accepted = await self.on_block(block, peer)
+        except Exception as e:
+            print(f"[!] Gossip: block {block.index} from {peer.remote_address} not handled: {e!r}")
+            return
+        if accepted and self.relay:  # Never forward a block this node has not validated
+            await self._broadcast(MSG_NEW_BLOCK, raw, exclude=peer)
+
+    async def _on_tip_request(self, peer: SnifZPeerConnection, _payload):
+        height, tip = self._local_tip()
+        await peer.send(MSG_TIP, {"height": height, "tip": tip})
+
+    async def _on_tip(self, peer: SnifZPeerConnection, payload: Dict[str, Any]):
+        peer.tip = check_tip(payload["height"], payload["tip"])
+        peer._resolve(MSG_TIP, None, peer.tip)
+
+    def _served_range(self, payload: Dict[str, Any], limit: int) -> range:
+        height = len(self.blockchain.chain) if self.blockchain is not None else 0
+        start = max(1, int(payload["start"]))
+        return range(start, min(height, start + min(int(payload["count"]), limit) - 1) + 1)
+
+    async def _on_get_headers(self, peer: SnifZPeerConnection, payload: Dict[str, Any]):
+        chain = self.blockchain.chain if self.blockchain is not None else ()
+        read_raw = getattr(chain, 'read_raw', None)
+        headers = []
+        for height in self._served_range(payload, MAX_HEADERS_PER_REPLY):
+            if read_raw is not None:  # Persistent chain: hash the stored bytes, skip decoding the body
+                headers.append(Block.read_header(read_raw(height - 1)))
+            else:
+                block = chain[height - 1]
+                headers.append((block.index, block.prev_hash, block.compute_hash()))
+        await peer.send(MSG_HEADERS, {"start": payload["start"], "count": payload["count"],
+                                      "headers": tuple(headers)})
+
+    async def _on_headers(self, peer: SnifZPeerConnection, payload: Dict[str, Any]):
+        peer._resolve(MSG_HEADERS, (payload["start"], payload["count"]), payload["headers"])
+
+    async def _on_get_blocks(self, peer: SnifZPeerConnection, payload: Dict[str, Any]):
+        chain = self.blockchain.chain if self.blockchain is not None else ()
+        read_raw = getattr(chain, 'read_raw', None)
+        heights = self._served_range(payload, MAX_BLOCKS_PER_REPLY)
+        if heights and heights[0] <= getattr(self.blockchain, 'pruned_height', 0):
+            heights = range(0)  # Pruned bodies are gone; the requester will ask another peer
+        blocks = tuple(read_raw(height - 1) if read_raw is not None else chain[height - 1].serialize()
+                       for height in heights)
+        await peer.send(MSG_BLOCKS, {"start": payload["start"], "count": payload["count"], "blocks": blocks})
+
+    async def _on_blocks(self, peer: SnifZPeerConnection, payload: Dict[str, Any]):
+        peer._resolve(MSG_BLOCKS, (payload["start"], payload["count"]), payload["blocks"])
+
+    HANDLERS = {
+        MSG_HELLO: _on_hello,
+        MSG_TRAFFIC: _on_traffic,
+        MSG_NEW_BLOCK: _on_new_block,
+        MSG_TIP_REQUEST: _on_tip_request,
+        MSG_TIP: _on_tip,
+        MSG_GET_HEADERS: _on_get_headers,
+        MSG_HEADERS: _on_headers,
+        MSG_GET_BLOCKS: _on_get_blocks,
+        MSG_BLOCKS: _on_blocks,
+    }
@@ -0,0 +1,294 @@
+import asyncio
+import itertools
+import json
+import ssl
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+RPC_POOL_SIZE = 4  # Keep-alive HTTP connections per endpoint
+RPC_BATCH_WINDOW = 0.002  # Seconds calls wait to be sent together in one JSON-RPC batch
+RPC_MAX_BATCH = 100  # Calls per batch request
+RPC_TIMEOUT = 10.0
+RPC_CACHE_SIZE = 10000
+# Seconds a read result may be served from cache; methods not listed are never cached
+RPC_CACHE_TTLS = {
+    "eth_chainId": 3600.0,
+    "net_version": 3600.0,
+    "eth_gasPrice": 5.0,
+    "eth_blockNumber": 1.0,
+    "eth_getBalance": 2.0,
+    "eth_call": 2.0,
+}
+# Side-effect free methods: identical in-flight calls share one request
+RPC_READ_METHODS = frozenset(RPC_CACHE_TTLS) | {
+    "eth_getTransactionCount", "eth_getTransactionReceipt", "eth_getBlockByNumber", "eth_estimateGas",
+}
+
+
+class SnifZRPCError(ValueError):
+    """An error object returned by the JSON-RPC server for one call."""
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"JSON-RPC error {code}: {message}")
+        self.code = code
+        self.data = data
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer', 'reused')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.reused = False
+
+    @property
+    def usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self):
+        self.writer.close()
+
+
+async def _read_http_response(reader: asyncio.StreamReader) -> Tuple[int, bytes, bool]:
+    """Reads one HTTP/1.1 response; returns (status, body, keep_alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by the server")
+    status = int(status_line.split(None, 2)[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # Trailers
+                break
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, bytes(body), headers.get("connection", "").lower() != "close"
+
+
+class SnifZRPCClient:
+    """
+    Async JSON-RPC client for an EVM node, built on asyncio streams.
+
+      - A small pool of keep-alive HTTP/1.1 connections is reused across calls
+        (a stale pooled connection is retried once on a fresh one).
+      - Calls made within batch_window of each other are sent as one JSON-RPC
+        batch request (up to max_batch calls).
+      - Identical read calls (RPC_READ_METHODS) that are already in flight are
+        coalesced: the callers share one request and its result.
+      - Results of the methods in cache_ttls are cached for that many seconds.
+
+    An instance belongs to the event loop it is first used on.
+    """
+    def __init__(self, url: str, pool_size: int = RPC_POOL_SIZE, batch_window: float = RPC_BATCH_WINDOW,
+                 max_batch: int = RPC_MAX_BATCH, timeout: float = RPC_TIMEOUT,
+                 cache_ttls: Optional[Dict[str, float]] = None):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported RPC URL scheme '{parts.scheme}' (expected http or https)")
+        self.url = url
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.path = parts.path or "/"
+        self._ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.pool_size = max(1, pool_size)
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout
+        self.cache_ttls = RPC_CACHE_TTLS if cache_ttls is None else cache_ttls
+        self.stats = {"calls": 0, "http_requests": 0, "batched_calls": 0, "coalesced": 0,
+                      "cache_hits": 0, "connections": 0, "retries": 0}
+        self._ids = itertools.count(1)
+        self._idle: List[_Connection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending: List[Tuple[Any, str, list, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self._cache: Dict[Any, Tuple[float, Any]] = {}  # key -> (expires at, result)
+        self._tasks = set()
+
+    # --- Public API ---------------------------------------------------------
+
+    async def call(self, method: str, params: Sequence[Any] = (), use_cache: bool = True) -> Any:
+        """Runs one JSON-RPC call (batched with concurrent calls); raises SnifZRPCError or ConnectionError."""
+        loop = asyncio.get_running_loop()
+        params = list(params)
+        self.stats["calls"] += 1
+        key = (method, json.dumps(params, sort_keys=True, separators=(",", ":")))
+        if use_cache and method in self.cache_ttls:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > loop.time():
+                self.stats["cache_hits"] += 1
+                return cached[1]
+        coalesce = method in RPC_READ_METHODS
+        future = self._inflight.get(key) if coalesce else None
+        if future is not None:
+            self.stats["coalesced"] += 1
+        else:
+            future = loop.create_future()
+            if coalesce:
+                self._inflight[key] = future
+            self._enqueue(key, method, params, future)
+        return await asyncio.shield(future)
+
+    async def batch(self, calls: Sequence[Tuple[str, Sequence[Any]]], return_exceptions: bool = False) -> List[Any]:
+        """Runs several (method, params) calls together; results in the same order."""
+        return await asyncio.gather(*(self.call(method, params) for method, params in calls),
+                                    return_exceptions=return_exceptions)
+
+    def invalidate(self, method: Optional[str] = None):
+        """Drops cached results (of one method, or all), e.g. after sending a transaction."""
+        if method is None:
+            self._cache.clear()
+        else:
+            for key in [key for key in self._cache if key[0] == method]:
+                del self._cache[key]
+
+    async def close(self):
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+    # --- Batching -----------------------------------------------------------
+
+    def _enqueue(self, key: Any, method: str, params: list, future: asyncio.Future):
+        self._pending.append((key, method, params, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.ensure_future(self._send_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch: List[Tuple[Any, str, list, asyncio.Future]]):
+        requests = {next(self._ids): entry for entry in batch}
+        payload = [{"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+                   for request_id, (_, method, params, _) in requests.items()]
+        if len(payload) > 1:
+            self.stats["batched_calls"] += len(payload)
+        try:
+            replies = json.loads(await self._post(json.dumps(payload if len(payload) > 1 else payload[0]).encode()))
+            if isinstance(replies, dict):
+                replies = [replies]
+            if not isinstance(replies, list):
+                raise ValueError(f"unexpected JSON-RPC reply: {replies!r:.200}")
+            now = asyncio.get_running_loop().time()
+            for reply in replies:
+                entry = requests.pop(reply.get("id"), None)
+                if entry is None:
+                    continue
+                key, method, _, future = entry
+                if future.done():
+                    continue
+                error = reply.get("error")
+                if error is not None:
+                    future.set_exception(SnifZRPCError(error.get("code", 0), error.get("message", ""),
+                                                       error.get("data")))
+                    continue
+                result = reply.get("result")
+                ttl = self.cache_ttls.get(method)
+                if ttl:
+                    self._store(key, now + ttl, result)
+                future.set_result(result)
+            for _, method, _, future in requests.values():
+                if not future.done():
+                    future.set_exception(SnifZRPCError(0, f"no reply for {method} in the batch response"))
+        except Exception as e:
+            error = e if isinstance(e, (ConnectionError, asyncio.TimeoutError)) else ConnectionError(str(e))
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            for key, _, _, future in batch:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                if future.done() and not future.cancelled():
+                    future.exception()  # Mark as retrieved; callers that still wait get it via shield
+
+    def _store(self, key: Any, expires: float, result: Any):
+        if len(self._cache) >= RPC_CACHE_SIZE:
+            now = asyncio.get_running_loop().time()
+            for stale in [k for k, (until, _) in self._cache.items() if until <= now]:
+                del self._cache[stale]
+            if len(self._cache) >= RPC_CACHE_SIZE:
+                self._cache.clear()
+        self._cache[key] = (expires, result)
+
+    # --- Transport ----------------------------------------------------------
+
+    async def _acquire(self) -> _Connection:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        await self._slots.acquire()
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.usable:
+                connection.reused = True
+                return connection
+            connection.close()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self._ssl), self.timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.stats["connections"] += 1
+        return _Connection(reader, writer)
+
+    def _release(self, connection: _Connection, keep: bool):
+        if keep and len(self._idle) < self.pool_size:
+            self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    async def _post(self, body: bytes) -> bytes:
+        request = (f"POST {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                   f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                   f"Connection: keep-alive\r\n\r\n").encode() + body
+        for attempt in (1, 2):
+            connection = await self._acquire()
+            keep = False
+            try:
+                connection.writer.write(request)
+                status, reply, keep = await asyncio.wait_for(self._exchange(connection), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+                if connection.reused and attempt == 1:  # The server closed an idle pooled connection
+                    self.stats["retries"] += 1
+                    continue
+                raise ConnectionError(f"RPC request to {self.url} failed: {e!r}") from e
+            finally:
+                self._release(connection, keep)
+            self.stats["http_requests"] += 1
+            if not 200 <= status < 300:
+                raise ConnectionError(f"RPC endpoint {self.url} answered HTTP {status}: {reply[:200]!r}")
+            return reply
+        raise ConnectionError(f"RPC request to {self.url} failed")
+
+    @staticmethod
+    async def _exchange(connection: _Connection) -> Tuple[int, bytes, bool]:
+        await connection.writer.drain()
+        return await _read_http_response(connection.reader)
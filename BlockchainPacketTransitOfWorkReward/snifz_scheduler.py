@@ -0,0 +1,226 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from snifz_metrics import METRICS
+
+WHEEL_SLOTS = 512  # Slots in the timer wheel; deadlines further out wait for the wheel to come round
+WHEEL_RESOLUTION = 1.0  # Seconds per slot
+MAX_WAIT = 60.0  # Longest single wait of the standalone runner (bounds the effect of wall-clock jumps)
+LATENESS_BUCKETS = (1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class SnifZJob:
+    """One scheduled callback: fires at `deadline`, then every `interval` seconds if it has one."""
+    __slots__ = ('name', 'callback', 'deadline', 'interval', 'tick', 'runs', 'last_lateness', 'max_lateness')
+
+    def __init__(self, name: str, callback: Callable[[], Any], deadline: float, interval: Optional[float]):
+        self.name = name
+        self.callback = callback
+        self.deadline = deadline
+        self.interval = interval
+        self.tick = int(deadline // WHEEL_RESOLUTION)
+        self.runs = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+
+class SnifZScheduler:
+    """
+    Deadline-based timer wheel for the node's timed work (mint rounds,
+    report cutoffs, the live-rate tick, settlement passes).
+
+    Jobs are hashed into WHEEL_SLOTS slots of WHEEL_RESOLUTION seconds by
+    deadline, so scheduling and cancelling are O(1) and a pass only looks at
+    the slots the clock moved through. Within a slot a job fires at its exact
+    deadline, not at the slot boundary: whoever drives the scheduler waits
+    for next_deadline() and then calls run_pending().
+
+    The scheduler does not own a thread. The node service drives it from its
+    own loop, so jobs run on the thread that owns the chain; start_in_thread()
+    runs it standalone. Periodic jobs keep an absolute schedule (deadline +
+    interval, skipping rounds that were missed entirely), so lateness never
+    accumulates from one round to the next. `clock` is the time base of the
+    deadlines (the reward system's clock for mint boundaries).
+    """
+    def __init__(self, clock: Callable[[], float] = time.time, wake: Optional[Callable[[], None]] = None,
+                 log: Optional[Callable[[str], None]] = None):
+        self.clock = clock
+        self.wake = wake  # Called when a job is scheduled ahead of the deadline the driver is waiting for
+        self.log = log or (lambda message: print(f"[!] {message}"))  # Where job failures are reported
+        self._jobs: Dict[str, SnifZJob] = {}
+        self._fired: Dict[str, SnifZJob] = {}  # Last run of one-shot jobs, so re-arming keeps their timing stats
+        self._slots: List[Set[SnifZJob]] = [set() for _ in range(WHEEL_SLOTS)]
+        self._tick = int(clock() // WHEEL_RESOLUTION)  # Slot the last pass reached
+        self._next: Optional[float] = None
+        self._dirty = False
+        self._lock = threading.RLock()  # Jobs may (re)schedule themselves from inside run_pending
+        self._changed = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.lateness = METRICS.histogram("snifz_scheduler_lateness_seconds",
+                                          "Delay between a job's deadline and the moment it ran", LATENESS_BUCKETS)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._jobs
+
+    # --- Scheduling (any thread) --------------------------------------------
+
+    def at(self, name: str, deadline: float, callback: Callable[[], Any], interval: Optional[float] = None):
+        """Schedules `callback` at the absolute `deadline`, replacing any job with the same name."""
+        if interval is not None and interval <= 0:
+            raise ValueError(f"Job {name}: the interval must be positive (got {interval})")
+        with self._lock:
+            previous = self._jobs.get(name)
+            if previous is not None:
+                self._unlink(previous)
+            else:
+                previous = self._fired.pop(name, None)
+            job = SnifZJob(name, callback, deadline, interval)
+            job.tick = max(job.tick, self._tick)  # Already due: the current slot, so the next pass sees it
+            if previous is not None:
+                job.runs, job.last_lateness, job.max_lateness = previous.runs, previous.last_lateness, previous.max_lateness
+            self._jobs[name] = job
+            self._slots[job.tick % WHEEL_SLOTS].add(job)
+            earlier = self._next is None or deadline < self._next
+            if earlier and not self._dirty:
+                self._next = deadline
+            self._changed.notify()
+        if earlier and self.wake is not None:
+            self.wake()
+
+    def after(self, name: str, delay: float, callback: Callable[[], Any], interval: Optional[float] = None):
+        self.at(name, self.clock() + delay, callback, interval)
+
+    def every(self, name: str, interval: float, callback: Callable[[], Any], first: Optional[float] = None):
+        """Runs `callback` every `interval` seconds, first at `first` (default: one interval from now)."""
+        self.at(name, self.clock() + interval if first is None else first, callback, interval)
+
+    def cancel(self, name: str) -> bool:
+        with self._lock:
+            job = self._jobs.pop(name, None)
+            if job is None:
+                return False
+            self._unlink(job)
+            return True
+
+    def _unlink(self, job: SnifZJob):
+        self._slots[job.tick % WHEEL_SLOTS].discard(job)
+        if self._next is not None and job.deadline <= self._next:
+            self._dirty = True
+
+    # --- Queries ------------------------------------------------------------
+
+    def deadline(self, name: str) -> Optional[float]:
+        job = self._jobs.get(name)
+        return job.deadline if job is not None else None
+
+    def next_deadline(self) -> Optional[float]:
+        """The earliest deadline of any job (None when nothing is scheduled)."""
+        with self._lock:
+            if self._dirty:
+                self._next = self._earliest()
+                self._dirty = False
+            return self._next
+
+    def _earliest(self) -> Optional[float]:
+        if not self._jobs:
+            return None
+        # Jobs in a slot may belong to a later turn of the wheel; only those on this turn count
+        for tick in range(self._tick, self._tick + WHEEL_SLOTS):
+            due = [job.deadline for job in self._slots[tick % WHEEL_SLOTS] if job.tick <= tick]
+            if due:
+                return min(due)
+        return min(job.deadline for job in self._jobs.values())  # Everything is more than a turn away
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Every job with its next deadline and timing so far, soonest first."""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.deadline)
+            return [{"name": job.name, "deadline": job.deadline, "interval": job.interval, "runs": job.runs,
+                     "last_lateness": job.last_lateness, "max_lateness": job.max_lateness} for job in jobs]
+
+    # --- Running ------------------------------------------------------------
+
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """
+        Runs every job whose deadline has passed, on the calling thread, in
+        deadline order; returns how many ran. A failing job is reported to
+        `log`. Periodic jobs keep their schedule; a one-shot job is not
+        re-armed, so jobs that re-arm themselves must do it in a finally.
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            due = []
+            target = int(now // WHEEL_RESOLUTION)
+            # Normally one or two slots; after a stall longer than a turn, every slot once
+            for tick in range(self._tick, min(target, self._tick + WHEEL_SLOTS - 1) + 1):
+                due += [job for job in self._slots[tick % WHEEL_SLOTS] if job.deadline <= now]
+            self._tick = target
+            for job in due:
+                self._slots[job.tick % WHEEL_SLOTS].discard(job)
+                del self._jobs[job.name]
+            if due:
+                self._dirty = True
+        due.sort(key=lambda job: job.deadline)
+        for job in due:
+            started = self.clock()
+            job.last_lateness = max(0.0, started - job.deadline)
+            job.max_lateness = max(job.max_lateness, job.last_lateness)
+            job.runs += 1
+            self.lateness.observe(job.last_lateness)
+            if job.interval is not None:
+                missed = int((started - job.deadline) // job.interval)
+                self._reschedule(job, job.deadline + (missed + 1) * job.interval)
+            else:
+                self._fired[job.name] = job
+            try:
+                job.callback()
+            except Exception as e:  # One failing job must not stop the others
+                self.log(f"Scheduled job {job.name} failed: {e!r}")
+        return len(due)
+
+    def _reschedule(self, job: SnifZJob, deadline: float):
+        with self._lock:
+            if job.name in self._jobs:
+                return  # Replaced while it was due
+            job.deadline, job.tick = deadline, max(int(deadline // WHEEL_RESOLUTION), self._tick)
+            self._jobs[job.name] = job
+            self._slots[job.tick % WHEEL_SLOTS].add(job)
+            self._dirty = True
+
+    def seconds_until_next(self, limit: float = MAX_WAIT) -> float:
+        """How long the driver may wait before the next deadline (at most `limit`)."""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return limit
+        return min(limit, max(0.0, deadline - self.clock()))
+
+    def start_in_thread(self) -> threading.Thread:
+        """Runs the scheduler on its own daemon thread (for use without the node service)."""
+        if self._thread is not None:
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snifz-scheduler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._lock:
+            self._changed.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                wait = self.seconds_until_next()
+                if wait > 0:
+                    self._changed.wait(wait)  # at() notifies, so an earlier job cuts the wait short
+            if not self._stop.is_set():
+                self.run_pending()
@@ -0,0 +1,371 @@
+import asyncio
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from snifz_blockchain_core import TOKEN_SYMBOL
+from snifz_codec import encode, decode
+from snifz_mempool import REWARD_SENDER
+from snifz_rpc_client import SnifZRPCError
+
+SETTLEMENT_WINDOW_BLOCKS = 100  # Confirmed reward blocks aggregated into one settlement...
+SETTLEMENT_WINDOW_SECONDS = 3600.0  # ...or this long after the first unsettled one, whichever comes first
+SETTLEMENT_CONFIRMATIONS = 6  # Blocks on top of a block before its rewards are settled (reorg safety)
+SETTLEMENT_MAX_RETRIES = 5
+SETTLEMENT_MAX_RESENDS = 3  # Passes that may end with a batch still open before it is marked failed
+SETTLEMENT_RETRY_DELAY = 1.0  # Seconds before the first retry; doubles per attempt
+SETTLEMENT_RECEIPT_TIMEOUT = 120.0
+SETTLEMENT_POLL_INTERVAL = 10.0  # Seconds between collect/settle passes (settlement thread or node scheduler)
+TOKEN_DECIMALS = 18
+
+JOURNAL_MAGIC = b"SNFZSTL1"
+JOURNAL_RECORD = struct.Struct("<II")  # payload length, crc32(payload)
+
+
+class SnifZSettlementJournal:
+    """
+    Append-only, crc-framed log of settlement batches (snifz_codec records,
+    fsynced per append). A torn record at the tail is cut off on open.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.records: List[Dict[str, Any]] = []
+        if os.path.exists(path):
+            self._load()
+        else:
+            with open(path, "wb") as f:
+                f.write(JOURNAL_MAGIC)
+                f.flush()
+                os.fsync(f.fileno())
+        self._file = open(path, "ab")
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if data[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+            raise ValueError(f"{self.path} is not a settlement journal")
+        offset = len(JOURNAL_MAGIC)
+        while offset + JOURNAL_RECORD.size <= len(data):
+            length, crc = JOURNAL_RECORD.unpack_from(data, offset)
+            payload = data[offset + JOURNAL_RECORD.size:offset + JOURNAL_RECORD.size + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            self.records.append(decode(payload))
+            offset += JOURNAL_RECORD.size + length
+        if offset != len(data):
+            print(f"[!] Settlement journal {self.path}: dropping a torn record at offset {offset}.")
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def append(self, record: Dict[str, Any]):
+        payload = encode(record)
+        self._file.write(JOURNAL_RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records.append(record)
+
+    def close(self):
+        self._file.close()
+
+
+class SnifZRewardSettlement:
+    """
+    Mirrors BLOCK_REWARD transactions of the local chain to the EVM token.
+
+    collect() reads the rewards of blocks with at least `confirmations` blocks
+    on top and adds them up per recipient. Once `window_blocks` blocks (or
+    `window_seconds`) have accumulated, settle() turns the totals into one
+    transfer per recipient. It numbers the transfers with consecutive treasury
+    nonces, writes the batch to the journal, and only then sends every
+    transfer in a single JSON-RPC batch through SnifZWeb3Connector. Thousands
+    of rewards to a few dozen winners settle in a few dozen transactions and
+    one round trip.
+
+    Idempotency is keyed on block hash: a block in the journal is never
+    collected again. A journaled batch is always resent with its original
+    nonces (after a crash, a timeout or a partial failure). A resend can at
+    most be rejected as a used nonce; it can never pay a reward twice. This
+    relies on the treasury account being used for settlement only.
+
+    A batch that is still open after `max_resends` further passes (a rejected
+    transfer, transfers that never went out, or no receipts) is journaled as
+    failed so settlement can move on: rejected transfers are dropped, the ones
+    that were never sent go back into the pending totals, and the ones that
+    were sent are left to the chain (resending them could pay twice).
+
+    collect() reads the chain, so call it where chain access is safe (see
+    start_in_thread). settle() runs on an event loop.
+    """
+    def __init__(self, blockchain, connector, treasury: str, journal_path: str,
+                 window_blocks: int = SETTLEMENT_WINDOW_BLOCKS, window_seconds: float = SETTLEMENT_WINDOW_SECONDS,
+                 confirmations: int = SETTLEMENT_CONFIRMATIONS, max_retries: int = SETTLEMENT_MAX_RETRIES,
+                 max_resends: int = SETTLEMENT_MAX_RESENDS, retry_delay: float = SETTLEMENT_RETRY_DELAY, decimals: int = TOKEN_DECIMALS,
+                 clock: Callable[[], float] = time.time):
+        self.blockchain = blockchain
+        self.connector = connector
+        self.treasury = treasury
+        self.window_blocks = max(1, window_blocks)
+        self.window_seconds = window_seconds
+        self.confirmations = max(0, confirmations)
+        self.max_retries = max_retries
+        self.max_resends = max(0, max_resends)
+        self.retry_delay = retry_delay
+        self.unit = 10 ** decimals
+        self.clock = clock
+        self.journal = SnifZSettlementJournal(journal_path)
+        self.stats = {"rewards": 0, "blocks": 0, "batches": 0, "transfers": 0, "retries": 0, "failed": 0,
+                      "units_settled": 0}
+        self._lock = threading.Lock()  # collect() and settle() run on different threads
+        self._totals: Dict[str, int] = {}  # recipient -> token units not yet in a batch
+        self._blocks: List[str] = []  # Hashes of the blocks those totals came from
+        self._first_pending: Optional[float] = None
+        self._claimed = set()  # Block hashes already in a journaled batch
+        self._open: Dict[str, Dict[str, Any]] = {}  # batch id -> prepared but not settled batch
+        self._failures: Dict[str, int] = {}  # batch id -> passes that ended with the batch still open
+        self._scanned = 0  # Highest height collect() has read
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # The settlement thread's loop, for wake()
+        self._wake: Optional[asyncio.Event] = None
+        self._replay_journal()
+
+    def _replay_journal(self):
+        requeued: Dict[str, int] = {}  # Totals given back by failed batches and not yet in a later batch
+        for record in self.journal.records:
+            if record["type"] == "prepared":
+                self._claimed.update(record["blocks"])
+                self._open[record["batch"]] = record
+                self._scanned = max(self._scanned, record["height"])
+                requeued = {}  # A new batch takes every pending total
+            elif record["type"] == "settled":
+                self._open.pop(record["batch"], None)
+            elif record["type"] == "failed":
+                self._open.pop(record["batch"], None)
+                for recipient, units, _ in record["requeued"]:
+                    requeued[recipient] = requeued.get(recipient, 0) + units
+        if requeued:
+            self._restore(requeued, [])
+        if self._open:
+            print(f"[!] Settlement: {len(self._open)} batch(es) were not confirmed before shutdown; resending them.")
+
+    def to_units(self, amount: float) -> int:
+        return int(Decimal(repr(amount)) * self.unit)
+
+    # --- Collecting (chain side) --------------------------------------------
+
+    def collect(self) -> int:
+        """Adds the rewards of newly confirmed blocks to the pending totals; returns how many were added."""
+        chain = self.blockchain.chain
+        confirmed = len(chain) - self.confirmations
+        start = min(self._scanned, max(confirmed, 0))  # Rescan after a rollback; claimed hashes are skipped
+        added = 0
+        with self._lock:
+            for height in range(start + 1, confirmed + 1):
+                block = chain[height - 1]
+                block_hash = block.compute_hash()
+                if block_hash in self._claimed:
+                    continue
+                if block.pruned:
+                    print(f"[!] Settlement: block {height} is pruned; its rewards cannot be read.")
+                    continue
+                rewards = [tx for tx in block.transactions if tx['sender'] == REWARD_SENDER]
+                for tx in rewards:
+                    self._totals[tx['recipient']] = self._totals.get(tx['recipient'], 0) + self.to_units(tx['amount'])
+                self._claimed.add(block_hash)
+                self._blocks.append(block_hash)
+                if rewards and self._first_pending is None:
+                    self._first_pending = self.clock()
+                added += len(rewards)
+            self._scanned = max(confirmed, 0)
+        self.stats["rewards"] += added
+        return added
+
+    @property
+    def open_batches(self) -> int:
+        return len(self._open)
+
+    def due(self) -> bool:
+        with self._lock:
+            if not self._totals:
+                return False
+            return (len(self._blocks) >= self.window_blocks
+                    or self.clock() - self._first_pending >= self.window_seconds)
+
+    # --- Settling (EVM side) ------------------------------------------------
+
+    async def settle(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Resends unconfirmed batches, then settles the pending totals if the
+        window is full (or `force`). Returns {"batches", "transfers", "open"}.
+        """
+        report = {"batches": 0, "transfers": 0, "open": 0}
+        for record in list(self._open.values()):
+            await self._submit(record, report)
+        if self._open or (not force and not self.due()):
+            # A new batch would take nonces right after the open one's, so it waits for it
+            report["open"] = len(self._open)
+            return report
+        with self._lock:
+            totals, blocks, height = self._totals, self._blocks, self._scanned
+            self._totals, self._blocks, self._first_pending = {}, [], None
+        if not totals:
+            return report
+        try:
+            nonce = await self.connector.get_nonce(self.treasury)
+        except (ConnectionError, asyncio.TimeoutError, SnifZRPCError) as e:
+            print(f"[!] Settlement: could not read the treasury nonce ({e}); keeping {len(blocks)} blocks pending.")
+            self._restore(totals, blocks)
+            report["open"] = len(self._open)
+            return report
+        transfers = tuple((recipient, units, nonce + i) for i, (recipient, units) in enumerate(sorted(totals.items())))
+        record = {
+            "type": "prepared",
+            # The first nonce keeps batches of requeued totals only (no blocks) apart
+            "batch": hashlib.sha256(f"{''.join(blocks)}:{nonce}".encode()).hexdigest()[:32],
+            "height": height,
+            "blocks": tuple(blocks),
+            "transfers": transfers,
+        }
+        self.journal.append(record)  # Written before anything is sent
+        self._open[record["batch"]] = record
+        self.stats["blocks"] += len(blocks)
+        await self._submit(record, report)
+        report["open"] = len(self._open)
+        return report
+
+    def _restore(self, totals: Dict[str, int], blocks: List[str]):
+        with self._lock:
+            for recipient, units in totals.items():
+                self._totals[recipient] = self._totals.get(recipient, 0) + units
+            self._blocks[:0] = blocks
+            if self._first_pending is None:
+                self._first_pending = self.clock()
+
+    async def _submit(self, record: Dict[str, Any], report: Dict[str, Any]):
+        """Sends a journaled batch (retrying transient failures) and marks it settled once mined."""
+        remaining = list(record["transfers"])
+        sent: List[Tuple[Tuple[str, int, int], str]] = []  # (transfer, tx hash)
+        rejected: List[Tuple[str, int, int]] = []
+        for attempt in range(self.max_retries + 1):
+            results = await self.connector.send_transfers(self.treasury, remaining)
+            retry = []
+            for transfer, result in zip(remaining, results):
+                if isinstance(result, str):
+                    sent.append((transfer, result))
+                elif isinstance(result, SnifZRPCError) and "nonce too low" in str(result).lower():
+                    pass  # Sent by an earlier attempt (this nonce was reserved for it), already mined
+                elif isinstance(result, (ConnectionError, asyncio.TimeoutError)) or (
+                        isinstance(result, SnifZRPCError) and "nonce too high" in str(result).lower()):
+                    retry.append(transfer)  # Transient, or queued behind a transfer that is being retried
+                else:
+                    print(f"[!] Settlement batch {record['batch']}: transfer to {transfer[0]} rejected: {result}")
+                    rejected.append(transfer)
+            remaining = retry
+            if not remaining:
+                break
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        if rejected or remaining:
+            self._keep_open(record, f"{len(rejected)} transfers rejected, {len(remaining)} still unsent",
+                            rejected, remaining, sent)
+            return
+        tx_hashes = [tx_hash for _, tx_hash in sent]
+        receipts = await self._wait_for_receipts(tx_hashes)
+        if receipts is None:
+            self._keep_open(record, f"not mined within {SETTLEMENT_RECEIPT_TIMEOUT:.0f}s", [], [], sent)
+            return
+        reverted = {recipient: units for (recipient, units, _), receipt in zip((t for t, _ in sent), receipts)
+                    if receipt.get("status") != "0x1"}
+        if reverted:
+            # Their nonces are spent; the amounts go back into the next batch
+            print(f"[!] Settlement batch {record['batch']}: {len(reverted)} transfers reverted; requeueing them.")
+            self._restore(reverted, [])
+        self.journal.append({"type": "settled", "batch": record["batch"], "tx_hashes": tuple(tx_hashes)})
+        del self._open[record["batch"]]
+        self._failures.pop(record["batch"], None)
+        settled_units = sum(units for _, units, _ in record["transfers"]) - sum(reverted.values())
+        self.stats["batches"] += 1
+        self.stats["transfers"] += len(record["transfers"])
+        self.stats["units_settled"] += settled_units
+        report["batches"] += 1
+        report["transfers"] += len(record["transfers"])
+        print(f"[{TOKEN_SYMBOL}] Settled {len(record['blocks'])} blocks of rewards in "
+              f"{len(record['transfers'])} transfers ({settled_units / self.unit:,.2f} {TOKEN_SYMBOL}).")
+
+    def _keep_open(self, record: Dict[str, Any], reason: str, rejected: List[Tuple[str, int, int]],
+                   unsent: List[Tuple[str, int, int]], sent: List[Tuple[Tuple[str, int, int], str]]):
+        """Leaves a batch open for the next pass, or marks it failed once it is out of resends."""
+        batch = record["batch"]
+        failures = self._failures[batch] = self._failures.get(batch, 0) + 1
+        if failures <= self.max_resends:
+            print(f"[!] Settlement batch {batch}: {reason}; the batch stays open.")
+            return
+        self.journal.append({"type": "failed", "batch": batch, "rejected": tuple(rejected),
+                             "requeued": tuple(unsent), "tx_hashes": tuple(tx_hash for _, tx_hash in sent)})
+        del self._open[batch]
+        del self._failures[batch]
+        if unsent:
+            self._restore({recipient: units for recipient, units, _ in unsent}, [])
+        self.stats["failed"] += 1
+        print(f"[!] Settlement batch {batch}: {reason} after {failures} passes; marked failed, "
+              f"{len(rejected)} transfers dropped and {len(unsent)} requeued.")
+
+    async def _wait_for_receipts(self, tx_hashes: List[str]) -> Optional[List[Dict[str, Any]]]:
+        deadline = time.monotonic() + SETTLEMENT_RECEIPT_TIMEOUT
+        delay = 0.5
+        while True:
+            receipts = await self.connector.get_receipts(tx_hashes)
+            if all(receipt is not None for receipt in receipts):
+                return receipts
+            if time.monotonic() + delay > deadline:
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+    # --- Background thread --------------------------------------------------
+
+    def start_in_thread(self, collect: Optional[Callable[[], int]] = None,
+                        interval: Optional[float] = SETTLEMENT_POLL_INTERVAL) -> threading.Thread:
+        """
+        Runs collect/settle passes every `interval` seconds (or as soon as
+        wake() is called) on a daemon thread with its own event loop. `collect`
+        replaces self.collect, e.g. to run it on the node service thread
+        (lambda: service.query(settlement.collect).result()). With interval=None
+        the thread only settles when woken and never collects: the node's
+        scheduler collects on the service thread and wakes it when there is
+        work (SnifZNodeService.schedule_settlement).
+        """
+        collect = collect or self.collect
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._loop = loop
+            while True:
+                try:
+                    if interval is not None:
+                        await loop.run_in_executor(None, collect)
+                    await self.settle()
+                except Exception as e:  # A failed pass must not stop settlement
+                    print(f"[!] Settlement pass failed: {e!r}")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+        thread = threading.Thread(target=lambda: asyncio.run(main()), name="snifz-settlement", daemon=True)
+        thread.start()
+        return thread
+
+    def wake(self):
+        """Starts the settlement thread's next pass now (any thread)."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def close(self):
+        self.journal.close()
@@ -0,0 +1,52 @@
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional
+
+from snifz_codec import encode, decode
+
+SNAPSHOT_MAGIC = b"SNFZSNP1"
+SNAPSHOT_HEADER = struct.Struct("<8sI")  # magic, crc32(payload)
+
+
+def write_snapshot(path: str, payload: Dict[str, Any]) -> int:
+    """
+    Atomically replaces the snapshot at `path` (temp file, fsync, rename), so a
+    crash leaves either the previous snapshot or the new one. Returns its size.
+    """
+    body = encode(payload)
+    data = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, zlib.crc32(body)) + body
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)  # Make the rename itself durable
+    finally:
+        os.close(directory)
+    return len(data)
+
+
+def read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """Loads a snapshot written by write_snapshot; None if it is missing or unusable."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < SNAPSHOT_HEADER.size:
+        print(f"[!] Snapshot {path} is truncated; ignoring it.")
+        return None
+    magic, crc = SNAPSHOT_HEADER.unpack_from(data)
+    body = data[SNAPSHOT_HEADER.size:]
+    if magic != SNAPSHOT_MAGIC or zlib.crc32(body) != crc:
+        print(f"[!] Snapshot {path} is corrupt or from another version; ignoring it.")
+        return None
+    try:
+        return decode(body)
+    except ValueError as e:
+        print(f"[!] Snapshot {path} could not be decoded ({e}); ignoring it.")
+        return None
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+STUB_CHAIN_ID = 1337
+STUB_TOKEN_ADDRESS = "0x00000000000000000000000000000000005e1f2a"
+BALANCE_OF_SELECTOR = "0x70a08231"  # balanceOf(address)
+TRANSFER_SELECTOR = "0xa9059cbb"  # transfer(address,uint256)
+
+
+class SnifZStubEVM:
+    """
+    A tiny in-memory stand-in for an EVM JSON-RPC node, for exercising the
+    RPC client, the wallet widgets and reward settlement without a real chain.
+    It is not an EVM: it keeps native and token balances, nonces and receipts,
+    and "mines" every accepted transaction into its own block at once
+    (like a dev node with automine). Accounts are unlocked (eth_sendTransaction).
+
+    Served over keep-alive HTTP/1.1 with JSON-RPC batch support. `latency`
+    delays every HTTP response (to model a remote node) and fail_next(n) drops
+    the next n requests without an answer (to exercise retries).
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, chain_id: int = STUB_CHAIN_ID,
+                 latency: float = 0.0, token_address: str = STUB_TOKEN_ADDRESS):
+        self.host = host
+        self.port = port
+        self.chain_id = chain_id
+        self.latency = latency
+        self.token_address = token_address.lower()
+        self.block_number = 0
+        self.balances: Dict[str, int] = {}
+        self.token_balances: Dict[str, int] = {}
+        self.nonces: Dict[str, int] = {}
+        self.receipts: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"connections": 0, "http_requests": 0, "rpc_calls": 0, "transactions": 0}
+        self._drop_requests = 0
+        self._server = None
+        self._handlers = set()
+        self.methods = {
+            "eth_chainId": lambda: hex(self.chain_id),
+            "net_version": lambda: str(self.chain_id),
+            "eth_gasPrice": lambda: hex(1_000_000_000),
+            "eth_blockNumber": lambda: hex(self.block_number),
+            "eth_getBalance": lambda address, block="latest": hex(self.balances.get(address.lower(), 0)),
+            "eth_getTransactionCount": lambda address, block="latest": hex(self.nonces.get(address.lower(), 0)),
+            "eth_getTransactionReceipt": lambda tx_hash: self.receipts.get(tx_hash),
+            "eth_call": self._eth_call,
+            "eth_sendTransaction": self._send_transaction,
+        }
+
+    # --- Test controls ------------------------------------------------------
+
+    def fund(self, address: str, native: int = 0, token: int = 0):
+        address = address.lower()
+        self.balances[address] = self.balances.get(address, 0) + native
+        self.token_balances[address] = self.token_balances.get(address, 0) + token
+
+    def fail_next(self, count: int = 1):
+        """Closes the connection instead of answering the next `count` HTTP requests."""
+        self._drop_requests += count
+
+    # --- Methods ------------------------------------------------------------
+
+    def _eth_call(self, call: Dict[str, Any], block: str = "latest") -> str:
+        data = call.get("data") or call.get("input") or ""
+        if call.get("to", "").lower() != self.token_address or not data.startswith(BALANCE_OF_SELECTOR):
+            raise ValueError("execution reverted")
+        owner = "0x" + data[len(BALANCE_OF_SELECTOR):][-40:]
+        return "0x" + format(self.token_balances.get(owner.lower(), 0), "064x")
+
+    def _send_transaction(self, tx: Dict[str, Any]) -> str:
+        sender = tx["from"].lower()
+        expected = self.nonces.get(sender, 0)
+        nonce = int(tx["nonce"], 16) if "nonce" in tx else expected
+        if nonce != expected:
+            raise ValueError(f"nonce too {'low' if nonce < expected else 'high'}: expected {expected}, got {nonce}")
+        value = int(tx.get("value", "0x0"), 16)
+        data = tx.get("data") or tx.get("input") or ""
+        if value > self.balances.get(sender, 0):
+            raise ValueError("insufficient funds for transfer")
+        if tx.get("to", "").lower() == self.token_address and data.startswith(TRANSFER_SELECTOR):
+            arguments = data[len(TRANSFER_SELECTOR):]
+            recipient, amount = "0x" + arguments[24:64].lower(), int(arguments[64:128], 16)
+            if amount > self.token_balances.get(sender, 0):
+                raise ValueError("execution reverted: transfer amount exceeds balance")
+            self.token_balances[sender] -= amount
+            self.token_balances[recipient] = self.token_balances.get(recipient, 0) + amount
+        elif value:
+            recipient = tx["to"].lower()
+            self.balances[sender] -= value
+            self.balances[recipient] = self.balances.get(recipient, 0) + value
+        self.nonces[sender] = expected + 1
+        self.block_number += 1
+        self.stats["transactions"] += 1
+        tx_hash = "0x" + hashlib.sha256(f"{sender}:{nonce}:{json.dumps(tx, sort_keys=True)}".encode()).hexdigest()
+        self.receipts[tx_hash] = {"transactionHash": tx_hash, "blockNumber": hex(self.block_number),
+                                  "from": sender, "to": tx.get("to"), "status": "0x1"}
+        return tx_hash
+
+    def handle(self, request: Any) -> Optional[Dict[str, Any]]:
+        """Answers one JSON-RPC request object."""
+        self.stats["rpc_calls"] += 1
+        request_id = request.get("id") if isinstance(request, dict) else None
+        method = self.methods.get(request.get("method")) if isinstance(request, dict) else None
+        if method is None:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": "Method not found"}}
+        try:
+            return {"jsonrpc": "2.0", "id": request_id, "result": method(*request.get("params", []))}
+        except (TypeError, ValueError, KeyError) as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32000, "message": str(e)}}
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._handlers):  # Idle keep-alive connections
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.stats["http_requests"] += 1
+                if self._drop_requests:
+                    self._drop_requests -= 1
+                    return
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                try:
+                    request = json.loads(body)
+                    reply: Any = [self.handle(r) for r in request] if isinstance(request, list) else self.handle(request)
+                except ValueError:
+                    reply = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+                payload = json.dumps(reply).encode()
+                close = headers.get("connection", "").lower() == "close"
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\nConnection: %s\r\n\r\n" % (len(payload),
+                                                                                 b"close" if close else b"keep-alive")
+                             + payload)
+                await writer.drain()
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            return
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="In-memory stub EVM JSON-RPC node for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--fund", action="append", default=[], metavar="ADDRESS",
+                        help="Address credited with 10^24 native and token units (repeatable)")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        stub = SnifZStubEVM(args.host, args.port, latency=args.latency)
+        for address in args.fund:
+            stub.fund(address, native=10 ** 24, token=10 ** 24)
+        await stub.start()
+        print(f"[*] Stub EVM (chain {stub.chain_id}, token {stub.token_address}) listening on {stub.url}")
+        await asyncio.Event().wait()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
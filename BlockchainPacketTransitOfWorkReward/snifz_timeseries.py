@@ -0,0 +1,253 @@
+import heapq
+import operator
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+TIMESERIES_FIELDS = ("packets_in", "packets_out", "bytes_in", "bytes_out")  # The leading COUNTER_FIELDS
+# (seconds per bucket, buckets kept): 1 s for 2 minutes, 1 min for an hour, 5 min for a day
+RESOLUTIONS = ((1, 120), (60, 60), (300, 288))
+MAX_SERIES = 2048  # Series kept (about 15 KB each); the least recently updated one is evicted beyond this
+INITIAL_ROWS = 16
+MIN_QUERY_BUCKETS = 10  # top() picks the coarsest resolution that still gives this many buckets
+
+
+class _Ring:
+    """
+    One resolution: `slots` buckets of `step` seconds for every series, in a
+    single array('d') laid out slot-major ([slot][row][field]), so closing a
+    bucket clears one contiguous slice and one series' history is a strided slice.
+    """
+    __slots__ = ('step', 'slots', 'fields', 'rows', 'data', 'bucket', '_zeros')
+
+    def __init__(self, step: int, slots: int, fields: int, rows: int):
+        self.step = step
+        self.slots = slots
+        self.fields = fields
+        self.rows = rows
+        self.data = array('d', bytes(8 * slots * rows * fields))
+        self.bucket: Optional[int] = None  # Absolute number (time // step) of the open bucket
+        self._zeros = array('d', bytes(8 * rows * fields))
+
+    def advance(self, now: float):
+        """Opens the bucket holding `now`, clearing every bucket skipped on the way."""
+        bucket = int(now // self.step)
+        if self.bucket is None:
+            self.bucket = bucket
+            return
+        if bucket <= self.bucket:
+            return  # Same bucket (or the clock stepped back: keep adding to the open one)
+        width = self.rows * self.fields
+        for skipped in range(max(self.bucket + 1, bucket - self.slots + 1), bucket + 1):
+            start = (skipped % self.slots) * width
+            self.data[start:start + width] = self._zeros
+        self.bucket = bucket
+
+    def add(self, row: int, values: Sequence[float]):
+        base = ((self.bucket % self.slots) * self.rows + row) * self.fields
+        data = self.data
+        for field, value in enumerate(values):
+            if value:
+                data[base + field] += value
+
+    def grow(self, rows: int):
+        """Re-lays the buffer out for `rows` series, keeping every bucket."""
+        old_width, width = self.rows * self.fields, rows * self.fields
+        data = array('d', bytes(8 * self.slots * width))
+        for slot in range(self.slots):
+            data[slot * width:slot * width + old_width] = self.data[slot * old_width:(slot + 1) * old_width]
+        self.data, self.rows = data, rows
+        self._zeros = array('d', bytes(8 * width))
+
+    def clear_row(self, row: int):
+        zeros = self._zeros[:self.fields]
+        for slot in range(self.slots):
+            start = (slot * self.rows + row) * self.fields
+            self.data[start:start + self.fields] = zeros
+
+    def history(self, row: int, field: int, buckets: int) -> array:
+        """Counts of the last `buckets` buckets (oldest first, the open bucket last) for one series."""
+        column = self.data[row * self.fields + field::self.rows * self.fields]  # One value per slot
+        split = (self.bucket + 1) % self.slots  # Slot of the oldest bucket
+        ordered = column[split:] + column[:split]
+        return ordered[len(ordered) - buckets:]
+
+    def window_totals(self, field_indexes: Sequence[int], buckets: int) -> List[float]:
+        """Per-series sums over the last `buckets` buckets of the given fields."""
+        width = self.rows * self.fields
+        totals = [0.0] * self.rows
+        for bucket in range(self.bucket - buckets + 1, self.bucket + 1):
+            start = (bucket % self.slots) * width
+            for field in field_indexes:
+                totals = list(map(operator.add, totals, self.data[start + field:start + width:self.fields]))
+        return totals
+
+
+class SnifZTimeSeriesStore:
+    """
+    Bounded, array-backed traffic history per key (node address, interface).
+
+    Every sample is added to the open bucket of each resolution (RESOLUTIONS),
+    so the 1 min and 5 min views are aggregated as data arrives and no
+    separate downsampling pass is needed. Each resolution is a ring: buckets
+    older than `slots` are overwritten, and at most `max_series` keys are kept
+    (the least recently updated is evicted), so memory is bounded by
+    max_series * sum(slots) * len(fields) * 8 bytes no matter how long the node runs.
+
+    Buckets hold counts; divide by the bucket step for rates. Queries return
+    arrays or the top-N rows only, so rendering thousands of nodes never
+    builds a per-sample object. Thread safe (gossip reports and the service
+    tick both record).
+    """
+    def __init__(self, fields: Sequence[str] = TIMESERIES_FIELDS,
+                 resolutions: Sequence[Tuple[int, int]] = RESOLUTIONS, max_series: int = MAX_SERIES,
+                 clock: Callable[[], float] = time.time):
+        if not resolutions:
+            raise ValueError("At least one resolution is required")
+        self.fields = tuple(fields)
+        self.max_series = max(1, max_series)
+        self.clock = clock
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        rows = min(INITIAL_ROWS, self.max_series)
+        self._rings = [_Ring(step, slots, len(self.fields), rows) for step, slots in sorted(resolutions)]
+        self._rows: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = []  # row -> key
+        self._updated = array('d')  # row -> last record time
+        self._last_totals: Dict[int, List[float]] = {}  # row -> cumulative totals seen by record_totals
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._rows
+
+    def keys(self) -> List[Hashable]:
+        return list(self._rows)
+
+    @property
+    def resolutions(self) -> List[Tuple[int, int]]:
+        return [(ring.step, ring.slots) for ring in self._rings]
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(ring.data) * 8 for ring in self._rings)
+
+    # --- Recording ----------------------------------------------------------
+
+    def _values(self, values) -> List[float]:
+        if isinstance(values, dict):
+            return [values.get(field, 0) or 0 for field in self.fields]
+        return list(values[:len(self.fields)])
+
+    def _row(self, key: Hashable, now: float) -> int:
+        row = self._rows.get(key)
+        if row is not None:
+            return row
+        if len(self._keys) < self.max_series:
+            row = len(self._keys)
+            if row >= self._rings[0].rows:
+                rows = min(self.max_series, self._rings[0].rows * 2)
+                for ring in self._rings:
+                    ring.grow(rows)
+            self._keys.append(key)
+            self._updated.append(now)
+        else:
+            row = min(range(len(self._updated)), key=self._updated.__getitem__)
+            del self._rows[self._keys[row]]
+            self._last_totals.pop(row, None)
+            for ring in self._rings:
+                ring.clear_row(row)
+            self._keys[row] = key
+        self._rows[key] = row
+        return row
+
+    def record(self, key: Hashable, values, now: Optional[float] = None):
+        """Adds counts (a dict keyed by field, or a sequence in field order) to `key` at `now`."""
+        now = self.clock() if now is None else now
+        counts = self._values(values)
+        with self._lock:
+            row = self._row(key, now)
+            self._updated[row] = now
+            for ring in self._rings:
+                ring.advance(now)
+                ring.add(row, counts)
+
+    def record_totals(self, key: Hashable, totals, now: Optional[float] = None):
+        """
+        Records the growth of cumulative counters (e.g. SnifZTrafficCounters
+        totals, or a peer's per-interval report). The first call per key only
+        sets the baseline; a total that went down is taken as a counter reset.
+        """
+        now = self.clock() if now is None else now
+        current = self._values(totals)
+        with self._lock:
+            row = self._row(key, now)
+            previous = self._last_totals.get(row)
+            self._last_totals[row] = current
+            self._updated[row] = now
+            for ring in self._rings:
+                ring.advance(now)
+            if previous is None:
+                return
+            counts = [value - last if value >= last else value for value, last in zip(current, previous)]
+            for ring in self._rings:
+                ring.add(row, counts)
+
+    # --- Queries ------------------------------------------------------------
+
+    def _ring_for(self, seconds: float, step: Optional[int] = None, finest: bool = True) -> _Ring:
+        """The ring for a query: `step` if given, else the finest (or cheapest adequate) one covering `seconds`."""
+        if step is not None:
+            for ring in self._rings:
+                if ring.step == step:
+                    return ring
+            raise ValueError(f"No resolution with {step}s buckets (have {[r.step for r in self._rings]})")
+        covering = [ring for ring in self._rings if ring.step * ring.slots >= seconds] or self._rings[-1:]
+        if finest:
+            return covering[0]
+        fine_enough = [ring for ring in covering if seconds / ring.step >= MIN_QUERY_BUCKETS]
+        return fine_enough[-1] if fine_enough else covering[0]
+
+    def series(self, key: Hashable, field: str, seconds: float,
+               step: Optional[int] = None, now: Optional[float] = None) -> Tuple[float, int, array]:
+        """
+        History of one field of one key over the last `seconds`:
+        (start time of the first bucket, bucket step, array of counts, oldest first).
+        The last bucket is still open. Uses the finest resolution covering the
+        range unless `step` picks one.
+        """
+        field_index = self._field_index[field]
+        now = self.clock() if now is None else now
+        with self._lock:
+            ring = self._ring_for(seconds, step)
+            ring.advance(now)
+            buckets = max(1, min(ring.slots, -(-int(seconds) // ring.step)))
+            row = self._rows.get(key)
+            counts = (ring.history(row, field_index, buckets) if row is not None
+                      else array('d', bytes(8 * buckets)))
+            start = (ring.bucket - buckets + 1) * ring.step
+        return start, ring.step, counts
+
+    def rates(self, key: Hashable, seconds: float, now: Optional[float] = None) -> Dict[str, float]:
+        """Average per-second rate of every field of `key` over the last `seconds`."""
+        return {field: sum(self.series(key, field, seconds, now=now)[2]) / seconds for field in self.fields}
+
+    def top(self, count: int, seconds: float, fields: Sequence[str] = ("packets_in", "packets_out"),
+            now: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """
+        The `count` keys with the highest per-second rate of the summed `fields`
+        over the last `seconds`, highest first, as (key, rate). Keys with no
+        traffic in the window are left out.
+        """
+        field_indexes = [self._field_index[field] for field in fields]
+        now = self.clock() if now is None else now
+        with self._lock:
+            ring = self._ring_for(seconds, finest=False)
+            ring.advance(now)
+            buckets = max(1, min(ring.slots, -(-int(seconds) // ring.step)))
+            totals = ring.window_totals(field_indexes, buckets)
+            keys = list(self._keys)
+        rows = heapq.nlargest(count, range(len(keys)), key=totals.__getitem__)
+        return [(keys[row], totals[row] / seconds) for row in rows if totals[row] > 0]
@@ -0,0 +1,150 @@
+import fcntl
+import socket
+import struct
+from typing import Dict, List, Optional, Set, Tuple
+
+# Counters kept per capture, in this fixed order, and reported under these keys in traffic_data
+COUNTER_FIELDS = (
+    "packets_in", "packets_out", "bytes_in", "bytes_out",
+    "tcp_packets", "tcp_bytes", "udp_packets", "udp_bytes",
+    "icmp_packets", "icmp_bytes", "other_packets", "other_bytes",
+)
+PACKETS_IN, PACKETS_OUT, BYTES_IN, BYTES_OUT = 0, 1, 2, 3
+PROTO_BASE = {6: 4, 17: 6, 1: 8, 58: 8}  # IP protocol -> packets slot (bytes slot is +1); ICMPv6 counts as ICMP
+PROTO_OTHER = 10
+
+# sockaddr_ll.sll_pkttype values (linux/if_packet.h)
+PACKET_HOST, PACKET_BROADCAST, PACKET_MULTICAST, PACKET_OTHERHOST, PACKET_OUTGOING = 0, 1, 2, 3, 4
+
+ETH_P_IP, ETH_P_IPV6 = 0x0800, 0x86DD
+VLAN_ETHERTYPES = (0x8100, 0x88A8)
+ARPHRD_NONE, ARPHRD_RAWIP = 65534, 519  # Link types whose frames start directly with the IP header
+SIOCGIFADDR = 0x8915
+
+
+def get_interface_addresses(interface: str) -> Tuple[Optional[bytes], Set[bytes], bool]:
+    """Returns (MAC, set of packed IPv4/IPv6 addresses, has_ethernet_header) for an interface."""
+    mac = None
+    ips: Set[bytes] = set()
+    has_ethernet = True
+    try:
+        with open(f"/sys/class/net/{interface}/address") as f:
+            mac = bytes.fromhex(f.read().strip().replace(":", "")) or None
+        with open(f"/sys/class/net/{interface}/type") as f:
+            has_ethernet = int(f.read()) not in (ARPHRD_NONE, ARPHRD_RAWIP)
+    except (OSError, ValueError):
+        pass
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            ifreq = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack("256s", interface[:15].encode()))
+            ips.add(ifreq[20:24])
+    except OSError:
+        pass
+    try:
+        with open("/proc/net/if_inet6") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) == 6 and fields[5] == interface:
+                    ips.add(bytes.fromhex(fields[0]))
+    except OSError:
+        pass
+    return mac, ips, has_ethernet
+
+
+class SnifZTrafficClassifier:
+    """
+    Classifies captured frames as inbound/outbound and by protocol, straight
+    from the raw header bytes (no scapy layers), and accumulates packet and
+    byte counters into a flat list indexed like COUNTER_FIELDS.
+
+    Direction comes from the kernel's sll_pkttype when the capture backend
+    has it (AF_PACKET), otherwise from the interface's own MAC, then IP.
+    Frames that are neither to nor from this host (promiscuous capture) only
+    count towards the protocol counters.
+    """
+    def __init__(self, local_mac: Optional[bytes], local_ips: Set[bytes],
+                 has_ethernet: bool = True, counters: Optional[List[int]] = None):
+        self.local_mac = local_mac
+        self.local_ips = local_ips
+        self.has_ethernet = has_ethernet
+        self.counters = counters if counters is not None else [0] * len(COUNTER_FIELDS)
+        self._loopback_toggle = 0
+
+    @classmethod
+    def for_interface(cls, interface: str, counters: Optional[List[int]] = None) -> 'SnifZTrafficClassifier':
+        mac, ips, has_ethernet = get_interface_addresses(interface)
+        return cls(mac, ips, has_ethernet, counters)
+
+    def _direction_from_addresses(self, frame: bytes, offset: int, l3: int, ethertype: int) -> int:
+        """0 = inbound, 1 = outbound, -1 = neither. Used when no pkttype is available."""
+        mac = self.local_mac
+        if self.has_ethernet and mac:
+            to_us = frame.startswith(mac, offset)
+            if frame.startswith(mac, offset + 6):
+                if to_us:
+                    # Loopback-style links show each frame twice (tx then rx) with identical MACs
+                    self._loopback_toggle ^= 1
+                    return self._loopback_toggle
+                return 1
+            if to_us or frame[offset] & 1:  # Unicast to us, or broadcast/multicast
+                return 0
+        if ethertype == ETH_P_IP:
+            src, dst = frame[l3 + 12:l3 + 16], frame[l3 + 16:l3 + 20]
+        elif ethertype == ETH_P_IPV6:
+            src, dst = frame[l3 + 8:l3 + 24], frame[l3 + 24:l3 + 40]
+        else:
+            return -1
+        if src in self.local_ips:
+            return 1
+        if dst in self.local_ips:
+            return 0
+        return -1
+
+    def count_frame(self, frame, offset: int, length: int, pkttype: Optional[int] = None):
+        """Counts one frame that starts at frame[offset] and was `length` bytes on the wire."""
+        counters = self.counters
+        try:
+            # --- Locate the network header ---
+            if self.has_ethernet:
+                ethertype = (frame[offset + 12] << 8) | frame[offset + 13]
+                l3 = offset + 14
+                if ethertype in VLAN_ETHERTYPES:
+                    ethertype = (frame[l3 + 2] << 8) | frame[l3 + 3]
+                    l3 += 4
+            else:
+                version = frame[offset] >> 4
+                ethertype = ETH_P_IP if version == 4 else (ETH_P_IPV6 if version == 6 else 0)
+                l3 = offset
+
+            # --- Protocol ---
+            if ethertype == ETH_P_IP:
+                slot = PROTO_BASE.get(frame[l3 + 9], PROTO_OTHER)
+            elif ethertype == ETH_P_IPV6:
+                slot = PROTO_BASE.get(frame[l3 + 6], PROTO_OTHER)
+            else:
+                slot = PROTO_OTHER
+
+            # --- Direction ---
+            if pkttype is not None:
+                if pkttype == PACKET_OUTGOING:
+                    direction = 1
+                elif pkttype == PACKET_OTHERHOST:
+                    direction = -1
+                else:
+                    direction = 0
+            else:
+                direction = self._direction_from_addresses(frame, offset, l3, ethertype)
+        except IndexError:  # Truncated/runt frame: count it, but without a direction
+            slot, direction = PROTO_OTHER, -1
+
+        counters[slot] += 1
+        counters[slot + 1] += length
+        if direction == 0:
+            counters[PACKETS_IN] += 1
+            counters[BYTES_IN] += length
+        elif direction == 1:
+            counters[PACKETS_OUT] += 1
+            counters[BYTES_OUT] += length
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(zip(COUNTER_FIELDS, self.counters))
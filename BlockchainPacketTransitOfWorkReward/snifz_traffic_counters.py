@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Dict, List, MutableSequence, Sequence
+
+from snifz_traffic_classifier import COUNTER_FIELDS
+
+
+class SnifZTrafficCounters:
+    """
+    Contention-free traffic counters.
+
+    Every capture thread gets its own shard (a flat list indexed like
+    COUNTER_FIELDS) and is the only writer of it, so increments never race and
+    the capture path takes no locks. Shards are monotonic - they are never reset
+    - which is what makes reads safe: a reader copies each shard in one C-level
+    slice and sums them. Resetting is done on the reader side by windows
+    (see SnifZTrafficWindow), which keep a baseline and report the difference.
+    """
+    def __init__(self, fields: Sequence[str] = COUNTER_FIELDS):
+        self.fields = tuple(fields)
+        self._shards: List[MutableSequence[int]] = []
+        self._local = threading.local()
+        self._register_lock = threading.Lock()
+
+    def shard(self) -> MutableSequence[int]:
+        """Returns the calling thread's shard, creating it on first use."""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self.add_shard([0] * len(self.fields))
+            self._local.shard = shard
+        return shard
+
+    def add_shard(self, shard: MutableSequence[int]) -> MutableSequence[int]:
+        """Registers externally owned counter storage (e.g. a shared-memory array)."""
+        with self._register_lock:
+            # Copy-on-write, so readers can iterate the list without holding the lock
+            self._shards = self._shards + [shard]
+        return shard
+
+    def totals(self) -> List[int]:
+        """Sums all shards; each shard is copied atomically, so no increment is half-read."""
+        totals = [0] * len(self.fields)
+        for shard in self._shards:
+            for i, value in enumerate(shard[:]):
+                totals[i] += value
+        return totals
+
+    def window(self) -> 'SnifZTrafficWindow':
+        return SnifZTrafficWindow(self)
+
+
+class SnifZTrafficWindow:
+    """An independent reporting window over SnifZTrafficCounters (e.g. mint interval, live UI rate)."""
+    def __init__(self, counters: SnifZTrafficCounters):
+        self._counters = counters
+        self._lock = threading.Lock()
+        self._baseline = counters.totals()
+        self._started = time.monotonic()
+
+    def _delta(self, current: List[int]) -> Dict[str, int]:
+        return {field: now - base for field, now, base in zip(self._counters.fields, current, self._baseline)}
+
+    def peek(self) -> Dict[str, int]:
+        """Counts since the window last rolled, without rolling it."""
+        return self._delta(self._counters.totals())
+
+    def roll(self) -> Dict[str, int]:
+        """Atomically returns the counts since the last roll and starts a new window."""
+        with self._lock:
+            current = self._counters.totals()
+            data = self._delta(current)
+            self._baseline = current
+            self._started = time.monotonic()
+        return data
+
+    def roll_rates(self) -> Dict[str, float]:
+        """Like roll(), but per second over the elapsed window."""
+        with self._lock:
+            current = self._counters.totals()
+            elapsed = max(time.monotonic() - self._started, 1e-6)
+            data = {field: count / elapsed for field, count in self._delta(current).items()}
+            self._baseline = current
+            self._started = time.monotonic()
+        return data
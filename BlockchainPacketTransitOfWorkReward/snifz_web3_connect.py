@@ -1,24 +1,56 @@
-from web3 import Web3
-import qrcode
+import asyncio
 from io import BytesIO
-from typing import Optional, Dict, Any
-from eth_account import Account
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
 import secrets
 
+from snifz_rpc_client import SnifZRPCClient
+
+BALANCE_OF_SELECTOR = "0x70a08231"  # ERC-20 balanceOf(address)
+TRANSFER_SELECTOR = "0xa9059cbb"  # ERC-20 transfer(address,uint256)
+TRANSFER_GAS = 100000
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
 class SnifZWeb3Connector:
-    """Manages Web3 connections, unique address generation, and token interaction."""
+    """
+    Manages Web3 connections, unique address generation, and token interaction.
+
+    The heavy dependencies are imported on first use: web3 when the
+    connection is first needed, qrcode when a QR code is drawn, and only
+    eth_keys (not the whole eth_account stack) to derive the core address.
+    Reads such as balances go through `rpc`, a pooled and batching async
+    JSON-RPC client (see snifz_rpc_client) that needs no web3 at all.
+    """
     def __init__(self, rpc_url: str = 'http://127.0.0.1:8545'): # Placeholder for a custom EVM network or node
-        self.web3: Web3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.rpc_url = rpc_url
+        self._web3: Optional['Web3'] = None
+        self._rpc: Optional[SnifZRPCClient] = None
         self.wallet_address: Optional[str] = None
         # Placeholder for Sniffing-Packeting Token Contract ABI and Address
         self.token_contract = None
 
+    @property
+    def web3(self) -> 'Web3':
+        """The Web3 connection, created on first access."""
+        if self._web3 is None:
+            from web3 import Web3
+            self._web3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        return self._web3
+
+    @property
+    def rpc(self) -> SnifZRPCClient:
+        """The async JSON-RPC client for rpc_url (bound to the event loop that first uses it)."""
+        if self._rpc is None:
+            self._rpc = SnifZRPCClient(self.rpc_url)
+        return self._rpc
+
     def generate_unique_core_address(self) -> str:
         """Generates a new unique, secure Ethereum-compatible address (Widget 17)."""
+        from eth_keys import keys  # What eth_account.Account.from_key uses underneath
         # The key to "unique" is generating a new private key
         priv_key = secrets.token_hex(32)
-        account = Account.from_key(priv_key)
-        self.wallet_address = account.address
+        self.wallet_address = keys.PrivateKey(bytes.fromhex(priv_key)).public_key.to_checksum_address()
         # NOTE: The private key *must* be securely stored or derived from a mnemonic!
         return self.wallet_address
 
@@ -26,7 +58,8 @@ class SnifZWeb3Connector:
         """Generates a QR code image stream for the unique address (Widget 18)."""
         if not self.wallet_address:
             raise ValueError("Unique core address not yet generated.")
-            
+
+        import qrcode  # Only needed once the QR code is shown (Dock 3)
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -59,9 +92,53 @@ class SnifZWeb3Connector:
         # Real code would call the contract's 'addLiquidity' function
         print(f"[Web3] Instructing {self.wallet_address} to provide {amount} liquidity for $@SNFZ@$.")
 
-    # Additional methods for 'swap_tokens', 'get_token_balance', etc., would reside here.
+    async def get_block_number(self) -> int:
+        return int(await self.rpc.call("eth_blockNumber"), 16)
+
+    async def get_token_balance(self, address: Optional[str] = None) -> int:
+        """
+        Token balance in the smallest unit (Widget 19): balanceOf on token_contract,
+        or the native balance while no token contract is configured.
+        """
+        address = address or self.wallet_address
+        if not address:
+            raise ValueError("Unique core address not yet generated.")
+        if self.token_contract is None:
+            return int(await self.rpc.call("eth_getBalance", [address, "latest"]), 16)
+        data = BALANCE_OF_SELECTOR + address[2:].lower().rjust(64, "0")
+        return int(await self.rpc.call("eth_call", [{"to": self.token_contract, "data": data}, "latest"]), 16)
+
+    async def get_token_balances(self, addresses: List[str]) -> Dict[str, int]:
+        """Balances of many addresses, sent as JSON-RPC batches."""
+        balances = await asyncio.gather(*(self.get_token_balance(address) for address in addresses))
+        return dict(zip(addresses, balances))
+
+    async def get_nonce(self, address: str) -> int:
+        """Next nonce for the address, counting its transactions still pending on the node."""
+        return int(await self.rpc.call("eth_getTransactionCount", [address, "pending"]), 16)
+
+    def transfer_transaction(self, sender: str, recipient: str, amount: int, nonce: int) -> Dict[str, Any]:
+        """eth_sendTransaction params for a token transfer (native transfer without token_contract)."""
+        if self.token_contract is None:
+            return {"from": sender, "to": recipient, "value": hex(amount), "nonce": hex(nonce)}
+        data = TRANSFER_SELECTOR + recipient[2:].lower().rjust(64, "0") + format(amount, "064x")
+        return {"from": sender, "to": self.token_contract, "data": data, "nonce": hex(nonce),
+                "gas": hex(TRANSFER_GAS)}
+
+    async def send_transfers(self, sender: str, transfers: List[Tuple[str, int, int]]) -> List[Any]:
+        """
+        Sends (recipient, amount, nonce) transfers from `sender` in one JSON-RPC
+        batch. The sender must be an account the node signs for. Returns, per
+        transfer, the transaction hash or the exception it failed with.
+        """
+        results = await self.rpc.batch([("eth_sendTransaction", [self.transfer_transaction(sender, *transfer)])
+                                        for transfer in transfers], return_exceptions=True)
+        self.rpc.invalidate("eth_getBalance")
+        self.rpc.invalidate("eth_call")
+        return results
+
+    async def get_receipts(self, tx_hashes: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Receipts of the transactions (None while one is not mined yet)."""
+        return await self.rpc.batch([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes])
 
-# Example Usage:
-web3_conn = SnifZWeb3Connector()
-new_address = web3_conn.generate_unique_core_address()
-qr_image_stream = web3_conn.generate_address_qr_code()
\ No newline at end of file
+    # Additional methods for 'swap_tokens' etc. would reside here.
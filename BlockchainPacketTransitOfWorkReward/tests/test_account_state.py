@@ -0,0 +1,54 @@
+from sniff_reward_logic import SnifZRewardSystem
+from snifz_blockchain_core import SnifZAccountState, SnifZBlockchain
+
+
+def scan_balance(chain, address):
+    """The legacy full-chain rescan the index replaces."""
+    balance = 0.0
+    for block in chain:
+        for tx in block.transactions:
+            if tx['recipient'] == address:
+                balance += tx['amount']
+            if tx['sender'] == address:
+                balance -= tx['amount']
+    return balance
+
+
+def busy_chain():
+    blockchain = SnifZBlockchain()
+    for i in range(6):
+        blockchain.mempool.add("BLOCK_REWARD", "0xa" if i % 2 else "0xb", 1000.0)
+        if i >= 2:
+            blockchain.mempool.add("0xa", "0xc", 10.0 * i)
+            blockchain.mempool.add("0xb", "0xa", 1.5)
+        blockchain.new_block(nonce=i, prev_hash=None, traffic_data={}, timestamp=float(i))
+    return blockchain
+
+
+def test_balances_match_a_chain_scan():
+    blockchain = busy_chain()
+    rewards = SnifZRewardSystem(blockchain, "0xme")
+    for address in ("0xa", "0xb", "0xc", "0xnobody"):
+        assert rewards.get_balance(address) == scan_balance(blockchain.chain, address)
+    assert blockchain.account_state.height == len(blockchain.chain)
+
+
+def test_history_and_sequences():
+    state = busy_chain().account_state
+    assert state.get_sequence("0xa") == 4 and state.get_sequence("0xnobody") == 0
+    assert [index for index, _ in state.get_history("0xc")] == [4, 5, 6, 7]
+    assert state.get_history("0xnobody") == []
+
+
+def test_rebuild_export_and_verify():
+    blockchain = busy_chain()
+    state = blockchain.account_state
+    assert state.verify(blockchain.chain)
+
+    restored = SnifZAccountState()
+    restored.load(state.export())
+    assert restored.verify(blockchain.chain)
+
+    rebuilt = SnifZAccountState()
+    rebuilt.rebuild(blockchain.chain[:3])
+    assert not rebuilt.verify(blockchain.chain)
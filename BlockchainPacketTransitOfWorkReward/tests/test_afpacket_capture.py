@@ -0,0 +1,82 @@
+import mmap
+import socket
+import struct
+
+from snifz_afpacket_capture import (BLOCK_FIRST_PKT_OFFSET, BLOCK_NUM_PKTS_OFFSET, BLOCK_STATUS_OFFSET,
+                                    SLL_PKTTYPE_OFFSET, TP_STATUS_KERNEL, TP_STATUS_USER, SnifZAFPacketCapture)
+from snifz_traffic_classifier import PACKET_HOST, PACKET_OUTGOING, SnifZTrafficClassifier
+
+BLOCK_SIZE = 4096
+FIRST_FRAME = 48  # Past tpacket_block_desc
+MAC_OFFSET = 80  # tp_mac: where the frame bytes start, past tpacket3_hdr and sockaddr_ll
+
+
+def ipv4_frame(protocol, size):
+    ethernet = b"\x02" * 6 + b"\x04" * 6 + b"\x08\x00"
+    ip = bytes([0x45, 0, 0, 0, 0, 0, 0, 0, 64, protocol]) + bytes(10)
+    return (ethernet + ip).ljust(size, b"\x00")
+
+
+def fill_block(ring, block, frames):
+    """Writes a TPACKET_V3 block the way the kernel hands it over: (frame bytes, sll_pkttype) pairs."""
+    base = block * BLOCK_SIZE
+    position = base + FIRST_FRAME
+    for i, (data, pkttype) in enumerate(frames):
+        size = (MAC_OFFSET + len(data) + 15) & ~15
+        next_offset = size if i < len(frames) - 1 else 0
+        struct.pack_into("=I", ring, position, next_offset)
+        struct.pack_into("=I", ring, position + 16, len(data))  # tp_len
+        struct.pack_into("=H", ring, position + 24, MAC_OFFSET)  # tp_mac
+        ring[position + SLL_PKTTYPE_OFFSET] = pkttype
+        ring[position + MAC_OFFSET:position + MAC_OFFSET + len(data)] = data
+        position += size
+    struct.pack_into("=I", ring, base + BLOCK_NUM_PKTS_OFFSET, len(frames))
+    struct.pack_into("=I", ring, base + BLOCK_FIRST_PKT_OFFSET, FIRST_FRAME)
+    struct.pack_into("=I", ring, base + BLOCK_STATUS_OFFSET, TP_STATUS_USER)
+
+
+def ring_capture(block_count=2):
+    capture = SnifZAFPacketCapture("lo", block_size=BLOCK_SIZE, block_count=block_count)
+    capture._ring = mmap.mmap(-1, BLOCK_SIZE * block_count)
+    capture._sock, peer = socket.socketpair()  # Only polled, never read
+    return capture, peer
+
+
+def test_ring_frames_are_classified_in_place():
+    capture, peer = ring_capture()
+    fill_block(capture._ring, 0, [(ipv4_frame(6, 100), PACKET_HOST), (ipv4_frame(17, 60), PACKET_OUTGOING),
+                                  (ipv4_frame(6, 1500), PACKET_OUTGOING)])
+    classifier = SnifZTrafficClassifier(None, set())
+    batches = []
+    capture._run_ring(lambda: not batches, batches.append, classifier)
+    counts = classifier.snapshot()
+    assert batches == [3]
+    assert (counts["packets_in"], counts["bytes_in"]) == (1, 100)
+    assert (counts["packets_out"], counts["bytes_out"]) == (2, 1560)
+    assert (counts["tcp_packets"], counts["tcp_bytes"], counts["udp_packets"]) == (2, 1600, 1)
+    assert struct.unpack_from("=I", capture._ring, BLOCK_STATUS_OFFSET)[0] == TP_STATUS_KERNEL
+    capture.close()
+    peer.close()
+
+
+def test_count_only_runs_walk_the_ring_by_block():
+    capture, peer = ring_capture(block_count=2)
+    fill_block(capture._ring, 0, [(ipv4_frame(6, 64), PACKET_HOST)] * 5)
+    fill_block(capture._ring, 1, [(ipv4_frame(6, 64), PACKET_HOST)] * 2)
+    batches = []
+    capture._run_ring(lambda: len(batches) < 2, batches.append, None)
+    assert batches == [5, 2]
+    capture.close()
+    peer.close()
+
+
+def test_recv_fallback_reports_pending_packets_on_timeout():
+    capture = SnifZAFPacketCapture("lo", use_ring=False)
+    capture._sock, peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    for _ in range(3):
+        peer.send(b"x" * 60)
+    batches = []
+    capture._run_recv(lambda: not batches, batches.append, None)
+    assert batches == [3]
+    capture.close()
+    peer.close()
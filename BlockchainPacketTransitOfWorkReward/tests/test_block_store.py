@@ -0,0 +1,147 @@
+import os
+import threading
+
+import pytest
+
+from snifz_block_store import OFFSET_SIZE, SnifZBlockStore, read_raw_records
+from snifz_blockchain_core import Block
+
+
+def make_blocks(count, start=1):
+    return [Block(i, 1700000000.0 + i, ({'sender': "BLOCK_REWARD", 'recipient': f"0x{i % 3}", 'amount': 1000.0},),
+                  f"{i - 1:064x}", {"packets_in": i, "packets_out": 2 * i}) for i in range(start, start + count)]
+
+
+def hashes(blocks):
+    return [block.compute_hash() for block in blocks]
+
+
+def test_round_trip_across_reopen(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    blocks = make_blocks(50)
+    with SnifZBlockStore(path, sync_every=8) as store:
+        for block in blocks:
+            store.append(block)
+    with SnifZBlockStore(path) as store:
+        assert len(store) == 50
+        assert hashes(store) == hashes(blocks)
+        assert store[-1].compute_hash() == blocks[-1].compute_hash()
+        assert Block.deserialize(store.read_raw(10)).compute_hash() == blocks[10].compute_hash()
+
+
+def test_recovers_records_missing_from_the_index(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    blocks = make_blocks(20)
+    store = SnifZBlockStore(path, sync_every=1000)
+    for block in blocks:
+        store.append(block)
+    store._segment.flush()  # Crash: the segment reached the disk, the index did not
+    assert os.path.getsize(path + ".idx") == 0
+    with SnifZBlockStore(path) as reopened:
+        assert hashes(reopened) == hashes(blocks)
+
+
+def test_truncates_a_torn_tail(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    with SnifZBlockStore(path) as store:
+        for block in make_blocks(5):
+            store.append(block)
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00garbage")  # A record header whose payload never made it
+    with open(path + ".idx", "ab") as f:
+        f.write(b"\x01\x02\x03")  # And a torn index entry
+    with SnifZBlockStore(path) as store:
+        assert len(store) == 5
+        store.append(make_blocks(1, start=6)[0])
+    assert os.path.getsize(path) > size
+    with SnifZBlockStore(path) as store:
+        assert [block.index for block in store] == [1, 2, 3, 4, 5, 6]
+        assert os.path.getsize(path + ".idx") == 6 * OFFSET_SIZE
+
+
+def test_drops_index_entries_past_corrupt_records(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    with SnifZBlockStore(path) as store:
+        for block in make_blocks(4):
+            store.append(block)
+        last = store._offsets[-1]
+    with open(path, "r+b") as f:
+        f.seek(last + 12)
+        f.write(b"\xff")  # Flip a payload byte of the last record: its crc no longer matches
+    with SnifZBlockStore(path) as store:
+        assert len(store) == 3
+
+
+def test_truncate(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    blocks = make_blocks(10)
+    with SnifZBlockStore(path) as store:
+        for block in blocks:
+            store.append(block)
+        store.truncate(6)
+        assert len(store) == 6
+        with pytest.raises(IndexError):
+            store[6]
+        store.append(make_blocks(1, start=7)[0])
+    with SnifZBlockStore(path) as store:
+        assert [block.index for block in store] == list(range(1, 8))
+
+
+def test_read_raw_records_matches_the_store(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    with SnifZBlockStore(path) as store:
+        for block in make_blocks(12):
+            store.append(block)
+        expected = [store.read_raw(i) for i in range(3, 9)]
+    assert read_raw_records(path, 3, 9) == expected
+
+
+def test_reads_while_another_thread_appends_and_truncates(tmp_path):
+    store = SnifZBlockStore(str(tmp_path / "chain.seg"), sync_every=3)
+    store.append(make_blocks(1)[0])
+    stop, errors = threading.Event(), []
+
+    def serve():
+        while not stop.is_set():
+            try:
+                height = len(store)
+                Block.read_header(store.read_raw(height - 1))
+            except IndexError:
+                pass  # Truncated between len() and the read
+            except Exception as e:
+                errors.append(e)
+                return
+
+    reader = threading.Thread(target=serve)
+    reader.start()
+    try:
+        for block in make_blocks(3000, start=2):
+            store.append(block)
+            if block.index % 1000 == 0:
+                store.truncate(block.index - 10)
+                for refill in make_blocks(10, start=block.index - 9):
+                    store.append(refill)
+    finally:
+        stop.set()
+        reader.join()
+        store.close()
+    assert errors == []
+
+
+def test_reads_of_mapped_records_do_not_remap(tmp_path):
+    with SnifZBlockStore(str(tmp_path / "chain.seg"), sync_every=1000) as store:
+        blocks = make_blocks(30)
+        for block in blocks:
+            store.append(block)
+        remaps = []
+        remap = store._remap
+        store._remap = lambda: (remaps.append(True), remap())
+        assert [store.read_raw(i) for i in range(30)] == [block.serialize() for block in blocks]
+        assert store.read_raw(-1) == blocks[-1].serialize()
+        assert len(remaps) == 1  # The buffered appends are mapped once, then every read is a slice
+        store.append(make_blocks(1, start=31)[0])
+        store.read_raw(0)
+        assert len(remaps) == 1
+        store.read_raw(30)
+        assert len(remaps) == 2
@@ -0,0 +1,37 @@
+from snifz_capture_manager import ALL_INTERFACES, SnifZCaptureManager
+from snifz_traffic_classifier import COUNTER_FIELDS
+
+PACKETS_IN = COUNTER_FIELDS.index("packets_in")
+BYTES_OUT = COUNTER_FIELDS.index("bytes_out")
+
+
+def test_interfaces_are_merged_with_a_breakdown():
+    manager = SnifZCaptureManager(["eth0", "wlan0"])
+    assert manager.interface == ALL_INTERFACES
+    manager._shards["eth0"][PACKETS_IN] += 7  # What the capture workers write into shared memory
+    manager._shards["wlan0"][PACKETS_IN] += 3
+    manager._shards["wlan0"][BYTES_OUT] += 1500
+    assert manager.packets_in_count == 10
+
+    data = manager.get_current_traffic_data()
+    assert data["packets_in"] == 10 and data["bytes_out"] == 1500
+    assert data["interfaces"]["eth0"]["packets_in"] == 7
+    assert data["interfaces"]["wlan0"]["bytes_out"] == 1500
+    assert manager.session_io_history[-1] is data
+    assert manager.packets_in_count == 0  # The mint window rolled
+    assert manager.interface_totals()["eth0"][PACKETS_IN] == 7  # The shards did not
+
+
+def test_live_rates_use_their_own_window():
+    manager = SnifZCaptureManager(["eth0"])
+    manager._shards["eth0"][PACKETS_IN] += 4
+    live = manager.get_live_traffic_data()
+    assert live["packets_in"] > 0
+    assert manager.get_current_traffic_data()["packets_in"] == 4
+
+
+def test_start_without_interfaces_is_a_no_op():
+    manager = SnifZCaptureManager([])
+    manager.interfaces = []
+    manager.start_sniffing()
+    assert not manager._is_sniffing
@@ -0,0 +1,61 @@
+from snifz_blockchain_core import SnifZBlockchain
+
+WINNERS = ["0xa", "0xb", "0xa", "0xc", "0xa", "0xb"] * 5
+
+
+def mint(blockchain, winners, start_time=1000.0):
+    for i, winner in enumerate(winners):
+        blockchain.mempool.add("BLOCK_REWARD", winner, 1000.0)
+        blockchain.new_block(nonce=i, prev_hash=None, traffic_data={}, timestamp=start_time + i)
+
+
+def test_queries_match_a_chain_scan():
+    blockchain = SnifZBlockchain()
+    mint(blockchain, WINNERS)
+    chain = blockchain.chain
+    for address in ("0xa", "0xb", "0xc", "0xnobody"):
+        expected = [block.index for block in chain if block.transactions
+                    and block.transactions[0]['recipient'] == address]
+        assert blockchain.get_blocks_won_by(address) == expected
+        assert blockchain.count_blocks_won_by(address) == len(expected)
+    expected = [block.index for block in chain if 1005.0 <= block.timestamp <= 1012.0]
+    assert blockchain.get_blocks_between(1005.0, 1012.0) == expected
+    assert blockchain.count_blocks_between(1005.0, 1012.0) == len(expected)
+    tip = chain[-1]
+    assert blockchain.get_block_by_hash(tip.compute_hash()).index == tip.index
+    assert blockchain.height_of("00" * 32) is None
+
+
+def test_pages_are_slices_of_the_full_result():
+    blockchain = SnifZBlockchain()
+    mint(blockchain, WINNERS)
+    everything = blockchain.get_blocks_won_by("0xa")
+    in_window = blockchain.get_blocks_between(1000.0, 1100.0)
+    for offset, count in ((0, 3), (2, 4), (10, 100), (len(everything), 5)):
+        assert blockchain.get_blocks_won_by("0xa", offset, count) == everything[offset:offset + count]
+        assert blockchain.get_blocks_between(1000.0, 1100.0, offset, count) == in_window[offset:offset + count]
+
+
+def test_rollback_forgets_dropped_blocks():
+    blockchain = SnifZBlockchain()
+    mint(blockchain, WINNERS)
+    dropped = blockchain.chain[-1].compute_hash()
+    blockchain.truncate(10)
+    assert blockchain.get_blocks_won_by("0xa") == [2, 4, 6, 8, 10]  # Genesis is block 1, so WINNERS[i] won i + 2
+    assert blockchain.get_block_by_hash(dropped) is None
+    assert blockchain.count_blocks_between(0.0, 1e12) == 10
+
+
+def test_persisted_index_survives_a_restart(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    blockchain = SnifZBlockchain(store_path=path)
+    mint(blockchain, WINNERS)
+    expected = blockchain.get_blocks_won_by("0xb")
+    blockchain.close()
+
+    reopened = SnifZBlockchain(store_path=path)
+    assert reopened.index.persisted_height == len(reopened.chain)
+    assert reopened.get_blocks_won_by("0xb") == expected
+    mint(reopened, ["0xb"], start_time=2000.0)
+    assert reopened.get_blocks_won_by("0xb") == expected + [len(reopened.chain)]
+    reopened.close()
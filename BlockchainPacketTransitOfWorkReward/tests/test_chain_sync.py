@@ -0,0 +1,106 @@
+import asyncio
+
+from snifz_benchmark import _extend_chain
+from snifz_blockchain_core import Block, SnifZBlockchain
+from snifz_chain_sync import SnifZChainSync
+from snifz_chain_validator import SnifZChainValidator
+from snifz_peer_gossip import MAX_BLOCKS_PER_REPLY, MSG_BLOCKS, MSG_GET_BLOCKS, SnifZGossipNode
+
+
+class ForgingNode(SnifZGossipNode):
+    """Serves honest headers but forged block bodies."""
+    async def _on_get_blocks(self, peer, payload):
+        blocks = []
+        for height in self._served_range(payload, MAX_BLOCKS_PER_REPLY):
+            block = self.blockchain.chain[height - 1]
+            blocks.append(Block(block.index, block.timestamp, block.transactions, block.prev_hash,
+                                {"packets_in": 1}, block.nonce).serialize())
+        await peer.send(MSG_BLOCKS, {"start": payload["start"], "count": payload["count"], "blocks": tuple(blocks)})
+
+    HANDLERS = {**SnifZGossipNode.HANDLERS, MSG_GET_BLOCKS: _on_get_blocks}
+
+
+def source_chain(height):
+    blockchain = SnifZBlockchain()
+    _extend_chain(blockchain, height)
+    return blockchain
+
+
+def sharing_genesis(source):
+    blockchain = SnifZBlockchain()
+    blockchain.truncate(0)
+    blockchain.append_block(Block.deserialize(source.chain[0].serialize()))
+    return blockchain
+
+
+async def connected(target, *sources, node_types=()):
+    """Starts a gossip node per chain; the first one (the syncing node) dials all the others."""
+    nodes = [SnifZGossipNode("0x0", blockchain=target, port=0)]
+    for i, source in enumerate(sources, 1):
+        node_type = node_types[i - 1] if i <= len(node_types) else SnifZGossipNode
+        nodes.append(node_type(f"0x{i}", blockchain=source, port=0))
+    for node in nodes:
+        await node.start()
+    for node in nodes[1:]:
+        await nodes[0].connect(node.host, node.port)
+    while len(nodes[0].peers) < len(sources):
+        await asyncio.sleep(0.005)
+    return nodes
+
+
+async def close(nodes):
+    for node in nodes:
+        await node.close()
+
+
+def test_fresh_node_syncs_and_resumes():
+    source = source_chain(1200)
+    target = sharing_genesis(source)
+
+    async def scenario():
+        nodes = await connected(target, source, source)
+        sync = SnifZChainSync(target, nodes[0], body_batch=100)
+        first = await sync.sync()
+        _extend_chain(source, 1300)
+        second = await sync.sync()
+        await close(nodes)
+        return first, second
+
+    first, second = asyncio.run(asyncio.wait_for(scenario(), 30))
+    assert (first["synced"], first["height"], first["peers"]) == (1199, 1200, 2)
+    assert sorted(first["sources"]) == ["0x1", "0x2"]
+    assert second["synced"] == 100
+    assert target.last_block.compute_hash() == source.last_block.compute_hash()
+    assert SnifZChainValidator(target, workers=1).validate_chain()["valid"]
+    assert target.account_state.verify(target.chain)
+
+
+def test_switches_to_a_longer_fork_and_drops_a_forging_peer():
+    source = source_chain(600)
+    target = sharing_genesis(source)
+    _extend_chain(target, 40, seed=3)  # A shorter fork above genesis
+
+    async def scenario():
+        nodes = await connected(target, source, source, node_types=(SnifZGossipNode, ForgingNode))
+        report = await SnifZChainSync(target, nodes[0], body_batch=50).sync()
+        peers = sorted(nodes[0].peers)
+        await close(nodes)
+        return report, peers
+
+    report, peers = asyncio.run(asyncio.wait_for(scenario(), 30))
+    assert report["height"] == 600 and report["synced"] == 599
+    assert target.last_block.compute_hash() == source.last_block.compute_hash()
+    assert peers == ["0x1"]  # The peer that served forged bodies was dropped
+
+
+def test_nothing_to_do_when_no_peer_is_ahead():
+    source = source_chain(10)
+
+    async def scenario():
+        nodes = await connected(source, source_chain(5))
+        report = await SnifZChainSync(source, nodes[0]).sync()
+        await close(nodes)
+        return report
+
+    report = asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert (report["synced"], report["target"], report["sources"]) == (0, None, [])
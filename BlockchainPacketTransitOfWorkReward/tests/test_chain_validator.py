@@ -0,0 +1,76 @@
+import time
+
+from sniff_reward_logic import TOKEN_REWARD_AMOUNT
+from snifz_blockchain_core import Block, SnifZBlockchain
+from snifz_chain_validator import SnifZChainValidator, check_block_rules
+
+
+NOW = time.time() + 3600  # After the wall-clock genesis block
+
+
+def mint(blockchain, count, start_time=NOW):
+    for i in range(count):
+        blockchain.mempool.add("BLOCK_REWARD", f"0x{i % 3}", TOKEN_REWARD_AMOUNT)
+        blockchain.new_block(nonce=i, prev_hash=None, traffic_data={"packets_in": i}, timestamp=start_time + i)
+
+
+def forge(block, **fields):
+    values = {"index": block.index, "timestamp": block.timestamp, "transactions": block.transactions,
+              "prev_hash": block.prev_hash, "traffic_data": block.traffic_data, "nonce": block.nonce}
+    values.update(fields)
+    return Block(**values)
+
+
+def test_a_minted_chain_is_valid():
+    blockchain = SnifZBlockchain()
+    mint(blockchain, 30)
+    report = SnifZChainValidator(blockchain, workers=1, chunk_size=7).validate_chain()
+    assert report["valid"] and report["errors"] == []
+    assert report["checked"] == 31
+    assert report["checkpoint"] == (31, blockchain.chain[-1].compute_hash())
+
+
+def test_block_rules():
+    reward = {'sender': "BLOCK_REWARD", 'recipient': "0xa", 'amount': TOKEN_REWARD_AMOUNT}
+    assert check_block_rules(Block(2, 1.0, (reward,), "ab" * 32, {}), 1) == []
+    assert check_block_rules(Block(1, 1.0, (), "1", {}), 0) == []
+    assert len(check_block_rules(Block(1, 1.0, (reward,), "ab" * 32, {}), 0)) == 2  # Bad genesis link and reward
+    assert check_block_rules(Block(3, 1.0, (reward,), "ab" * 32, {}), 1)[0].endswith("chain position 2")
+    assert "expected exactly one" in check_block_rules(Block(2, 1.0, (reward, reward), "ab" * 32, {}), 1)[0]
+    doubled = dict(reward, amount=2 * TOKEN_REWARD_AMOUNT)
+    assert "BLOCK_REWARD of" in check_block_rules(Block(2, 1.0, (doubled,), "ab" * 32, {}), 1)[0]
+
+
+def test_broken_links_are_reported_across_range_boundaries():
+    blockchain = SnifZBlockchain()
+    mint(blockchain, 20)
+    chain = blockchain.chain
+    chain[7] = forge(chain[7], prev_hash="00" * 32)  # Inside a range
+    chain[14] = forge(chain[14], timestamp=0.0)  # First block of a range: checked against the previous range
+    report = SnifZChainValidator(blockchain, workers=1, chunk_size=7).validate_chain()
+    assert not report["valid"]
+    assert "Block 8: prev_hash does not link to block 7" in report["errors"]
+    assert "Block 15: timestamp goes backwards" in report["errors"]
+    assert report["checkpoint"] is None
+
+
+def test_checkpoints_make_the_next_run_incremental():
+    blockchain = SnifZBlockchain()
+    mint(blockchain, 10)
+    validator = SnifZChainValidator(blockchain, workers=1)
+    assert validator.validate_chain()["checked"] == 11
+    mint(blockchain, 5, start_time=NOW + 100)
+    report = validator.validate_chain()
+    assert report["valid"] and report["checked"] == 5
+    assert blockchain.validated_checkpoint == (16, blockchain.chain[-1].compute_hash())
+    assert validator.validate_chain(incremental=False)["checked"] == 16
+
+
+def test_process_pool_matches_inline_validation(tmp_path):
+    blockchain = SnifZBlockchain(store_path=str(tmp_path / "chain.seg"))
+    mint(blockchain, 40)
+    pooled = SnifZChainValidator(blockchain, workers=2, chunk_size=10).validate_chain()
+    inline = SnifZChainValidator(blockchain, workers=1, chunk_size=10).validate_chain()
+    assert pooled["valid"] and inline["valid"]
+    assert pooled["checkpoint"] == inline["checkpoint"]
+    blockchain.close()
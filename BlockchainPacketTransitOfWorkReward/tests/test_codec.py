@@ -0,0 +1,83 @@
+import pytest
+
+from snifz_blockchain_core import Block
+from snifz_codec import decode, encode
+
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0, 1, -1, 2 ** 70, -(2 ** 70), 1.5, -0.25, "", "snifz", "ünïcode",
+    b"", b"\x00\xff", (), (1, "two", 3.0), {"a": 1, "b": {"c": (None, True)}},
+])
+def test_round_trip(value):
+    assert decode(encode(value)) == value
+
+
+def test_lists_decode_as_tuples():
+    assert decode(encode([1, [2, 3]])) == (1, (2, 3))
+
+
+def test_dict_encoding_is_canonical():
+    assert encode({"b": 1, "a": 2}) == encode({"a": 2, "b": 1})
+
+
+def test_rejects_non_str_keys_and_unknown_types():
+    with pytest.raises(TypeError):
+        encode({1: "x"})
+    with pytest.raises(TypeError):
+        encode(object())
+
+
+def test_block_round_trip_keeps_hash():
+    block = Block(3, 1700000000.5, ({'sender': "BLOCK_REWARD", 'recipient': "0xabc", 'amount': 1000.0},),
+                  "f" * 64, {"packets_in": 12, "packets_out": 7}, nonce=42)
+    copy = Block.deserialize(block.serialize())
+    assert copy.compute_hash() == block.compute_hash()
+    assert copy.transactions == block.transactions
+    assert copy.traffic_data == block.traffic_data
+    assert Block.read_header(block.serialize()) == (3, "f" * 64, block.compute_hash())
+
+
+def make_block(**fields):
+    values = {"index": 5, "timestamp": 1.0, "transactions": [], "prev_hash": "ab" * 32, "traffic_data": {}}
+    values.update(fields)
+    return Block(**values)
+
+
+def test_blocks_use_slots_and_tuple_transactions():
+    block = make_block(transactions=[{'sender': "a", 'recipient': "b", 'amount': 1.0}])
+    assert not hasattr(block, "__dict__")
+    assert isinstance(block.transactions, tuple)
+    with pytest.raises(AttributeError):
+        block.extra = 1
+
+
+def test_hash_is_memoized_and_invalidated_by_assignment():
+    block = make_block()
+    first = block.seal()
+    header = block.header()
+    assert block.compute_hash() is first and block.header() is header
+    block.nonce = 99
+    assert block.compute_hash() != first
+    block.nonce = 0
+    assert block.compute_hash() == first
+
+
+def test_verify_body_detects_a_tampered_body():
+    block = Block.deserialize(make_block(traffic_data={"packets_in": 1}).serialize())
+    assert block.verify_body()
+    object.__setattr__(block, 'traffic_data', {"packets_in": 2})  # Bypasses the invalidation, like a forged body
+    assert not block.verify_body()
+
+
+def test_non_hex_prev_hash_round_trips():
+    block = make_block(prev_hash="1")
+    assert Block.deserialize(block.serialize()).prev_hash == "1"
+    assert Block.read_header(block.serialize())[2] == block.compute_hash()
+
+
+def test_header_only_blocks_keep_the_hash():
+    block = make_block(transactions=[{'sender': "BLOCK_REWARD", 'recipient': "b", 'amount': 1.0}])
+    pruned = Block.from_header(block.header())
+    assert pruned.pruned and not block.pruned
+    assert pruned.compute_hash() == block.compute_hash()
+    assert pruned.merkle_root == block.merkle_root
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+from snifz_benchmark import bench_import_time
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_library_and_daemon_imports_load_no_heavy_modules():
+    result = bench_import_time(repeats=1)
+    assert result["library_heavy_modules"] == "none"
+    assert result["daemon_heavy_modules"] == "none"
+
+
+def test_connector_defers_web3_and_key_libraries():
+    probe = ("import sys, snifz_web3_connect\n"
+             "connector = snifz_web3_connect.SnifZWeb3Connector()\n"
+             "connector.rpc\n"
+             "print(','.join(name for name in ('web3', 'eth_keys', 'eth_account', 'qrcode') if name in sys.modules))\n")
+    run = subprocess.run([sys.executable, "-c", probe], cwd=HERE, capture_output=True, text=True)
+    assert run.returncode == 0, run.stderr
+    assert run.stdout.strip() == ""
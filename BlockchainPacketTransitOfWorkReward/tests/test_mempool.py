@@ -0,0 +1,83 @@
+import pytest
+
+from snifz_blockchain_core import SnifZBlockchain
+from snifz_mempool import SnifZMempool
+
+
+class Balances:
+    def __init__(self, **balances):
+        self.balances = balances
+
+    def get_balance(self, address):
+        return self.balances.get(address, 0.0)
+
+
+def test_rewards_first_then_transfers_oldest_first():
+    mempool = SnifZMempool(Balances(alice=100.0, bob=100.0))
+    mempool.add("alice", "bob", 1.0)
+    mempool.add("bob", "alice", 2.0)
+    mempool.add("BLOCK_REWARD", "carol", 1000.0)
+    mempool.add("alice", "carol", 3.0)
+    assert [tx['amount'] for tx in mempool.take()] == [1000.0, 1.0, 2.0, 3.0]
+    assert len(mempool) == 0
+
+
+def test_overdraft_counts_pending_outflow():
+    mempool = SnifZMempool(Balances(alice=10.0))
+    mempool.add("alice", "bob", 6.0)
+    with pytest.raises(ValueError, match="Overdraft"):
+        mempool.add("alice", "bob", 5.0)
+    mempool.add("alice", "bob", 4.0)
+    assert mempool.pending_outflow("alice") == 10.0
+
+
+@pytest.mark.parametrize("sender, recipient, amount", [
+    ("alice", "bob", 0), ("alice", "bob", -1.0), ("", "bob", 1.0), ("alice", "bob", True),
+    ("alice", "bob", float("nan")), ("alice", "bob", float("inf")), ("alice", "bob", "1.0"),
+])
+def test_invalid_transfers(sender, recipient, amount):
+    with pytest.raises(ValueError):
+        SnifZMempool(Balances(alice=10.0)).add(sender, recipient, amount)
+
+
+def test_take_drops_transfers_the_balance_no_longer_covers():
+    balances = Balances(alice=10.0)
+    mempool = SnifZMempool(balances)
+    mempool.add("alice", "bob", 6.0)
+    mempool.add("alice", "bob", 4.0)
+    balances.balances["alice"] = 7.0  # A block from a peer spent some of it
+    assert [tx['amount'] for tx in mempool.take()] == [6.0]
+    assert mempool.dropped_stale == 1
+    assert mempool.pending_outflow("alice") == 0.0
+
+
+def test_max_per_block_and_expiry():
+    now = [0.0]
+    mempool = SnifZMempool(Balances(alice=100.0), max_per_block=2, max_age=10.0, clock=lambda: now[0])
+    for amount in (1.0, 2.0, 3.0):
+        mempool.add("alice", "bob", amount)
+    assert [tx['amount'] for tx in mempool.take()] == [1.0, 2.0]
+    now[0] = 11.0
+    assert mempool.take() == ()
+
+
+def test_restore_puts_a_failed_block_back_in_front():
+    mempool = SnifZMempool(Balances(alice=100.0))
+    for amount in (1.0, 2.0):
+        mempool.add("alice", "bob", amount)
+    mempool.add("BLOCK_REWARD", "carol", 1000.0)
+    taken = mempool.take()
+    mempool.add("alice", "bob", 3.0)
+    mempool.restore(taken)
+    assert mempool.pending_outflow("alice") == 6.0
+    assert [tx['amount'] for tx in mempool.pending_for("alice")] == [1.0, 2.0, 3.0]
+    assert [tx['amount'] for tx in mempool.take()] == [1000.0, 1.0, 2.0, 3.0]
+
+
+def test_failed_append_keeps_transactions_pending():
+    blockchain = SnifZBlockchain()
+    blockchain.mempool.add("BLOCK_REWARD", "carol", 1000.0)
+    with pytest.raises(ValueError):
+        blockchain.new_block(nonce=1, prev_hash="not-the-tip", traffic_data={})
+    assert len(blockchain.chain) == 1
+    assert [tx['recipient'] for tx in blockchain.current_transactions] == ["carol"]
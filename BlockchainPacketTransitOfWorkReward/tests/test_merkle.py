@@ -0,0 +1,51 @@
+import pytest
+
+from snifz_blockchain_core import SnifZBlockchain
+from snifz_merkle import EMPTY_ROOT, leaf_hash, merkle_proof, merkle_root, transactions_root, verify_proof
+
+
+def transactions(count):
+    return [{'sender': f"0x{i:040x}", 'recipient': f"0x{i + 1:040x}", 'amount': float(i + 1)} for i in range(count)]
+
+
+def test_empty_root():
+    assert transactions_root([]) == EMPTY_ROOT
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 13, 64, 100])
+def test_every_position_proves(count):
+    txs = transactions(count)
+    leaves = [leaf_hash(tx) for tx in txs]
+    root = merkle_root(leaves)
+    for position, tx in enumerate(txs):
+        assert verify_proof(tx, merkle_proof(leaves, position), root)
+
+
+def test_proof_rejects_another_transaction_or_root():
+    txs = transactions(7)
+    leaves = [leaf_hash(tx) for tx in txs]
+    path = merkle_proof(leaves, 3)
+    assert not verify_proof(txs[4], path, merkle_root(leaves))
+    assert not verify_proof(txs[3], path, transactions_root(txs[:6]))
+    assert not verify_proof(txs[3], path[:-1], merkle_root(leaves))
+
+
+def test_odd_tail_is_not_duplicated():
+    txs = transactions(3)
+    assert transactions_root(txs) != transactions_root(txs + txs[-1:])
+
+
+def test_position_out_of_range():
+    with pytest.raises(ValueError):
+        merkle_proof([leaf_hash(tx) for tx in transactions(2)], 2)
+
+
+def test_chain_transaction_proof():
+    blockchain = SnifZBlockchain()
+    blockchain.mempool.add("BLOCK_REWARD", "0xwinner", 1000.0)
+    block = blockchain.new_block(nonce=1, prev_hash=None, traffic_data={}, timestamp=1.0)
+    proof = blockchain.get_transaction_proof(block.index, 0)
+    assert SnifZBlockchain.verify_transaction_proof(proof, block.compute_hash())
+    assert not SnifZBlockchain.verify_transaction_proof(proof, blockchain.chain[0].compute_hash())
+    tampered = dict(proof, transaction={**proof["transaction"], 'amount': 1e9})
+    assert not SnifZBlockchain.verify_transaction_proof(tampered)
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from snifz_metrics import SnifZMetrics, SnifZSamplingProfiler, format_seconds
+
+
+class Worker:
+    def work(self, value):
+        return value * 2
+
+
+def test_histogram_shards_add_up_across_threads():
+    histogram = SnifZMetrics().histogram("work_seconds", "Work", buckets=(0.1, 1.0))
+
+    def observe():
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(histogram._shards) == 4
+    assert histogram.totals() == [12, pytest.approx(22.2), 4, 4, 4]
+    assert (histogram.quantile(0.3), histogram.quantile(0.5), histogram.quantile(0.9)) == (0.1, 1.0, float("inf"))
+    assert histogram.summary()["mean"] == pytest.approx(22.2 / 12)
+
+
+def test_registry_reuses_names_and_rejects_other_kinds():
+    metrics = SnifZMetrics()
+    counter = metrics.counter("events_total", "Events")
+    assert metrics.counter("events_total", "Events") is counter
+    with pytest.raises(ValueError):
+        metrics.histogram("events_total", "Events")
+
+
+def test_instrumented_methods_are_swapped_in_and_out():
+    metrics = SnifZMetrics()
+    original = Worker.__dict__["work"]
+    histogram = metrics.instrument(Worker, "work", "worker_seconds", "Work")
+    assert Worker.__dict__["work"] is original  # Disabled: nothing is wrapped
+    try:
+        metrics.enable()
+        assert Worker().work(2) == 4 and Worker().work(3) == 6
+        assert histogram.count == 2
+    finally:
+        metrics.disable()
+    assert Worker.__dict__["work"] is original
+    Worker().work(4)
+    assert histogram.count == 2
+    with pytest.raises(ValueError):
+        metrics.instrument(Worker, "missing", "missing_seconds", "Nothing")
+
+
+def test_timer_is_a_no_op_while_disabled():
+    metrics = SnifZMetrics()
+    with metrics.timer("block_seconds", "Block"):
+        pass
+    assert "block_seconds" not in metrics.metrics
+    metrics.enable()
+    with metrics.timer("block_seconds", "Block"):
+        pass
+    assert metrics.metrics["block_seconds"].count == 1
+
+
+def test_prometheus_text_format():
+    metrics = SnifZMetrics()
+    metrics.counter("events_total", "Events").inc(3)
+    metrics.gauge("broken", "A gauge over torn-down state", lambda: 1 / 0)
+    histogram = metrics.histogram("work_seconds", "Work", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    assert metrics.render_prometheus() == (
+        "# HELP broken A gauge over torn-down state\n# TYPE broken gauge\nbroken NaN\n"
+        "# HELP events_total Events\n# TYPE events_total counter\nevents_total 3\n"
+        "# HELP work_seconds Work\n# TYPE work_seconds histogram\n"
+        'work_seconds_bucket{le="0.1"} 1\nwork_seconds_bucket{le="1.0"} 2\nwork_seconds_bucket{le="+Inf"} 2\n'
+        "work_seconds_sum 0.55\nwork_seconds_count 2\n")
+
+
+def test_hot_paths_rank_by_total_time():
+    metrics = SnifZMetrics()
+    metrics.histogram("idle_seconds", "Never observed")
+    metrics.histogram("fast_seconds", "Fast").observe(0.001)
+    slow = metrics.histogram("slow_seconds", "Slow")
+    slow.observe(0.01)
+    slow.observe(0.02)
+    assert [row["name"] for row in metrics.hot_paths()] == ["slow_seconds", "fast_seconds"]
+    assert metrics.hot_paths(top=1)[0]["count"] == 2
+
+
+def test_format_seconds():
+    assert [format_seconds(s) for s in (0.00042, 0.0125, 3.0, float("inf"))] == ["420µs", "12.5ms", "3.00s", ">10s"]
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_finds_the_busy_function():
+    stop = threading.Event()
+    busy = threading.Thread(target=spin, args=(stop,), name="busy")
+    busy.start()
+    profiler = SnifZSamplingProfiler(interval=0.001)
+    profiler.start()
+    try:
+        deadline = time.monotonic() + 10
+        while profiler.samples < 50 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        profiler.stop()
+        stop.set()
+        busy.join()
+    assert not profiler.running
+    assert any(row["function"].endswith("test_metrics:spin") and row["self"] for row in profiler.top(50))
+    busy_stacks = [line for line in profiler.collapsed().splitlines() if line.startswith("busy;")]
+    assert busy_stacks and all(":spin" in line for line in busy_stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in busy_stacks)
+    profiler.reset()
+    assert profiler.samples == 0 and profiler.collapsed() == ""
@@ -0,0 +1,98 @@
+import http.client
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from snifz_benchmark import _extend_chain
+from snifz_node import (INVALID_PARAMS, INVALID_REQUEST, MAX_BLOCKS_PER_CALL, MAX_REQUEST_BYTES, METHOD_NOT_FOUND,
+                        PARSE_ERROR, SnifZNodeRPC, start_rpc_server)
+from snifz_node_service import SnifZNodeService
+from snifz_web3_connect import SnifZWeb3Connector
+
+ADDRESS = "0x" + "7" * 40
+
+
+@pytest.fixture
+def node(monkeypatch):
+    """A running service with a 150-block chain behind a JSON-RPC server; yields its URL."""
+    monkeypatch.setattr(SnifZWeb3Connector, "generate_unique_core_address", lambda self: ADDRESS)
+    service = SnifZNodeService(interface="lo", gossip=False)
+    _extend_chain(service.blockchain, 150)
+    service.start()
+    server, thread = start_rpc_server(SnifZNodeRPC(service), port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}", service
+    server.shutdown()
+    service.stop()
+
+
+def post(url, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        raw = response.read()
+        return response.status, json.loads(raw) if raw else None
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.status, response.headers["Content-Type"], response.read().decode()
+
+
+def call(url, method, *params):
+    status, reply = post(url, {"jsonrpc": "2.0", "id": 1, "method": method, "params": list(params)})
+    assert status == 200
+    return reply
+
+
+def test_chain_queries(node):
+    url, service = node
+    tip = call(url, "snifz_getTip")["result"]
+    assert tip["height"] == 150 and tip["hash"] == service.blockchain.last_block.compute_hash()
+    block = call(url, "snifz_getBlock", 42)["result"]
+    assert block["index"] == 42 and call(url, "snifz_getBlockByHash", "0x" + block["hash"])["result"] == block
+    assert len(call(url, "snifz_getBlocks", 1, 1000)["result"]) == MAX_BLOCKS_PER_CALL
+    winner = block["transactions"][0]["recipient"]
+    won = call(url, "snifz_getBlocksWonBy", winner)["result"]
+    assert 42 in won["heights"] and won["total"] == len(won["heights"])
+    assert call(url, "snifz_getBalance", winner)["result"]["balance"] == 1000.0 * won["total"]
+    assert call(url, "snifz_getStatus")["result"]["address"] == ADDRESS
+
+
+def test_batches_notifications_and_errors(node):
+    url, _ = node
+    status, replies = post(url, [
+        {"jsonrpc": "2.0", "id": 1, "method": "snifz_getTip"},
+        {"jsonrpc": "2.0", "method": "snifz_getTip"},  # Notification: no reply
+        {"jsonrpc": "2.0", "id": 2, "method": "snifz_nope"},
+        {"jsonrpc": "2.0", "id": 3, "method": "snifz_getBlock", "params": [999]},
+        {"jsonrpc": "2.0", "id": 4, "method": "snifz_getBlock", "params": {"index": 1, "extra": True}},
+        {"jsonrpc": "2.0", "id": 5, "method": "snifz_getBlock", "params": "1"},
+        "garbage",
+    ])
+    assert status == 200
+    assert [reply["id"] for reply in replies] == [1, 2, 3, 4, 5, None]
+    assert "result" in replies[0]
+    assert [reply["error"]["code"] for reply in replies[1:]] == [METHOD_NOT_FOUND, INVALID_PARAMS, INVALID_PARAMS,
+                                                                 INVALID_PARAMS, INVALID_REQUEST]
+    assert post(url, b"{not json")[1]["error"]["code"] == PARSE_ERROR
+    assert post(url, [])[1]["error"]["code"] == INVALID_REQUEST
+    assert post(url, {"jsonrpc": "2.0", "method": "snifz_getTip"}) == (204, None)
+
+
+def test_http_shortcuts_and_limits(node):
+    url, _ = node
+    status, content_type, body = get(url + "/tip")
+    assert status == 200 and json.loads(body)["height"] == 150
+    status, content_type, body = get(url + "/metrics")
+    assert content_type.startswith("text/plain") and "snifz_chain_height 150" in body
+    with pytest.raises(urllib.error.HTTPError) as missing:
+        get(url + "/nope")
+    assert missing.value.code == 404
+    connection = http.client.HTTPConnection(url.removeprefix("http://"), timeout=10)
+    connection.putrequest("POST", "/")
+    connection.putheader("Content-Length", str(MAX_REQUEST_BYTES + 1))
+    connection.endheaders()  # Refused on the header alone, before any body is sent
+    assert connection.getresponse().status == 413
+    connection.close()
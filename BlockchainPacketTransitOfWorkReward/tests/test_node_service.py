@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from snifz_node_service import SnifZNodeService
+from snifz_web3_connect import SnifZWeb3Connector
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(SnifZWeb3Connector, "generate_unique_core_address", lambda self: "0x" + "5" * 40)
+    service = SnifZNodeService(interface="lo", gossip=False, frame_rate=50)
+    service.logs = []
+    service.on_log = service.logs.append
+    yield service
+    service.stop()
+
+
+def test_queries_run_on_the_service_thread(service):
+    service.start()
+    assert service.query(threading.current_thread).result(5) is service._thread
+    assert service.query(len, service.blockchain.chain).result(5) == 1
+    with pytest.raises(ZeroDivisionError):
+        service.query(lambda: 1 / 0).result(5)
+
+
+def test_a_failing_command_does_not_stop_the_loop(service):
+    service.start()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    service.submit(broken)
+    assert service.query(lambda: "alive").result(5) == "alive"
+    assert any("broken failed: boom" in line for line in service.logs)
+
+
+def test_state_is_published_only_when_it_changes(service):
+    states = []
+    service.on_state = states.append
+    service.start()
+    wait_for(lambda: states)
+    time.sleep(0.3)  # ~15 frames at 50/s; the clock-driven fields change at most once a second
+    assert len(states) <= 3
+    assert all(a != b for a, b in zip(states, states[1:]))
+    published = len(states)
+    service.change_interface("eth7")
+    wait_for(lambda: len(states) > published and states[-1]["interface"] == "eth7")
+    assert states[0]["address"] == "0x" + "5" * 40 and states[0]["block_count"] == 1
+
+
+def test_headless_loop_wakes_only_for_deadlines_and_commands(service):
+    waits = []
+    seconds_until_next = service.scheduler.seconds_until_next
+    service.scheduler.seconds_until_next = lambda *limit: (waits.append(limit), seconds_until_next(*limit))[1]
+    service.start()
+    time.sleep(0.5)  # 25 frames at 50/s, but only the tick and the mint round are due
+    assert 1 <= len(waits) <= 4 and all(limit == () for limit in waits)
+    assert service.query(lambda: "alive").result(5) == "alive"
+    headless = len(waits)
+    service.on_state = lambda state: None
+    time.sleep(1.5)  # The next tick picks up the listener, then the loop runs at the frame rate
+    assert len(waits) - headless >= 20 and waits[-1] == (1.0 / 50,)
+
+
+def test_the_scheduler_drives_the_tick(service):
+    ticks = []
+    service._tick = lambda: ticks.append(threading.current_thread())
+    service.start()
+    wait_for(lambda: ticks)
+    assert ticks[0] is service._thread
+    assert service.scheduler.deadline("tick") is not None
+
+
+def test_state_reaches_the_qt_thread_through_the_bridge(service, monkeypatch):
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    pytest.importorskip("PyQt5")
+    from PyQt5.QtCore import QCoreApplication, QObject, pyqtSlot
+    from snifz_gui_manager import GUIStateBridge
+
+    class Window(QObject):  # Stands in for SnifZGUI, which lives on the Qt thread
+        def __init__(self):
+            super().__init__()
+            self.received = []
+
+        @pyqtSlot(dict)
+        def apply_state(self, state):
+            self.received.append((state, threading.current_thread()))
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    bridge, window = GUIStateBridge(), Window()
+    bridge.state_signal.connect(window.apply_state)
+    service.on_state = bridge.state_signal.emit
+    service.start()
+    deadline = time.monotonic() + 10
+    while not window.received and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert window.received and window.received[0][1] is threading.main_thread()  # Queued onto the Qt thread
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from snifz_pcap_replay import LINKTYPE_LINUX_SLL, LINKTYPE_RAW, PACE_EVERY, SnifZPcapReplay, write_pcap
+from snifz_traffic_classifier import PACKET_HOST, PACKET_OUTGOING
+
+OUR_MAC, PEER_MAC = bytes.fromhex("020000000001"), bytes.fromhex("020000000002")
+OUR_IP, PEER_IP = bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2])
+OTHER_MAC, OTHER_IP = bytes.fromhex("020000000003"), bytes([10, 0, 0, 3])
+
+
+def ipv4(protocol, src, dst, size=100):
+    return (bytes([0x45, 0, 0, 0, 0, 0, 0, 0, 64, protocol, 0, 0]) + src + dst).ljust(size, b"\x00")
+
+
+def ethernet(dst_mac, src_mac, packet):
+    return dst_mac + src_mac + b"\x08\x00" + packet
+
+
+def replay(path, **kwargs):
+    source = SnifZPcapReplay(path, **kwargs)
+    classifier = source.classifier()
+    reports = []
+    source.run(lambda: True, reports.append, classifier)
+    return source, classifier.snapshot(), reports
+
+
+def test_ethernet_replay_guesses_the_recording_host(tmp_path):
+    path = str(tmp_path / "eth.pcap")
+    inbound = ethernet(OUR_MAC, PEER_MAC, ipv4(6, PEER_IP, OUR_IP))
+    outbound = ethernet(OTHER_MAC, OUR_MAC, ipv4(17, OUR_IP, OTHER_IP))
+    assert write_pcap(path, [inbound] * 300 + [outbound] * 200) == 500
+    source, counts, reports = replay(path)
+    assert source.guess_local_addresses() == (OUR_MAC, {OUR_IP})
+    assert source.packets_replayed == sum(reports) == 500
+    assert reports == [PACE_EVERY, 500 - PACE_EVERY]
+    assert (counts["packets_in"], counts["packets_out"]) == (300, 200)
+    assert (counts["tcp_packets"], counts["udp_packets"]) == (300, 200)
+
+
+def test_sll_replay_takes_the_direction_from_the_cooked_header(tmp_path):
+    path = str(tmp_path / "any.pcap")
+    cooked = lambda pkttype: pkttype.to_bytes(2, "big") + bytes(12) + b"\x08\x00"
+    write_pcap(path, [cooked(PACKET_HOST) + ipv4(6, PEER_IP, PEER_IP),
+                      cooked(PACKET_OUTGOING) + ipv4(6, PEER_IP, PEER_IP)], linktype=LINKTYPE_LINUX_SLL)
+    _, counts, _ = replay(path)
+    assert (counts["packets_in"], counts["packets_out"], counts["bytes_in"]) == (1, 1, 100)
+
+
+def test_truncated_last_record_is_skipped(tmp_path):
+    path = str(tmp_path / "raw.pcap")
+    write_pcap(path, [ipv4(1, PEER_IP, OUR_IP)] * 3, linktype=LINKTYPE_RAW)
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 10)  # Capture killed mid-write
+    source, counts, _ = replay(path)
+    assert source.packets_replayed == 2 and counts["icmp_packets"] == 2
+
+
+def test_rejects_files_that_are_not_classic_pcap(tmp_path):
+    path = tmp_path / "capture.pcapng"
+    path.write_bytes(b"\x0a\x0d\x0d\x0a" + bytes(40))
+    with pytest.raises(ValueError):
+        SnifZPcapReplay(str(path))
+    path.write_bytes(b"\xd4\xc3")
+    with pytest.raises(ValueError):
+        SnifZPcapReplay(str(path))
+
+
+def test_low_rates_are_paced_frame_by_frame(tmp_path):
+    path = str(tmp_path / "slow.pcap")
+    write_pcap(path, [ipv4(6, PEER_IP, OUR_IP)] * 10, linktype=LINKTYPE_RAW)
+    released = []
+    started = time.perf_counter()
+    SnifZPcapReplay(path, rate=50).run(lambda: True, lambda count: released.append((count, time.perf_counter())))
+    assert [count for count, _ in released] == [1] * 10  # Not one burst of 10 frames
+    assert released[-1][1] - started >= 0.17  # Frame 10 is due 9 intervals after frame 1
+    gaps = [b - a for (_, a), (_, b) in zip(released, released[1:])]
+    assert min(gaps) > 0.01
+
+
+def test_loop_stops_when_asked(tmp_path):
+    path = str(tmp_path / "loop.pcap")
+    write_pcap(path, [ipv4(6, PEER_IP, OUR_IP)] * 5, linktype=LINKTYPE_RAW)
+    source = SnifZPcapReplay(path, loop=True)
+    reports = []
+    source.run(lambda: len(reports) < 4, reports.append)
+    assert reports == [5] * 4 and source.packets_replayed == 20
@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+import pytest
+
+from snifz_blockchain_core import Block, SnifZBlockchain
+from snifz_codec import decode
+from snifz_node_service import SnifZNodeService
+from snifz_peer_gossip import (MAX_REPORTS_PER_FRAME, MSG_HELLO, MSG_TIP, MSG_TRAFFIC, SnifZGossipNode, check_tip,
+                               check_traffic_batch, encode_frame)
+from snifz_web3_connect import SnifZWeb3Connector
+
+
+class ReportSink:
+    def __init__(self):
+        self.reports = {}
+
+    def register_traffic_from_node(self, address, traffic_data):
+        self.reports[address] = traffic_data
+
+
+def test_frames_carry_codec_payloads():
+    frame = encode_frame(MSG_TRAFFIC, (("0xa", {"packets_in": 1}),))
+    assert frame[4] == MSG_TRAFFIC
+    assert decode(frame[5:]) == (("0xa", {"packets_in": 1}),)
+
+
+@pytest.mark.parametrize("batch", [
+    5, "0xa", {"0xa": {}}, (("0xa",),), ((1, {"packets_in": 1}),), (("", {}),), (("0x" + "a" * 200, {}),),
+    (("0xa", ("packets_in", 1)),), (("0xa", {"packets_in": -1}),), (("0xa", {"packets_in": 1.5}),),
+    (("0xa", {"packets_in": True}),), (("0xa", {"reward": 1000}),),
+    tuple(("0xa", {}) for _ in range(MAX_REPORTS_PER_FRAME + 1)),
+])
+def test_malformed_traffic_batches(batch):
+    with pytest.raises(ValueError):
+        check_traffic_batch(batch)
+
+
+def test_well_formed_traffic_batch():
+    check_traffic_batch((("0xa", {"packets_in": 1, "packets_out": 0}), ("0xb", {})))
+
+
+def test_reports_cross_a_line_and_bad_peers_are_dropped():
+    async def scenario():
+        nodes = [SnifZGossipNode(name, ReportSink(), port=0, batch_interval=0.01) for name in ("a", "b", "c")]
+        for node in nodes:
+            await node.start()
+        await nodes[0].connect(nodes[1].host, nodes[1].port)
+        await nodes[1].connect(nodes[2].host, nodes[2].port)
+        while len(nodes[1].peers) < 2:
+            await asyncio.sleep(0.005)
+        nodes[0].report_traffic("a", {"packets_in": 7})
+        while "a" not in nodes[2].reward_system.reports:
+            await asyncio.sleep(0.005)
+
+        await nodes[0].peers["b"].send(MSG_TRAFFIC, (("0xforged", {"packets_in": -5}),))
+        while nodes[1].peers.get("a") is not None:
+            await asyncio.sleep(0.005)
+        relayed = nodes[2].reward_system.reports
+        for node in nodes:
+            await node.close()
+        return relayed
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 10)) == {"a": {"packets_in": 7}}
+
+
+def test_only_accepted_blocks_are_relayed():
+    async def scenario():
+        nodes = [SnifZGossipNode(name, port=0) for name in ("a", "b", "c")]
+        for node in nodes:
+            await node.start()
+        await nodes[0].connect(nodes[1].host, nodes[1].port)
+        await nodes[1].connect(nodes[2].host, nodes[2].port)
+        while len(nodes[1].peers) < 2:
+            await asyncio.sleep(0.005)
+        received = []
+
+        async def accept_even(block, peer):
+            return block.index % 2 == 0
+
+        async def record(block, peer):
+            received.append(block.index)
+            return True
+
+        nodes[1].on_block, nodes[2].on_block = accept_even, record
+        for index in (1, 2, 3, 4):
+            await nodes[0].announce_block(Block(index, float(index), (), "0" * 64, {}))
+        while nodes[1].stats["blocks_in"] < 4:
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.05)
+        for node in nodes:
+            await node.close()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 10)) == [2, 4]
+
+
+@pytest.mark.parametrize("height, tip", [
+    (-1, "ab" * 32), (True, "ab" * 32), (1.0, "ab" * 32), ("5", "ab" * 32), (None, ""),
+    (3, ""), (3, None), (3, "ab" * 31), (3, "AB" * 32), (3, "zz" * 32), (3, b"\xab" * 32),
+])
+def test_malformed_tips(height, tip):
+    with pytest.raises(ValueError):
+        check_tip(height, tip)
+
+
+def test_well_formed_tips():
+    assert check_tip(0, "") == (0, "")
+    assert check_tip(7, "0f" * 32) == (7, "0f" * 32)
+
+
+@pytest.mark.parametrize("msg_type, payload", [
+    (MSG_TIP, {"height": "10", "tip": "ab" * 32}),
+    (MSG_TIP, {"height": 10, "tip": 12345}),
+    (MSG_HELLO, {"node": "a", "height": -3, "tip": "ab" * 32}),
+])
+def test_peers_advertising_bad_tips_are_dropped(msg_type, payload):
+    async def scenario():
+        nodes = [SnifZGossipNode(name, port=0) for name in ("a", "b")]
+        for node in nodes:
+            await node.start()
+        await nodes[0].connect(nodes[1].host, nodes[1].port)
+        while "a" not in nodes[1].peers:
+            await asyncio.sleep(0.005)
+        await nodes[0].peers["b"].send(msg_type, payload)
+        while "a" in nodes[1].peers:
+            await asyncio.sleep(0.005)
+        for node in nodes:
+            await node.close()
+
+    asyncio.run(asyncio.wait_for(scenario(), 10))
+
+
+def wait_for(condition, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def services(monkeypatch):
+    """Starts node services sharing one genesis block, each with its own gossip node."""
+    addresses = (f"0x{i:040x}" for i in range(1, 1000))
+    monkeypatch.setattr(SnifZWeb3Connector, "generate_unique_core_address", lambda self: next(addresses))
+    genesis = SnifZBlockchain().chain[0]
+    started = []
+
+    def start(count):
+        for _ in range(count):
+            blockchain = SnifZBlockchain()
+            blockchain.truncate(0)
+            blockchain.append_block(Block.deserialize(genesis.serialize()))
+            service = SnifZNodeService(interface="lo", blockchain=blockchain, gossip_port=0)
+            service.start()
+            started.append(service)
+        return started[-count:]
+
+    yield start
+    for service in started:
+        service.stop()
+        service.gossip.call_threadsafe(service.gossip.close()).result(5)
+
+
+def mint(service, rounds=1):
+    def run():
+        for _ in range(rounds):
+            assert service.reward_system.mint_block({"packets_in": 10, "packets_out": 5})
+            service._after_mint()
+    service.query(run).result(5)
+
+
+def test_minted_blocks_cross_a_line_of_services(services):
+    a, b, c = services(3)
+    b.connect_peer(a.gossip.host, a.gossip.port)
+    c.connect_peer(b.gossip.host, b.gossip.port)
+    wait_for(lambda: len(b.gossip.peers) == 2 and len(c.gossip.peers) == 1)
+    logs = []
+    c.on_log = logs.append
+    mint(a)
+    wait_for(lambda: len(c.blockchain.chain) == 2)
+    assert c.blockchain.block_hash(2) == a.blockchain.block_hash(2)
+    mint(a)
+    wait_for(lambda: len(c.blockchain.chain) == 3)
+    assert c.blockchain.block_hash(3) == a.blockchain.block_hash(3)
+    relayed = [line for line in logs if " received from " in line]  # Appended as announced, not synced
+    assert [line.split()[1] for line in relayed] == ["2", "3"]
+
+
+def test_synced_blocks_are_announced_onwards(services):
+    a, b, c = services(3)
+    mint(a, rounds=3)  # Before anyone listens: only a sync can fetch these
+    c.connect_peer(b.gossip.host, b.gossip.port)
+    wait_for(lambda: len(b.gossip.peers) == 1)
+    b.connect_peer(a.gossip.host, a.gossip.port)
+    wait_for(lambda: len(c.blockchain.chain) == 4)  # b synced, announced its tip, and c synced from b
+    assert c.blockchain.block_hash(4) == a.blockchain.block_hash(4)
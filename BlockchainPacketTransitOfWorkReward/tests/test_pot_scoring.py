@@ -0,0 +1,123 @@
+import pytest
+
+import snifz_pot_scoring
+from sniff_reward_logic import SnifZRewardSystem
+from snifz_blockchain_core import Block, SnifZBlockchain
+from snifz_chain_validator import check_block_rules
+from snifz_pot_scoring import (POT_CANDIDATES_KEY, SnifZPoTScorer, SnifZTrafficTable, deterministic_winner,
+                               verify_pot_block)
+
+PEERS = {"0xaaa": {"packets_in": 900, "packets_out": 100},
+         "0xbbb": {"packets_in": 950, "packets_out": 60},
+         "0xccc": {"packets_in": 10, "packets_out": 5}}
+
+
+def busy_scorer(top_k, seed=7, nodes=50):
+    scorer = SnifZPoTScorer(seed=seed, top_k=top_k)
+    for i in range(nodes):
+        scorer.register(f"0x{i:03}", {"packets_in": (i * 37) % 101, "bytes_out": i * 900}, mint_round=1)
+    return scorer
+
+
+def mint_deterministic(rounds=3):
+    blockchain = SnifZBlockchain()
+    now = [1700000000.0]
+    rewards = SnifZRewardSystem(blockchain, "0xme", deterministic=True, clock=lambda: now[0], mint_interval=60)
+    for _ in range(rounds):
+        now[0] += 60
+        for address, traffic in PEERS.items():
+            rewards.register_traffic_from_node(address, traffic)
+        assert rewards.mint_block({"packets_in": 500, "packets_out": 500})
+    return blockchain
+
+
+def test_winner_ignores_candidate_order():
+    candidates = {address: (t["packets_in"] + t["packets_out"], 0) for address, t in PEERS.items()}
+    reordered = dict(reversed(list(candidates.items())))
+    assert deterministic_winner("ab" * 32, candidates) == deterministic_winner("ab" * 32, reordered)
+
+
+def test_ties_go_to_the_smallest_address():
+    prev_hash = "00" * 32
+    candidates = {"0xb": (0, 0), "0xa": (0, 0)}
+    assert deterministic_winner(prev_hash, candidates) == "0xa"
+
+
+def test_minted_blocks_verify():
+    blockchain = mint_deterministic()
+    for block in blockchain.chain[1:]:
+        assert POT_CANDIDATES_KEY in block.traffic_data
+        assert verify_pot_block(block) is None
+
+
+def test_a_redirected_reward_is_caught():
+    block = mint_deterministic(rounds=1).chain[-1]
+    winner = block.transactions[0]['recipient']
+    thief = next(address for address in PEERS if address != winner)
+    forged = Block(block.index, block.timestamp,
+                   ({'sender': "BLOCK_REWARD", 'recipient': thief, 'amount': block.transactions[0]['amount']},),
+                   block.prev_hash, block.traffic_data, block.nonce)
+    assert verify_pot_block(forged) is not None
+
+
+def test_blocks_without_candidates_are_not_checked():
+    assert verify_pot_block(SnifZBlockchain().chain[0]) is None
+
+
+def test_table_swap_removes_stale_rows():
+    table = SnifZTrafficTable()
+    for round_, address in enumerate(("0xa", "0xb", "0xc", "0xd")):
+        table.update(address, {"packets_in": round_}, mint_round=round_)
+    table.update("0xa", {"packets_in": 9}, mint_round=3)
+    assert table.expire(3) == 2
+    assert sorted(table.addresses) == ["0xa", "0xd"]
+    assert all(table.addresses[row] == address for address, row in table.rows.items())
+    assert table.packets[table.rows["0xa"]] == 9
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_top_k_is_the_head_of_the_full_ranking(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(snifz_pot_scoring, "np", None)
+    elif snifz_pot_scoring.np is None:
+        pytest.skip("NumPy not installed")
+    full = busy_scorer(top_k=50).rank(difficulty=2, mint_round=1)
+    top = busy_scorer(top_k=5).rank(difficulty=2, mint_round=1)
+    assert [row[0] for row in top] == [row[0] for row in full[:5]]
+    scores = [row[1] for row in full]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_deterministic_ranking_agrees_with_the_winner():
+    scorer = busy_scorer(top_k=3)
+    candidates = scorer.candidates()
+    ranked = scorer.rank(difficulty=2, mint_round=1, prev_hash="cd" * 32)
+    assert ranked[0][0] == deterministic_winner("cd" * 32, candidates)
+
+
+def test_reports_expire_after_max_report_age():
+    scorer = SnifZPoTScorer(seed=1, max_report_age=2)
+    scorer.register("0xold", {"packets_in": 1000}, mint_round=1)
+    scorer.register("0xnew", {"packets_in": 1}, mint_round=3)
+    assert [row[0] for row in scorer.rank(difficulty=1, mint_round=3)] == ["0xnew"]
+    assert scorer.rank(difficulty=1, mint_round=5) == []
+
+
+@pytest.mark.parametrize("candidates", [
+    (), {}, ("0xaaa", (1, 2)), {"0xaaa": 5}, {"0xaaa": (1,)}, {"0xaaa": ("1", 2)}, {"0xaaa": (1.5, 2)},
+    {"0xaaa": (-1, 2)}, {"0xaaa": (True, 2)}, {7: (1, 2)},
+])
+def test_malformed_candidate_maps_are_errors(candidates):
+    reward = {'sender': "BLOCK_REWARD", 'recipient': "0xaaa", 'amount': 1000.0}
+    block = Block(2, 1.0, (reward,), "ab" * 32, {POT_CANDIDATES_KEY: candidates})
+    assert "Block 2" in verify_pot_block(block)
+
+
+def test_deterministic_nodes_require_candidates():
+    block = mint_deterministic(rounds=1).chain[-1]
+    assert verify_pot_block(block, required=True) is None
+    stripped = Block(block.index, block.timestamp, block.transactions, block.prev_hash, {"packets_in": 1})
+    assert verify_pot_block(stripped) is None
+    assert "no PoT candidates" in verify_pot_block(stripped, required=True)
+    assert "no PoT candidates" in check_block_rules(stripped, block.index - 1, deterministic=True)[0]
+    assert check_block_rules(SnifZBlockchain().chain[0], 0, deterministic=True) == []  # Genesis has no round
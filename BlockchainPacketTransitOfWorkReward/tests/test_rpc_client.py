@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from snifz_rpc_client import SnifZRPCClient, SnifZRPCError
+from snifz_stub_evm import STUB_TOKEN_ADDRESS, SnifZStubEVM
+from snifz_web3_connect import SnifZWeb3Connector
+
+TREASURY = "0x" + "1" * 40
+HOLDERS = [f"0x{i:040x}" for i in range(2, 52)]
+
+
+def run(scenario, **stub_options):
+    async def main():
+        evm = SnifZStubEVM(**stub_options)
+        await evm.start()
+        client = SnifZRPCClient(evm.url)
+        try:
+            return await scenario(evm, client)
+        finally:
+            await client.close()
+            await evm.close()
+
+    return asyncio.run(asyncio.wait_for(main(), 20))
+
+
+def test_concurrent_calls_share_batches_and_connections():
+    async def scenario(evm, client):
+        for i, address in enumerate(HOLDERS):
+            evm.fund(address, native=i)
+        balances = await asyncio.gather(*(client.call("eth_getBalance", [address, "latest"]) for address in HOLDERS))
+        return balances, dict(client.stats), dict(evm.stats)
+
+    balances, stats, server = run(scenario)
+    assert [int(balance, 16) for balance in balances] == list(range(len(HOLDERS)))
+    assert stats["http_requests"] == 1 and stats["batched_calls"] == len(HOLDERS)
+    assert server["connections"] == 1 and server["rpc_calls"] == len(HOLDERS)
+
+
+def test_reads_are_coalesced_and_cached():
+    async def scenario(evm, client):
+        first = await asyncio.gather(*(client.call("eth_chainId") for _ in range(10)))
+        again = await client.call("eth_chainId")
+        return first, again, dict(client.stats), evm.stats["rpc_calls"]
+
+    first, again, stats, served = run(scenario)
+    assert set(first) == {again} == {hex(1337)}
+    assert (stats["coalesced"], stats["cache_hits"], served) == (9, 1, 1)
+
+
+def test_errors_are_per_call():
+    async def scenario(evm, client):
+        return await client.batch([("eth_blockNumber", []), ("eth_nope", []), ("eth_sendTransaction", [{}])],
+                                  return_exceptions=True)
+
+    block_number, missing, invalid = run(scenario)
+    assert block_number == "0x0"
+    assert isinstance(missing, SnifZRPCError) and missing.code == -32601
+    assert isinstance(invalid, SnifZRPCError) and invalid.code == -32000
+
+
+def test_a_dropped_pooled_connection_is_retried_once():
+    async def scenario(evm, client):
+        await client.call("eth_blockNumber")
+        evm.fail_next(1)
+        number = await client.call("eth_blockNumber", use_cache=False)
+        evm.fail_next(2)
+        with pytest.raises(ConnectionError):
+            await client.call("eth_gasPrice")
+        return number, client.stats["retries"]
+
+    assert run(scenario) == ("0x0", 2)
+
+
+def test_connector_token_transfers_against_the_stub():
+    async def scenario(evm, client):
+        connector = SnifZWeb3Connector(evm.url)
+        connector.token_contract = STUB_TOKEN_ADDRESS
+        evm.fund(TREASURY, token=1000)
+        nonce = await connector.get_nonce(TREASURY)
+        results = await connector.send_transfers(TREASURY, [(HOLDERS[0], 300, nonce), (HOLDERS[1], 900, nonce + 1)])
+        receipts = await connector.get_receipts([results[0]])
+        balances = await connector.get_token_balances([TREASURY, HOLDERS[0], HOLDERS[1]])
+        await connector.rpc.close()
+        return results, receipts, balances
+
+    results, receipts, balances = run(scenario)
+    assert isinstance(results[1], SnifZRPCError)  # 900 more than the 700 left
+    assert receipts[0]["status"] == "0x1"
+    assert balances == {TREASURY: 700, HOLDERS[0]: 300, HOLDERS[1]: 0}
+
+
+def test_rejects_unsupported_urls():
+    with pytest.raises(ValueError):
+        SnifZRPCClient("ws://127.0.0.1:8546")
@@ -0,0 +1,131 @@
+import pytest
+
+from snifz_scheduler import WHEEL_RESOLUTION, WHEEL_SLOTS, SnifZScheduler
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler():
+    clock, log = Clock(), []
+    return SnifZScheduler(clock=clock, log=log.append), clock, log
+
+
+def test_one_shot_runs_once_at_its_deadline():
+    scheduler, clock, _ = make_scheduler()
+    ran = []
+    scheduler.at("job", 1005.5, lambda: ran.append(clock.now))
+    assert scheduler.next_deadline() == 1005.5
+    assert scheduler.run_pending(1005.4) == 0
+    clock.now = 1005.5
+    assert scheduler.run_pending() == 1
+    assert scheduler.run_pending(2000.0) == 0
+    assert ran == [1005.5] and "job" not in scheduler
+
+
+def test_jobs_run_in_deadline_order():
+    scheduler, clock, _ = make_scheduler()
+    ran = []
+    for name, deadline in (("c", 1003.0), ("a", 1001.0), ("b", 1002.5)):
+        scheduler.at(name, deadline, lambda name=name: ran.append(name))
+    clock.now = 1010.0
+    assert scheduler.run_pending() == 3
+    assert ran == ["a", "b", "c"]
+
+
+def test_periodic_jobs_keep_an_absolute_schedule():
+    scheduler, clock, _ = make_scheduler()
+    scheduler.every("tick", 10.0, lambda: None, first=1010.0)
+    clock.now = 1013.0
+    scheduler.run_pending()
+    assert scheduler.deadline("tick") == 1020.0
+    clock.now = 1055.0  # Rounds 1020-1050 were missed entirely: run once, then back on the grid
+    assert scheduler.run_pending() == 1
+    assert scheduler.deadline("tick") == 1060.0
+    assert scheduler.jobs()[0]["runs"] == 2
+
+
+def test_deadlines_beyond_one_turn_of_the_wheel():
+    scheduler, clock, _ = make_scheduler()
+    far = clock.now + WHEEL_SLOTS * WHEEL_RESOLUTION * 2.5
+    ran = []
+    scheduler.at("far", far, lambda: ran.append(True))
+    assert scheduler.next_deadline() == far
+    for _ in range(4):  # The job's slot comes round twice before its deadline
+        clock.now += WHEEL_SLOTS * WHEEL_RESOLUTION / 2
+        scheduler.run_pending()
+    assert ran == [] and scheduler.deadline("far") == far
+    clock.now = far
+    assert scheduler.run_pending() == 1
+
+
+def test_cancel_and_replace():
+    scheduler, clock, _ = make_scheduler()
+    ran = []
+    scheduler.at("job", 1001.0, lambda: ran.append("old"))
+    scheduler.at("job", 1002.0, lambda: ran.append("new"))
+    scheduler.at("gone", 1001.5, lambda: ran.append("gone"))
+    assert scheduler.cancel("gone") and not scheduler.cancel("gone")
+    assert len(scheduler) == 1 and scheduler.next_deadline() == 1002.0
+    scheduler.run_pending(1010.0)
+    assert ran == ["new"]
+
+
+def test_invalid_interval():
+    scheduler, _, _ = make_scheduler()
+    with pytest.raises(ValueError):
+        scheduler.every("job", 0, lambda: None)
+
+
+def test_a_failing_job_is_logged_and_does_not_stop_the_others():
+    scheduler, clock, log = make_scheduler()
+    ran = []
+
+    def broken():
+        raise RuntimeError("disk full")
+
+    scheduler.at("broken", 1001.0, broken)
+    scheduler.every("tick", 1.0, lambda: ran.append(clock.now), first=1001.0)
+    clock.now = 1001.0
+    assert scheduler.run_pending() == 2
+    assert ran == [1001.0]
+    assert log == ["Scheduled job broken failed: RuntimeError('disk full')"]
+    assert scheduler.deadline("tick") == 1002.0
+
+
+def test_a_failing_one_shot_job_that_re_arms_in_finally_keeps_running():
+    scheduler, clock, log = make_scheduler()
+    attempts = []
+
+    def mint_round():  # The node service's pattern: re-arm whatever happens
+        retry = clock.now + 5.0
+        try:
+            attempts.append(clock.now)
+            if len(attempts) < 3:
+                raise ValueError("store unavailable")
+            retry = clock.now + 60.0
+        finally:
+            scheduler.at("mint", retry, mint_round)
+
+    scheduler.at("mint", 1001.0, mint_round)
+    for now in (1001.0, 1006.0, 1011.0):
+        clock.now = now
+        scheduler.run_pending()
+    assert attempts == [1001.0, 1006.0, 1011.0]
+    assert len(log) == 2
+    assert scheduler.deadline("mint") == 1071.0
+    assert scheduler.jobs()[0]["runs"] == 3
+
+
+def test_wake_is_called_for_an_earlier_deadline_only():
+    woken = []
+    scheduler = SnifZScheduler(clock=Clock(), wake=lambda: woken.append(True), log=lambda message: None)
+    scheduler.at("a", 1010.0, lambda: None)
+    scheduler.at("b", 1020.0, lambda: None)
+    scheduler.at("c", 1005.0, lambda: None)
+    assert len(woken) == 2
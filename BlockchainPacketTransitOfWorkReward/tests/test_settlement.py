@@ -0,0 +1,129 @@
+import asyncio
+
+from snifz_blockchain_core import SnifZBlockchain
+from snifz_rpc_client import SnifZRPCError
+from snifz_settlement import SnifZRewardSettlement, SnifZSettlementJournal
+
+TREASURY = "0x" + "aa" * 20
+UNIT = 10 ** 18
+
+
+class FakeConnector:
+    """Treasury nonce, transfers and receipts of an EVM node, in memory."""
+    def __init__(self, reject=()):
+        self.nonce = 0
+        self.paid = {}
+        self.reject = set(reject)  # Recipients whose transfers the node refuses
+        self.down = False
+        self.receipts = {}
+
+    async def get_nonce(self, address):
+        return self.nonce
+
+    async def send_transfers(self, sender, transfers):
+        results = []
+        for recipient, units, nonce in transfers:
+            if self.down:
+                results.append(ConnectionError("node unreachable"))
+            elif recipient in self.reject:
+                results.append(SnifZRPCError(-32000, "execution reverted: blocked recipient"))
+            elif nonce < self.nonce:
+                results.append(SnifZRPCError(-32000, "nonce too low"))
+            elif nonce > self.nonce:
+                results.append(SnifZRPCError(-32000, "nonce too high"))
+            else:
+                self.nonce += 1
+                self.paid[recipient] = self.paid.get(recipient, 0) + units
+                tx_hash = f"0x{nonce:064x}"
+                self.receipts[tx_hash] = {"status": "0x1"}
+                results.append(tx_hash)
+        return results
+
+    async def get_receipts(self, tx_hashes):
+        return [self.receipts.get(tx_hash) for tx_hash in tx_hashes]
+
+
+def reward_chain(winners):
+    blockchain = SnifZBlockchain()
+    for i, winner in enumerate(winners):
+        blockchain.mempool.add("BLOCK_REWARD", winner, 1000.0)
+        blockchain.new_block(nonce=i, prev_hash=None, traffic_data={}, timestamp=1700000000.0 + i)
+    return blockchain
+
+
+def settlement(blockchain, connector, journal_path, **options):
+    options = {"confirmations": 0, "retry_delay": 0.0, "max_retries": 1, **options}
+    return SnifZRewardSettlement(blockchain, connector, TREASURY, str(journal_path), **options)
+
+
+def test_settles_one_transfer_per_recipient(tmp_path):
+    connector = FakeConnector()
+    settler = settlement(reward_chain(["0xa", "0xb", "0xa"]), connector, tmp_path / "journal")
+    assert settler.collect() == 3
+    report = asyncio.run(settler.settle(force=True))
+    assert report == {"batches": 1, "transfers": 2, "open": 0}
+    assert connector.paid == {"0xa": 2000 * UNIT, "0xb": 1000 * UNIT}
+    assert settler.collect() == 0
+
+
+def test_restart_resends_an_open_batch_without_paying_twice(tmp_path):
+    blockchain = reward_chain(["0xa", "0xb"])
+    connector = FakeConnector()
+    connector.down = True
+    first = settlement(blockchain, connector, tmp_path / "journal")
+    first.collect()
+    assert asyncio.run(first.settle(force=True))["open"] == 1
+    first.close()
+
+    connector.down = False
+    second = settlement(blockchain, connector, tmp_path / "journal")
+    assert second.open_batches == 1
+    assert second.collect() == 0  # The journaled blocks are never collected again
+    assert asyncio.run(second.settle())["batches"] == 1
+    assert asyncio.run(second.settle())["batches"] == 0
+    assert connector.paid == {"0xa": 1000 * UNIT, "0xb": 1000 * UNIT}
+    second.close()
+    assert settlement(blockchain, connector, tmp_path / "journal").open_batches == 0
+
+
+def test_rejected_batch_fails_and_requeues_the_rest(tmp_path):
+    blockchain = reward_chain(["0xa", "0xb", "0xc"])
+    connector = FakeConnector(reject={"0xa"})
+    settler = settlement(blockchain, connector, tmp_path / "journal", max_resends=1)
+    settler.collect()
+    assert asyncio.run(settler.settle(force=True))["open"] == 1
+    report = asyncio.run(settler.settle(force=True))  # Out of resends: failed, then the rest settles
+    assert settler.stats["failed"] == 1
+    assert report["batches"] == 1
+    assert connector.paid == {"0xb": 1000 * UNIT, "0xc": 1000 * UNIT}
+    records = SnifZSettlementJournal(str(tmp_path / "journal")).records
+    assert [record["type"] for record in records] == ["prepared", "failed", "prepared", "settled"]
+    assert [transfer[0] for transfer in records[1]["rejected"]] == ["0xa"]
+
+
+def test_replay_restores_totals_requeued_by_a_failed_batch(tmp_path):
+    blockchain = reward_chain(["0xa", "0xb"])
+    connector = FakeConnector(reject={"0xa"})
+    settler = settlement(blockchain, connector, tmp_path / "journal", max_resends=0)
+    settler.collect()
+    asyncio.run(settler.settle(force=True))
+    assert settler.open_batches == 0
+    assert settler._totals == {"0xb": 1000 * UNIT}  # Waits for the next settlement window
+    settler.close()
+
+    replayed = settlement(blockchain, connector, tmp_path / "journal")
+    assert replayed._totals == {"0xb": 1000 * UNIT}
+    asyncio.run(replayed.settle(force=True))
+    assert connector.paid == {"0xb": 1000 * UNIT}
+    replayed.close()
+    assert settlement(blockchain, connector, tmp_path / "journal")._totals == {}
+
+
+def test_journal_drops_a_torn_tail(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = SnifZSettlementJournal(path)
+    journal.append({"type": "settled", "batch": "b1", "tx_hashes": ()})
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b"\x10\x00\x00\x00\x00")
+    assert SnifZSettlementJournal(path).records == [{"type": "settled", "batch": "b1", "tx_hashes": ()}]
@@ -0,0 +1,79 @@
+import pytest
+
+from snifz_benchmark import _extend_chain
+from snifz_blockchain_core import SnifZBlockchain
+from snifz_chain_validator import SnifZChainValidator
+from snifz_node import main
+from snifz_snapshot import read_snapshot, write_snapshot
+
+
+def test_snapshot_round_trip_and_corruption(tmp_path):
+    path = str(tmp_path / "state.snap")
+    payload = {"last_hash": "ab" * 32, "validated": (3, "cd" * 32), "state": {"height": 3}}
+    write_snapshot(path, payload)
+    assert read_snapshot(path) == payload
+    with open(path, "r+b") as f:
+        f.seek(-1, 2)
+        f.write(b"\x00")
+    assert read_snapshot(path) is None
+    assert read_snapshot(str(tmp_path / "missing.snap")) is None
+
+
+def test_restart_replays_only_blocks_after_the_snapshot(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    blockchain = SnifZBlockchain(store_path=path, snapshot_every=50)
+    _extend_chain(blockchain, 120)
+    SnifZChainValidator(blockchain, workers=1).validate_chain()
+    blockchain.write_snapshot()
+    _extend_chain(blockchain, 130)
+    balances = dict(blockchain.account_state.export()["balances"])
+    blockchain.close()
+
+    reopened = SnifZBlockchain(store_path=path, snapshot_every=50)
+    assert reopened.snapshot_height == 120
+    assert dict(reopened.account_state.export()["balances"]) == balances
+    assert reopened.account_state.verify(reopened.chain)
+    assert reopened.validated_checkpoint[0] == 120
+    assert SnifZChainValidator(reopened, workers=1).validate_chain()["checked"] == 10
+    reopened.close()
+
+
+def test_snapshot_of_another_chain_is_ignored(tmp_path):
+    path = str(tmp_path / "chain.seg")
+    blockchain = SnifZBlockchain(store_path=path)
+    _extend_chain(blockchain, 20)
+    blockchain.write_snapshot()
+    blockchain.truncate(10)
+    _extend_chain(blockchain, 20, seed=5)  # Same height, different blocks
+    blockchain.close()
+    reopened = SnifZBlockchain(store_path=path)
+    assert reopened.snapshot_height == 0
+    assert reopened.account_state.verify(reopened.chain)
+    reopened.close()
+
+
+def test_in_memory_prune_keeps_headers_and_state(tmp_path):
+    blockchain = SnifZBlockchain(snapshot_path=str(tmp_path / "state.snap"), snapshot_every=25, prune=True)
+    _extend_chain(blockchain, 60)
+    assert blockchain.pruned_height == 49  # The tip of the last snapshot (block 50) keeps its body
+    assert all(block.pruned for block in blockchain.chain[:49])
+    assert not any(block.pruned for block in blockchain.chain[49:])
+    unpruned = SnifZBlockchain()
+    _extend_chain(unpruned, 60)
+    assert blockchain.account_state.export()["balances"] == unpruned.account_state.export()["balances"]
+    report = SnifZChainValidator(blockchain, workers=1).validate_chain(incremental=False)
+    assert report["valid"] and report["checked"] == 11
+    with pytest.raises(ValueError):
+        blockchain.truncate(10)
+
+
+def test_prune_needs_a_snapshot_path():
+    with pytest.raises(ValueError):
+        SnifZBlockchain(prune=True)
+
+
+@pytest.mark.parametrize("argv", [["--prune", "--store", "chain.seg", "--snapshot", "s.snap"], ["--prune"]])
+def test_daemon_rejects_prune_it_cannot_honour(argv, capsys):
+    with pytest.raises(SystemExit):
+        main(argv)
+    assert "--prune" in capsys.readouterr().err
@@ -0,0 +1,69 @@
+import pytest
+
+from snifz_timeseries import SnifZTimeSeriesStore
+
+T0 = 1700000000.0  # A multiple of both bucket steps below, so buckets line up with it
+
+
+def make_store(**options):
+    options = {"resolutions": ((1, 10), (5, 6)), **options}
+    return SnifZTimeSeriesStore(clock=lambda: T0, **options)
+
+
+def test_counts_land_in_every_resolution():
+    store = make_store()
+    store.record("node", {"packets_in": 3}, now=T0)
+    store.record("node", {"packets_in": 4, "bytes_in": 100}, now=T0 + 1)
+    start, step, counts = store.series("node", "packets_in", 5, now=T0 + 1)
+    assert (start, step, list(counts)) == (T0 - 3, 1, [0, 0, 0, 3, 4])
+    _, step, counts = store.series("node", "packets_in", 30, step=5, now=T0 + 1)
+    assert step == 5 and list(counts)[-1] == 7
+    assert store.rates("node", 5, now=T0 + 1)["bytes_in"] == 20.0
+
+
+def test_ring_wraps_and_clears_skipped_buckets():
+    store = make_store()
+    store.record("node", {"packets_in": 5}, now=T0)
+    store.record("node", {"packets_in": 1}, now=T0 + 12)  # Past the 10-slot ring: the old sample is gone
+    assert list(store.series("node", "packets_in", 10, now=T0 + 12)[2]) == [0] * 9 + [1]
+    assert list(store.series("node", "packets_in", 30, step=5, now=T0 + 12)[2])[-3:] == [5, 0, 1]
+
+
+def test_record_totals_takes_the_growth_and_handles_resets():
+    store = make_store()
+    store.record_totals("peer", {"packets_out": 100}, now=T0)  # Baseline only
+    store.record_totals("peer", {"packets_out": 130}, now=T0 + 1)
+    store.record_totals("peer", {"packets_out": 20}, now=T0 + 2)  # Counter reset: counts from zero
+    assert list(store.series("peer", "packets_out", 3, now=T0 + 2)[2]) == [0, 30, 20]
+
+
+def test_least_recently_updated_series_is_evicted():
+    store = make_store(max_series=2)
+    store.record("a", {"packets_in": 1}, now=T0)
+    store.record("b", {"packets_in": 1}, now=T0 + 1)
+    store.record("a", {"packets_in": 1}, now=T0 + 2)
+    store.record("c", {"packets_in": 9}, now=T0 + 3)
+    assert sorted(store.keys()) == ["a", "c"]
+    assert list(store.series("c", "packets_in", 4, now=T0 + 3)[2]) == [0, 0, 0, 9]
+
+
+def test_growing_keeps_history():
+    store = make_store()
+    for i in range(40):  # Past the initial row allocation
+        store.record(f"node-{i}", {"packets_in": i + 1}, now=T0)
+    assert len(store) == 40
+    assert list(store.series("node-0", "packets_in", 1, now=T0)[2]) == [1]
+    assert list(store.series("node-39", "packets_in", 1, now=T0)[2]) == [40]
+
+
+def test_top_ranks_by_rate_and_skips_idle_keys():
+    store = make_store()
+    for key, packets in (("a", 10), ("b", 50), ("c", 0), ("d", 30)):
+        store.record(key, {"packets_in": packets, "packets_out": packets}, now=T0)
+    assert store.top(2, 10, now=T0) == [("b", 10.0), ("d", 6.0)]
+    assert [key for key, _ in store.top(10, 10, now=T0)] == ["b", "d", "a"]
+
+
+def test_unknown_resolution():
+    with pytest.raises(ValueError):
+        make_store().series("node", "packets_in", 10, step=7)
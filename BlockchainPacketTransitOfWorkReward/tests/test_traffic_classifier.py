@@ -0,0 +1,72 @@
+import pytest
+
+from snifz_traffic_classifier import (COUNTER_FIELDS, PACKET_BROADCAST, PACKET_HOST, PACKET_OTHERHOST,
+                                      PACKET_OUTGOING, SnifZTrafficClassifier)
+
+OUR_MAC, PEER_MAC = bytes.fromhex("020000000001"), bytes.fromhex("020000000002")
+OUR_IP, PEER_IP = bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2])
+
+
+def ipv4(protocol, src, dst, dst_mac=OUR_MAC, src_mac=PEER_MAC, vlan=False, size=120):
+    ethernet = dst_mac + src_mac + (b"\x81\x00\x00\x05" if vlan else b"") + b"\x08\x00"
+    ip = bytes([0x45, 0, 0, 0, 0, 0, 0, 0, 64, protocol, 0, 0]) + src + dst
+    return (ethernet + ip).ljust(size, b"\x00")
+
+
+def ipv6(next_header, src, dst, size=120):
+    ip = bytes([0x60, 0, 0, 0, 0, 0, next_header, 64]) + src + dst
+    return ip.ljust(size, b"\x00")
+
+
+def counts(classifier):
+    return {field: value for field, value in classifier.snapshot().items() if value}
+
+
+@pytest.mark.parametrize("pkttype, direction", [
+    (PACKET_HOST, "in"), (PACKET_BROADCAST, "in"), (PACKET_OUTGOING, "out"), (PACKET_OTHERHOST, None),
+])
+def test_kernel_pkttype_sets_the_direction(pkttype, direction):
+    classifier = SnifZTrafficClassifier(OUR_MAC, {OUR_IP})
+    frame = ipv4(17, PEER_IP, OUR_IP)
+    classifier.count_frame(frame, 0, len(frame), pkttype)
+    expected = {"udp_packets": 1, "udp_bytes": 120}
+    if direction:
+        expected.update({f"packets_{direction}": 1, f"bytes_{direction}": 120})
+    assert counts(classifier) == expected
+
+
+def test_direction_from_macs_then_ips():
+    classifier = SnifZTrafficClassifier(OUR_MAC, {OUR_IP})
+    for frame in (ipv4(6, PEER_IP, OUR_IP),  # To our MAC
+                  ipv4(6, OUR_IP, PEER_IP, dst_mac=PEER_MAC, src_mac=OUR_MAC),  # From our MAC
+                  ipv4(1, OUR_IP, PEER_IP, dst_mac=PEER_MAC, src_mac=PEER_MAC, vlan=True),  # Routed: from our IP
+                  ipv4(6, PEER_IP, PEER_IP, dst_mac=PEER_MAC, src_mac=PEER_MAC)):  # Promiscuous: neither
+        classifier.count_frame(frame, 0, len(frame))
+    assert counts(classifier) == {"packets_in": 1, "bytes_in": 120, "packets_out": 2, "bytes_out": 240,
+                                  "tcp_packets": 3, "tcp_bytes": 360, "icmp_packets": 1, "icmp_bytes": 120}
+
+
+def test_loopback_frames_alternate_between_out_and_in():
+    classifier = SnifZTrafficClassifier(OUR_MAC, set())
+    frame = ipv4(6, OUR_IP, OUR_IP, dst_mac=OUR_MAC, src_mac=OUR_MAC)
+    for _ in range(4):
+        classifier.count_frame(frame, 0, len(frame))
+    assert classifier.snapshot()["packets_in"] == classifier.snapshot()["packets_out"] == 2
+
+
+def test_raw_ip_links_and_ipv6():
+    ours, theirs = bytes(15) + b"\x01", bytes(15) + b"\x02"
+    classifier = SnifZTrafficClassifier(None, {ours}, has_ethernet=False)
+    for frame in (ipv6(58, theirs, ours), ipv6(17, ours, theirs), ipv6(50, theirs, theirs)):
+        classifier.count_frame(frame, 0, len(frame))
+    assert counts(classifier) == {"packets_in": 1, "bytes_in": 120, "packets_out": 1, "bytes_out": 120,
+                                  "icmp_packets": 1, "icmp_bytes": 120, "udp_packets": 1, "udp_bytes": 120,
+                                  "other_packets": 1, "other_bytes": 120}
+
+
+def test_runt_frames_are_counted_without_a_direction():
+    shared = [0] * len(COUNTER_FIELDS)
+    classifier = SnifZTrafficClassifier(OUR_MAC, {OUR_IP}, counters=shared)
+    classifier.count_frame(b"\x02\x00\x00", 0, 3)
+    assert counts(classifier) == {"other_packets": 1, "other_bytes": 3}
+    assert shared[COUNTER_FIELDS.index("other_packets")] == 1  # Counts land in the caller's storage
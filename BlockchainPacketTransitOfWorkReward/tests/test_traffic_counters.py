@@ -0,0 +1,58 @@
+import threading
+
+from snifz_traffic_counters import SnifZTrafficCounters
+
+
+def test_each_thread_writes_its_own_shard():
+    counters = SnifZTrafficCounters(("packets", "bytes"))
+
+    def capture():
+        shard = counters.shard()
+        assert counters.shard() is shard
+        for _ in range(10000):
+            shard[0] += 1
+            shard[1] += 60
+
+    threads = [threading.Thread(target=capture) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(counters._shards) == 4
+    assert counters.totals() == [40000, 2400000]
+
+
+def test_windows_roll_independently():
+    counters = SnifZTrafficCounters(("packets",))
+    shard = counters.add_shard([5])
+    mint, ui = counters.window(), counters.window()
+    shard[0] += 3
+    assert mint.peek() == {"packets": 3}
+    assert mint.roll() == {"packets": 3}
+    shard[0] += 2
+    assert mint.roll() == {"packets": 2}
+    assert ui.peek() == {"packets": 5}
+    rates = ui.roll_rates()
+    assert rates["packets"] > 0 and ui.peek() == {"packets": 0}
+    assert counters.totals() == [10]  # Windows never reset the shards
+
+
+def test_rolls_do_not_lose_concurrent_increments():
+    counters = SnifZTrafficCounters(("packets",))
+    window = counters.window()
+    done = threading.Event()
+    rolled = []
+
+    def capture():
+        shard = counters.shard()
+        for _ in range(50000):
+            shard[0] += 1
+        done.set()
+
+    thread = threading.Thread(target=capture)
+    thread.start()
+    while not done.is_set():
+        rolled.append(window.roll()["packets"])
+    thread.join()
+    rolled.append(window.roll()["packets"])
+    assert sum(rolled) == 50000